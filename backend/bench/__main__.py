@@ -0,0 +1,63 @@
+import sys
+import json
+import argparse
+import logging
+
+from backend.bench._runner import run, compare
+
+
+def main():
+    """
+    Замеры производительности: python -m backend.bench <команда>
+    """
+    parser = argparse.ArgumentParser(prog='python -m backend.bench')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='прогнать замеры на временном PostgreSQL')
+    run_parser.add_argument('--cards', type=int, default=100000, help='число печатей в синтетической выгрузке')
+    run_parser.add_argument('--inventory', type=int, default=1000000, help='число позиций склада')
+    run_parser.add_argument('--users', type=int, default=10000, help='число пользователей')
+    run_parser.add_argument('--queries', type=int, default=500, help='число вызовов в каждом замере')
+    run_parser.add_argument('--seed', type=int, default=0, help='зерно генератора данных')
+    run_parser.add_argument('--keep', action='store_true', help='не удалять каталог кластера')
+    run_parser.add_argument('--output', '-o', default='bench-results.json', help='файл результатов JSON')
+
+    compare_parser = commands.add_parser('compare', help='сравнить два файла результатов')
+    compare_parser.add_argument('baseline', help='результаты базового коммита')
+    compare_parser.add_argument('current', help='результаты проверяемого коммита')
+    compare_parser.add_argument('--threshold', type=float, default=0.2,
+                                help='допустимое ухудшение в долях, по умолчанию 0.2')
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.command == 'run':
+        result = run(cards=args.cards, inventory=args.inventory, users=args.users, queries=args.queries,
+                     seed=args.seed, keep=args.keep)
+        with open(args.output, 'w', encoding='UTF-8') as file:
+            json.dump(result, file, indent=2)
+        for name, stats in result['results'].items():
+            if 'p50_ms' in stats:
+                summary = f"p50 {stats['p50_ms']:.2f} ms, p95 {stats['p95_ms']:.2f} ms"
+            elif 'rows_per_second' in stats:
+                summary = f"{stats['rows_per_second']:.0f} rows/s"
+            else:
+                summary = f"{stats['ops_per_second']:.1f} ops/s, {stats['statuses']}"
+            print(f"{name:<40} {summary}")
+    elif args.command == 'compare':
+        with open(args.baseline, encoding='UTF-8') as file:
+            baseline = json.load(file)
+        with open(args.current, encoding='UTF-8') as file:
+            current = json.load(file)
+
+        rows = compare(baseline, current, threshold=args.threshold)
+        for row in rows:
+            status = 'REGRESSION' if row['regression'] else 'ok'
+            print(f"{row['name']:<40} {row['metric']:<16} {row['baseline']:>12.2f} -> {row['current']:>12.2f} "
+                  f"{row['change']:+.1%} {status}")
+        if any(row['regression'] for row in rows):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
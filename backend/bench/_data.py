@@ -0,0 +1,163 @@
+import io
+import json
+import random
+import string
+import uuid
+
+from typing import List
+
+# Словари для названий: сочетания дают десятки тысяч разных имён с общими словами,
+# как в настоящем каталоге, где поиск по подстроке находит много совпадений
+ADJECTIVES = ['Ancient', 'Arcane', 'Blazing', 'Bloodthirsty', 'Celestial', 'Crimson', 'Cursed', 'Dark', 'Dread',
+              'Elder', 'Eternal', 'Feral', 'Frozen', 'Ghostly', 'Gilded', 'Grim', 'Hallowed', 'Hidden', 'Infernal',
+              'Iron', 'Lightning', 'Lost', 'Mystic', 'Noble', 'Primal', 'Radiant', 'Savage', 'Shadow', 'Silent',
+              'Spectral', 'Storm', 'Sunlit', 'Thorned', 'Twisted', 'Verdant', 'Vicious', 'Wandering', 'Wild']
+NOUNS = ['Angel', 'Archmage', 'Bolt', 'Behemoth', 'Charm', 'Colossus', 'Command', 'Dragon', 'Drake', 'Elemental',
+         'Elf', 'Familiar', 'Fiend', 'Giant', 'Goblin', 'Golem', 'Griffin', 'Guardian', 'Hydra', 'Knight', 'Lich',
+         'Oracle', 'Phoenix', 'Ring', 'Rogue', 'Sentinel', 'Serpent', 'Shaman', 'Sliver', 'Sphinx', 'Titan',
+         'Vampire', 'Warden', 'Wurm', 'Wraith', 'Zombie']
+SUFFIXES = ['', '', '', ' of the Wilds', ' of Ruin', ' of the Deep', ' of Dawn', ' of Ashes', ' of the Void']
+TYPES = ['Creature — Human Wizard', 'Creature — Dragon', 'Instant', 'Sorcery', 'Enchantment', 'Artifact',
+         'Legendary Creature — Elf Druid', 'Land', 'Planeswalker — Jace', 'Artifact — Equipment']
+COLOR_IDENTITIES = [[], ['W'], ['U'], ['B'], ['R'], ['G'], ['U', 'R'], ['W', 'B'], ['B', 'G', 'R']]
+QUALITIES = ['NM', 'SP', 'HP', 'MP', 'DM', 'NM-', 'SP+', 'SP-']
+LANGS = ['en', 'ru', 'ja', 'de']
+
+SETS_PER_CATALOG = 400
+
+
+def card_names(rng: random.Random, count: int) -> List[str]:
+    names = [f'{a} {n}{s}' for a in ADJECTIVES for n in NOUNS for s in SUFFIXES]
+    rng.shuffle(names)
+    return names[:count]
+
+
+def make_card(rng: random.Random, name: str, set_index: int, number: int) -> dict:
+    """
+    Карта в формате выгрузки Scryfall default-cards: те поля, что читает импорт, и типичный балласт
+    """
+    card_id = str(uuid.UUID(int=rng.getrandbits(128)))
+    set_code = f's{set_index:03d}'
+    image = f'https://cards.scryfall.io/%s/front/{card_id[0]}/{card_id[1]}/{card_id}.jpg?1700000000'
+
+    return {
+        'object': 'card',
+        'id': card_id,
+        'oracle_id': str(uuid.UUID(int=rng.getrandbits(128))),
+        'lang': 'en',
+        'released_at': f'20{rng.randint(0, 24):02d}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}',
+        'layout': 'normal',
+        'name': name,
+        'mana_cost': '{%d}{%s}' % (rng.randint(0, 6), rng.choice('WUBRG')),
+        'cmc': float(rng.randint(0, 8)),
+        'type_line': rng.choice(TYPES),
+        'oracle_text': ' '.join(rng.choice(NOUNS).lower() for _ in range(rng.randint(10, 40))),
+        'colors': rng.choice(COLOR_IDENTITIES),
+        'color_identity': rng.choice(COLOR_IDENTITIES),
+        'set': set_code,
+        'set_name': f'Benchmark Set {set_index}',
+        'collector_number': str(number),
+        'rarity': rng.choice(['common', 'uncommon', 'rare', 'mythic']),
+        'image_uris': {size: image % size for size in ('small', 'normal', 'large', 'png', 'art_crop')},
+        'prices': {'usd': f'{rng.uniform(0.1, 50):.2f}', 'eur': None, 'tix': None},
+        'legalities': {fmt: rng.choice(['legal', 'not_legal']) for fmt in ('standard', 'modern', 'legacy')},
+    }
+
+
+def write_cards_file(path: str, cards: int, seed: int = 0) -> List[str]:
+    """
+    Синтетическая выгрузка Scryfall: JSON-массив, по карте на строку, как у настоящих выгрузок.
+    Одно название печатается в нескольких сетах.
+    :param cards: число печатей
+    :return: список различных названий, для поисковых запросов
+    """
+    rng = random.Random(seed)
+    names = card_names(rng, max(1, cards // 4))
+    numbers = {}
+
+    with open(path, 'w', encoding='UTF-8') as file:
+        file.write('[\n')
+        for i in range(cards):
+            set_index = rng.randrange(SETS_PER_CATALOG)
+            numbers[set_index] = numbers.get(set_index, 0) + 1
+            card = make_card(rng, names[i % len(names)], set_index, numbers[set_index])
+            file.write(json.dumps(card, ensure_ascii=False))
+            file.write(',\n' if i < cards - 1 else '\n')
+        file.write(']\n')
+
+    return names
+
+
+def _copy(cursor, table: str, columns: tuple, rows) -> int:
+    buffer = io.StringIO()
+    count = 0
+    for row in rows:
+        buffer.write('\t'.join('\\N' if value is None else str(value) for value in row))
+        buffer.write('\n')
+        count += 1
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buffer)
+    return count
+
+
+def load_users(db, users: int, password_hash: str, seed: int = 0) -> List[str]:
+    """
+    Пользователи user<N>@bench.local с одним и тем же хэшем пароля
+    :return: список email
+    """
+    emails = [f'user{i}@bench.local' for i in range(users)]
+    with db.cursor() as cursor:
+        _copy(cursor, 'users', ('email', 'password_hash', 'username'),
+              ((email, password_hash, f'user{i}') for i, email in enumerate(emails)))
+    return emails
+
+
+def load_inventory(db, rows: int, seed: int = 0, batch_size: int = 100000) -> int:
+    """
+    Позиции склада по случайным картам каталога. Грузятся пачками COPY, каждая пачка - одна вставка
+    для триггеров сводки и очереди поступлений.
+    :return: число загруженных строк
+    """
+    rng = random.Random(seed)
+
+    with db.cursor() as cursor:
+        cursor.execute("SELECT id FROM cards")
+        card_ids = [row[0] for row in cursor.fetchall()]
+        cursor.execute("SELECT id FROM users ORDER BY id LIMIT 100")
+        owner_ids = [row[0] for row in cursor.fetchall()] or [None]
+
+    # Спрос неравномерный: небольшая часть карт лежит на складе в больших количествах
+    popular = card_ids[:max(1, len(card_ids) // 20)]
+
+    loaded = 0
+    while loaded < rows:
+        count = min(batch_size, rows - loaded)
+        with db.cursor() as cursor:
+            loaded += _copy(cursor, 'card_inventory',
+                            ('card_id', 'lang', 'quality', 'foil', 'quantity', 'price', 'owner', 'owner_id'),
+                            ((rng.choice(popular if rng.random() < 0.5 else card_ids), rng.choice(LANGS),
+                              rng.choice(QUALITIES), rng.random() < 0.1, rng.randint(0, 20),
+                              f'{rng.uniform(5, 5000):.2f}', ''.join(rng.choices(string.ascii_lowercase, k=8)),
+                              rng.choice(owner_ids))
+                             for _ in range(count)))
+
+    return loaded
+
+
+def search_queries(names: List[str], count: int, seed: int = 0) -> List[str]:
+    """
+    Поисковые строки: полные названия, отдельные слова и обрывки слов, как их набирают пользователи
+    """
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        name = rng.choice(names)
+        kind = rng.random()
+        if kind < 0.3:
+            queries.append(name)
+        elif kind < 0.7:
+            queries.append(rng.choice(name.split()))
+        else:
+            word = rng.choice(name.split())
+            queries.append(word[:max(3, len(word) // 2)].lower())
+    return queries
@@ -0,0 +1,121 @@
+import os
+import shutil
+import socket
+import logging
+import tempfile
+import subprocess
+
+import psycopg2
+
+# Кластер только для замеров: надёжность записи не нужна, поэтому fsync и синхронная фиксация выключены.
+# Цифры сравниваются между коммитами на одних и тех же настройках, а не с продакшеном.
+SERVER_OPTIONS = {
+    'listen_addresses': "''",
+    'fsync': 'off',
+    'synchronous_commit': 'off',
+    'full_page_writes': 'off',
+    'shared_buffers': '256MB',
+    'max_wal_size': '4GB',
+}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _bindir() -> str:
+    """
+    Каталог с initdb и pg_ctl: PG_BIN или pg_config --bindir
+    """
+    if os.getenv('PG_BIN'):
+        return os.getenv('PG_BIN')
+    try:
+        return subprocess.run(['pg_config', '--bindir'], check=True, capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        raise RuntimeError("PostgreSQL binaries not found: set PG_BIN or put pg_config on PATH")
+
+
+class TemporaryPostgres:
+    """
+    Временный кластер PostgreSQL во временном каталоге, доступный через unix-сокет.
+    Удаляется целиком при выходе из контекста.
+    """
+
+    def __init__(self, database: str = 'bench', user: str = 'bench', keep: bool = False):
+        """
+        :param database: имя создаваемой базы
+        :param user: суперпользователь кластера
+        :param keep: не удалять каталог кластера после остановки, для разбора логов
+        """
+        self.database = database
+        self.user = user
+        self.keep = keep
+        self.bindir = _bindir()
+        self.port = _free_port()
+        self.path = None
+
+    @property
+    def data_dir(self) -> str:
+        return os.path.join(self.path, 'data')
+
+    @property
+    def log_file(self) -> str:
+        return os.path.join(self.path, 'postgres.log')
+
+    def _run(self, *args):
+        subprocess.run([os.path.join(self.bindir, args[0]), *args[1:]], check=True, capture_output=True)
+
+    def start(self):
+        self.path = tempfile.mkdtemp(prefix='cardhub-bench-')
+        self._run('initdb', '-D', self.data_dir, '-U', self.user, '--auth=trust', '-E', 'UTF8', '--no-sync')
+
+        options = ' '.join(f"-c {name}={value}" for name, value in SERVER_OPTIONS.items())
+        self._run('pg_ctl', '-D', self.data_dir, '-l', self.log_file, '-w',
+                  '-o', f"-p {self.port} -k {self.path} {options}", 'start')
+        logging.info(f"Temporary PostgreSQL started in {self.path} on port {self.port}")
+
+        conn = psycopg2.connect(host=self.path, port=self.port, user=self.user, database='postgres')
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute(f'CREATE DATABASE "{self.database}"')
+        conn.close()
+
+    def stop(self):
+        if self.path is None:
+            return
+        try:
+            self._run('pg_ctl', '-D', self.data_dir, '-m', 'immediate', '-w', 'stop')
+        finally:
+            if not self.keep:
+                shutil.rmtree(self.path, ignore_errors=True)
+            self.path = None
+
+    def environ(self) -> dict:
+        """
+        Переменные окружения, по которым Database подключится к кластеру
+        """
+        return {
+            'PGHOST': self.path,
+            'DB_PORT': str(self.port),
+            'PGDATABASE': self.database,
+            'PGUSER': self.user,
+            'PGPASSWORD': ''
+        }
+
+    def version(self) -> str:
+        conn = psycopg2.connect(host=self.path, port=self.port, user=self.user, database=self.database)
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SHOW server_version")
+                return cursor.fetchone()[0]
+        finally:
+            conn.close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
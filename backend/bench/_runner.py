@@ -0,0 +1,235 @@
+import os
+import sys
+import time
+import random
+import logging
+import platform
+import statistics
+import threading
+import subprocess
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+
+from urllib.parse import quote
+
+from datetime import datetime, timezone
+from typing import Callable, List
+
+from backend.bench._data import write_cards_file, load_users, load_inventory, search_queries
+from backend.bench._postgres import TemporaryPostgres
+
+BENCH_PASSWORD = 'bench-password'
+
+
+def measure(func: Callable, args: List[tuple], warmup: int = 5) -> dict:
+    """
+    Время вызовов func(*a) для каждого набора аргументов
+    :param args: аргументы по вызову, сколько их - столько и замеров
+    :param warmup: сколько первых вызовов не учитывать (прогрев кэшей Postgres и планов)
+    :return: count, mean, min, p50, p95, p99, max в миллисекундах и ops_per_second
+    """
+    for a in args[:warmup]:
+        func(*a)
+
+    timings = []
+    for a in args:
+        started = time.perf_counter()
+        func(*a)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    timings.sort()
+    total = sum(timings)
+
+    def percentile(p):
+        return timings[min(len(timings) - 1, int(len(timings) * p))]
+
+    return {
+        'count': len(timings),
+        'mean_ms': total / len(timings),
+        'min_ms': timings[0],
+        'p50_ms': statistics.median(timings),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+        'max_ms': timings[-1],
+        'ops_per_second': len(timings) / total * 1000 if total else 0.0
+    }
+
+
+def throughput(func: Callable, args: List[tuple], concurrency: int) -> dict:
+    """
+    Пропускная способность при concurrency параллельных клиентах
+    :param args: аргументы по вызову
+    :return: count, concurrency, seconds, ops_per_second и ответы по кодам статуса
+    """
+    statuses = {}
+    lock = threading.Lock()
+
+    def call(a):
+        status = getattr(func(*a), 'status_code', None)
+        with lock:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(call, args))
+    seconds = time.perf_counter() - started
+
+    return {
+        'count': len(args),
+        'concurrency': concurrency,
+        'seconds': seconds,
+        'ops_per_second': len(args) / seconds if seconds else 0.0,
+        'statuses': statuses
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], check=True, capture_output=True, text=True,
+                              cwd=os.path.dirname(__file__)).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run(cards: int = 100000, inventory: int = 1000000, users: int = 10000, queries: int = 500,
+        seed: int = 0, keep: bool = False) -> dict:
+    """
+    Полный прогон замеров на временном кластере PostgreSQL с синтетическими данными
+    :param cards: число печатей в выгрузке
+    :param inventory: число позиций склада
+    :param users: число пользователей
+    :param queries: число вызовов в каждом замере
+    :param seed: зерно генератора данных и запросов
+    :param keep: не удалять каталог кластера
+    :return: meta и results по замерам
+    """
+    with TemporaryPostgres(keep=keep) as postgres:
+        os.environ.update(postgres.environ())
+        os.environ['SUGGEST_WARMUP'] = '0'
+        # Кэш поиска сбрасывается в замерах явно, уведомления о складе не должны делать это за них
+        os.environ['DB_LISTEN'] = '0'
+
+        # Импорты после настройки окружения: Database и приложение читают его при создании
+        from backend.src.db import Database
+        from backend.src.web_backend.app import create_app
+
+        results = {}
+        rng = random.Random(seed)
+
+        with closing(Database()) as db, db:
+            db.create_tables()
+            db.migrate()
+
+            cards_file = os.path.join(postgres.path, 'default-cards.json')
+            names = write_cards_file(cards_file, cards, seed)
+
+            started = time.perf_counter()
+            stats = db.add_cards_from_file(file_path=cards_file)
+            results['import.add_cards_from_file'] = {
+                'count': 1,
+                'rows': stats['rows'],
+                'seconds': time.perf_counter() - started,
+                'rows_per_second': stats['rows_per_second']
+            }
+
+            app = create_app(db=db)
+            password_hash = app.bcrypt.generate_password_hash(BENCH_PASSWORD).decode('utf-8')
+            emails = load_users(db, users, password_hash, seed)
+
+            # Загрузка склада идёт через триггеры сводки и очереди поступлений - её цена тоже замеряется
+            started = time.perf_counter()
+            rows = load_inventory(db, inventory, seed)
+            seconds = time.perf_counter() - started
+            results['import.load_inventory'] = {
+                'count': 1,
+                'rows': rows,
+                'seconds': seconds,
+                'rows_per_second': rows / seconds if seconds else 0.0
+            }
+
+            with db.cursor() as cursor:
+                cursor.execute("ANALYZE")
+
+            search_args = [(q,) for q in search_queries(names, queries, seed)]
+
+            def uncached(search):
+                # Замеряется запрос к базе, а не попадание в кэш поиска
+                def call(query):
+                    db.invalidate_search_cache()
+                    return search(card_name=query, limit=20)
+                return call
+
+            results['db.search_card'] = measure(uncached(db.search_card), search_args)
+            results['db.search_card.cached'] = measure(lambda q: db.search_card(card_name=q, limit=20),
+                                                       search_args)
+            results['db.search_cards_with_inventory'] = measure(uncached(db.search_cards_with_inventory),
+                                                                search_args)
+            results['db.search_card_ranked'] = measure(uncached(db.search_card_ranked), search_args)
+            results['db.get_user'] = measure(db.get_user, [(rng.choice(emails),) for _ in range(queries)])
+
+            client = app.test_client()
+            results['http.search_cards'] = measure(
+                lambda q: client.get(f'/api/cards/search/{quote(q)}?limit=20&count=estimate'), search_args)
+            results['http.suggest_cards'] = measure(
+                lambda q: client.get('/api/cards/suggest', query_string={'q': q[:3]}), search_args)
+            # Вход упирается в bcrypt, поэтому замеров меньше
+            results['http.login'] = measure(
+                lambda email: client.post('/api/auth/login', json={'email': email, 'password': BENCH_PASSWORD}),
+                [(rng.choice(emails),) for _ in range(max(10, queries // 20))], warmup=2)
+            # Всплеск входов: сколько входов в секунду выдерживает пул хэширования и сколько получают 503
+            login_args = [(rng.choice(emails),) for _ in range(max(20, queries // 5))]
+            results['http.login.burst'] = throughput(
+                lambda email: app.test_client().post('/api/auth/login',
+                                                     json={'email': email, 'password': BENCH_PASSWORD}),
+                login_args, concurrency=app.password_hasher.workers * 4)
+
+        return {
+            'meta': {
+                'commit': _git_commit(),
+                'created_at': datetime.now(timezone.utc).isoformat(),
+                'python': sys.version.split()[0],
+                'platform': platform.platform(),
+                'postgres': postgres.version(),
+                'scale': {'cards': cards, 'inventory': inventory, 'users': users, 'queries': queries, 'seed': seed}
+            },
+            'results': results
+        }
+
+
+# Метрики, по которым сравниваются прогоны, и лучше ли они, когда меньше.
+# ops_per_second сравнивается только у замеров пропускной способности, у остальных его заменяют перцентили
+COMPARE_METRICS = (('p50_ms', True), ('p95_ms', True), ('rows_per_second', False), ('ops_per_second', False))
+
+
+def compare(baseline: dict, current: dict, threshold: float = 0.2) -> List[dict]:
+    """
+    Сравнение двух прогонов
+    :param threshold: допустимое ухудшение метрики в долях, 0.2 - на 20%
+    :return: по строке на замер и метрику: name, metric, baseline, current, change, regression
+    """
+    if baseline['meta'].get('scale') != current['meta'].get('scale'):
+        logging.warning("Benchmarks were run at different scales, comparison is approximate")
+
+    rows = []
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+        for metric, lower_is_better in COMPARE_METRICS:
+            if metric not in result or not base.get(metric):
+                continue
+            if metric == 'ops_per_second' and 'p50_ms' in result:
+                continue
+            change = (result[metric] - base[metric]) / base[metric]
+            worse = change if lower_is_better else -change
+            rows.append({
+                'name': name,
+                'metric': metric,
+                'baseline': base[metric],
+                'current': result[metric],
+                'change': change,
+                'regression': worse > threshold
+            })
+
+    return rows
@@ -0,0 +1,334 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import BinaryIO, Iterable, NamedTuple, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: блокировка только внутри процесса, кэш не должен делиться между процессами
+    fcntl = None
+
+# Картинки Scryfall лежат на их CDN; проксировать другие адреса нельзя
+ALLOWED_IMAGE_HOSTS = ('cards.scryfall.io',)
+
+
+class CachedImage(NamedTuple):
+    # Открытый файл картинки: даже если другой процесс вытеснит её с диска, содержимое дочитается
+    file: BinaryIO
+    content_type: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+
+
+class ImageCache:
+    """
+    Потокобезопасный кэш картинок на диске с ограничением общего размера и вытеснением LRU.
+    Каталог могут делить несколько процессов: запись и вытеснение идут под файловой блокировкой,
+    общий размер ведётся счётчиком в файле .size рядом с картинками, а порядок LRU - по времени
+    последнего обращения к файлам. Каталог пересчитывается целиком только при превышении max_bytes.
+    Устаревшие записи перепроверяются условным запросом по ETag/Last-Modified
+    """
+
+    def __init__(self, path: str = None, max_bytes: int = None, ttl: float = None,
+                 allowed_hosts: Iterable[str] = ALLOWED_IMAGE_HOSTS, timeout: float = 15):
+        """
+        :param path: каталог кэша (IMAGE_CACHE_DIR)
+        :param max_bytes: максимальный общий размер картинок в байтах (IMAGE_CACHE_MAX_BYTES)
+        :param ttl: через сколько секунд запись перепроверяется у источника (IMAGE_CACHE_TTL)
+        :param allowed_hosts: хосты, с которых разрешено загружать картинки, None - любые
+        :param timeout: таймаут запроса к источнику в секундах
+        """
+        self.path = path or os.getenv('IMAGE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'cardhub-images'))
+        self.max_bytes = max_bytes or int(os.getenv('IMAGE_CACHE_MAX_BYTES', 2 * 1024 ** 3))
+        self.ttl = ttl if ttl is not None else float(os.getenv('IMAGE_CACHE_TTL', 7 * 24 * 3600))
+        self.allowed_hosts = tuple(allowed_hosts) if allowed_hosts is not None else None
+        self.timeout = timeout
+
+        self._lock = threading.Lock()
+        # Размер каталога по общему счётчику на момент последней записи этим процессом
+        self._entries = 0
+        self._total = 0
+        self._hits = 0
+        self._misses = 0
+        self._revalidations = 0
+        self._evictions = 0
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(max_retries=Retry(total=3, backoff_factor=0.5,
+                                                status_forcelist=(429, 500, 502, 503, 504)), pool_maxsize=16)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        os.makedirs(self.path, exist_ok=True)
+        with self._locked():
+            self._evict()
+
+    @contextmanager
+    def _locked(self):
+        """
+        Блокировка каталога кэша между потоками и процессами
+        """
+        with self._lock, open(os.path.join(self.path, '.lock'), 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def _scan(self) -> list:
+        """
+        Картинки в каталоге от давно не запрошенных к недавним
+        :return: список (время последнего обращения, ключ, размер)
+        """
+        entries = []
+        with os.scandir(self.path) as it:
+            for entry in it:
+                if not entry.name.endswith('.img'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, entry.name[:-4], stat.st_size))
+
+        return sorted(entries)
+
+    def _read_size(self) -> Optional[tuple]:
+        """
+        Общий счётчик размера каталога. Вызывается под _locked()
+        :return: (число картинок, байт) или None, если счётчика нет
+        """
+        try:
+            with open(os.path.join(self.path, '.size'), encoding='utf-8') as file:
+                size = json.load(file)
+            return size['entries'], size['bytes']
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _write_size(self, entries: int, total: int):
+        """
+        Сохранить общий счётчик размера каталога. Вызывается под _locked()
+        """
+        self._write(os.path.join(self.path, '.size'), json.dumps({'entries': entries, 'bytes': total}).encode())
+        self._entries = entries
+        self._total = total
+
+    def _files(self, key: str) -> tuple:
+        base = os.path.join(self.path, key)
+        return base + '.img', base + '.meta.json'
+
+    def _check_url(self, url: str):
+        host = requests.utils.urlparse(url).hostname
+        if self.allowed_hosts is not None and host not in self.allowed_hosts:
+            raise ValueError(f"Image host is not allowed: {host}")
+
+    def _read_meta(self, key: str) -> Optional[dict]:
+        try:
+            with open(self._files(key)[1], encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, path: str, data: bytes):
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as file:
+            file.write(data)
+        os.replace(tmp, path)
+
+    def _store(self, key: str, content: bytes, meta: dict) -> BinaryIO:
+        """
+        Записать картинку и обновить счётчик размера; сверх max_bytes - вытеснить лишнее
+        :return: открытый файл записанной картинки
+        """
+        image_path, meta_path = self._files(key)
+        with self._locked():
+            try:
+                replaced = os.path.getsize(image_path)
+            except OSError:
+                replaced = None
+            self._write(image_path, content)
+            self._write(meta_path, json.dumps(meta).encode())
+            # Файл открывается до вытеснения: другие процессы вытесняют под той же блокировкой
+            file = open(image_path, 'rb')
+
+            size = self._read_size()
+            if size is None:
+                self._evict()
+            else:
+                entries, total = size
+                entries += replaced is None
+                total += len(content) - (replaced or 0)
+                if total > self.max_bytes:
+                    self._evict()
+                else:
+                    self._write_size(entries, total)
+
+        return file
+
+    def _evict(self):
+        """
+        Пересчитать размер каталога, удалить давно не запрошенные картинки сверх max_bytes
+        и сохранить общий счётчик. Вызывается под _locked()
+        """
+        entries = self._scan()
+        total = sum(size for _, _, size in entries)
+
+        evicted = 0
+        while total > self.max_bytes and len(entries) - evicted > 1:
+            _, key, size = entries[evicted]
+            evicted += 1
+            total -= size
+            for path in self._files(key):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+        self._write_size(len(entries) - evicted, total)
+        self._evictions += evicted
+
+    def _touch(self, key: str):
+        try:
+            os.utime(self._files(key)[0])
+        except OSError:
+            pass
+
+    def _open(self, key: str) -> Optional[BinaryIO]:
+        try:
+            return open(self._files(key)[0], 'rb')
+        except FileNotFoundError:
+            return None
+
+    def get(self, url: str) -> CachedImage:
+        """
+        Картинка из кэша; при промахе или устаревшей записи загружается у источника
+        :param url: адрес картинки
+        :return: открытый файл картинки (закрывает вызывающий) и заголовки ответа
+        :raise ValueError: хост картинки не разрешён
+        :raise requests.HTTPError: источник вернул ошибку, а в кэше картинки нет
+        """
+        return self._get(url)[0]
+
+    def _get(self, url: str) -> tuple:
+        """
+        :return: (CachedImage, True - отдана из кэша без запроса к источнику)
+        """
+        self._check_url(url)
+        key = hashlib.sha256(url.encode()).hexdigest()
+        meta = self._read_meta(key)
+
+        if meta is not None:
+            if time.time() - meta['stored_at'] < self.ttl:
+                file = self._open(key)
+                if file is not None:
+                    with self._lock:
+                        self._hits += 1
+                    self._touch(key)
+                    return self._cached(file, meta), True
+            else:
+                meta, file = self._revalidate(url, key, meta)
+                if file is not None:
+                    return self._cached(file, meta), False
+
+        # Промах, в том числе если картинку вытеснил другой процесс после чтения meta
+        with self._lock:
+            self._misses += 1
+        response = self.session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        meta = self._meta(response)
+        return self._cached(self._store(key, response.content, meta), meta), False
+
+    def _revalidate(self, url: str, key: str, meta: dict) -> tuple:
+        """
+        :return: (meta, открытый файл или None, если картинки на диске уже нет)
+        """
+        with self._lock:
+            self._revalidations += 1
+        headers = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+
+        try:
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+        except requests.RequestException as e:
+            # Источник недоступен - лучше отдать устаревшую картинку, чем ошибку
+            logging.warning(f"Image revalidation error, serving stale copy: {e}")
+            return meta, self._open(key)
+
+        if response.status_code == 200:
+            meta = self._meta(response)
+            return meta, self._store(key, response.content, meta)
+
+        if response.status_code == 304:
+            meta = dict(meta, stored_at=time.time())
+            self._write(self._files(key)[1], json.dumps(meta).encode())
+        else:
+            logging.warning(f"Image revalidation error {response.status_code}, serving stale copy: {url}")
+        self._touch(key)
+        return meta, self._open(key)
+
+    @staticmethod
+    def _meta(response) -> dict:
+        return {
+            'content_type': response.headers.get('Content-Type', 'image/jpeg'),
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'stored_at': time.time()
+        }
+
+    @staticmethod
+    def _cached(file: BinaryIO, meta: dict) -> CachedImage:
+        return CachedImage(file, meta['content_type'], meta.get('etag'), meta.get('last_modified'))
+
+    def prefetch(self, urls: Iterable[str], workers: int = 8) -> dict:
+        """
+        Прогреть кэш: загрузить картинки, которых в нём нет
+        :param urls: адреса картинок
+        :param workers: число параллельных загрузок
+        :return: статистика: cached - уже были в кэше, fetched - запрошены у источника, failed
+        """
+        stats = {'cached': 0, 'fetched': 0, 'failed': 0}
+
+        def fetch(url):
+            try:
+                image, hit = self._get(url)
+                image.file.close()
+                return 'cached' if hit else 'fetched'
+            except Exception as e:
+                logging.warning(f"Image prefetch error: {url} {e}")
+                return 'failed'
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for result in executor.map(fetch, [url for url in urls if url]):
+                stats[result] += 1
+
+        logging.info(f"Images prefetched: {stats}")
+        return stats
+
+    def stats(self) -> dict:
+        """
+        Статистика кэша: entries, bytes (по общему счётчику на момент последней записи), max_bytes, hits, misses,
+        revalidations, evictions (в этом процессе)
+        """
+        with self._lock:
+            return {
+                'entries': self._entries,
+                'bytes': self._total,
+                'max_bytes': self.max_bytes,
+                'hits': self._hits,
+                'misses': self._misses,
+                'revalidations': self._revalidations,
+                'evictions': self._evictions
+            }
@@ -1,17 +1,312 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+
+from typing import Iterator, Optional
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class RateLimiter:
+    """
+    Потокобезопасный ограничитель частоты запросов: не чаще rate запросов в секунду.
+    Scryfall просит держать паузу 50-100 мс между запросами, иначе отвечает 429
+    """
+
+    def __init__(self, rate: float = 10.0):
+        """
+        :param rate: запросов в секунду, 0 - без ограничения
+        """
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_at = 0.0
+
+    def wait(self):
+        """
+        Дождаться своей очереди. Места раздаются по порядку, поэтому пачка запросов
+        из нескольких потоков растягивается равномерно, а не уходит залпом
+        """
+        with self._lock:
+            now = time.monotonic()
+            at = max(now, self._next_at)
+            self._next_at = at + self.interval
+        if at > now:
+            time.sleep(at - now)
+
+
+class ResponseCache:
+    """
+    Кэш ответов API на диске: тело и валидаторы ETag/Last-Modified, по файлу на URL
+    """
+
+    def __init__(self, path: str, ttl: float = 3600.0):
+        """
+        :param path: каталог кэша
+        :param ttl: сколько секунд ответ считается свежим и отдаётся без запроса;
+        устаревший ответ перепроверяется условным запросом
+        """
+        self.path = path
+        self.ttl = ttl
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, url: str) -> str:
+        return os.path.join(self.path, hashlib.sha256(url.encode()).hexdigest() + '.json')
+
+    def get(self, url: str) -> Optional[dict]:
+        """
+        Запись из кэша
+        :return: словарь с ключами body, etag, last_modified, stored_at или None
+        """
+        try:
+            with open(self._file(url), encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def is_fresh(self, entry: dict) -> bool:
+        return time.time() - entry['stored_at'] < self.ttl
+
+    def set(self, url: str, body, etag: str = None, last_modified: str = None):
+        """
+        Сохранить ответ. Файл пишется во временный и подменяется атомарно,
+        чтобы параллельный читатель не увидел его наполовину записанным
+        """
+        entry = {'body': body, 'etag': etag, 'last_modified': last_modified, 'stored_at': time.time()}
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as file:
+                json.dump(entry, file)
+            os.replace(tmp, self._file(url))
+        except OSError as e:
+            logging.warning(f"Scryfall cache write error: {e}")
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def touch(self, url: str, entry: dict):
+        """
+        Продлить свежесть записи после ответа 304
+        """
+        self.set(url, entry['body'], entry.get('etag'), entry.get('last_modified'))
+
 
 class Scryfall:
-    def __init__(self, url="https://api.scryfall.com/"):
+    def __init__(self, url="https://api.scryfall.com/", cache_dir: str = None, cache_ttl: float = None,
+                 rate: float = None, retries: int = 5, timeout: float = 30):
+        """
+        :param url: базовый адрес API
+        :param cache_dir: каталог дискового кэша ответов, пустая строка - без кэша
+        :param cache_ttl: сколько секунд ответ отдаётся из кэша без запроса
+        :param rate: запросов в секунду
+        :param retries: число повторов при сетевых ошибках, 429 и 5xx
+        :param timeout: таймаут запроса в секундах
+        """
         self.url = url
+        self.timeout = timeout
+        self.limiter = RateLimiter(rate if rate is not None else float(os.getenv('SCRYFALL_RATE_LIMIT', 10)))
+
+        if cache_dir is None:
+            cache_dir = os.getenv('SCRYFALL_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'cardhub-scryfall'))
+        self.cache = ResponseCache(
+            cache_dir,
+            ttl=cache_ttl if cache_ttl is not None else float(os.getenv('SCRYFALL_CACHE_TTL', 3600))
+        ) if cache_dir else None
+
+        # Одна сессия на клиента: соединение с api.scryfall.com переиспользуется (keep-alive).
+        # Повторы с экспоненциальной паузой, для 429 и 503 учитывается Retry-After
+        retry = Retry(
+            total=retries,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=('GET', 'HEAD'),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(max_retries=retry, pool_maxsize=4))
+        self.session.mount('http://', HTTPAdapter(max_retries=retry, pool_maxsize=4))
+        self.session.headers.update({
+            'User-Agent': 'Cardhub/1.0',
+            'Accept': 'application/json'
+        })
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get_json(self, url: str, params: dict = None, revalidate: bool = False):
+        """
+        GET к API с учётом ограничения частоты и дискового кэша
+        :param url: полный адрес или путь относительно базового
+        :param params: параметры запроса, кодируются в URL
+        :param revalidate: не отдавать свежую запись кэша без условного запроса
+        :return: разобранный JSON или None, если ответ не 200
+        """
+        if not url.startswith(('http://', 'https://')):
+            url = self.url + url
+        url = requests.Request('GET', url, params=params).prepare().url
+
+        entry = self.cache.get(url) if self.cache else None
+        if entry is not None and not revalidate and self.cache.is_fresh(entry):
+            return entry['body']
+
+        headers = {}
+        if entry is not None:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        self.limiter.wait()
+        response = self.session.get(url, headers=headers, timeout=self.timeout)
+
+        if response.status_code == 304 and entry is not None:
+            self.cache.touch(url, entry)
+            return entry['body']
+
+        if response.status_code != 200:
+            logging.warning(f"Scryfall request error: {response.status_code} {url}")
+            return None
+
+        body = response.json()
+        if self.cache:
+            self.cache.set(url, body, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        return body
 
     def search_card(self, card_name):
-        end_point = f"cards/search?q={card_name}"
-        request = requests.get(self.url + end_point)
+        """
+        Первая страница поиска карт
+        :param card_name: запрос в синтаксисе Scryfall
+        :return: ответ API или пустой список, если ничего не найдено
+        """
+        result = self.get_json("cards/search", params={'q': card_name})
+        return result if result is not None else []
+
+    def iter_search(self, card_name) -> Iterator[dict]:
+        """
+        Все карты по запросу: страницы выдачи загружаются по мере чтения по next_page
+        :param card_name: запрос в синтаксисе Scryfall
+        """
+        page = self.get_json("cards/search", params={'q': card_name})
+        while page:
+            yield from page.get('data', [])
+            if not page.get('has_more') or not page.get('next_page'):
+                break
+            page = self.get_json(page['next_page'])
+
+    def _download(self, uri: str, part: str, retries: int = 5):
+        """
+        Потоковая загрузка файла в part. Если part уже есть, загрузка продолжается с его конца
+        через Range; при обрыве соединения - повтор с места обрыва
+        """
+        for attempt in range(retries + 1):
+            offset = os.path.getsize(part) if os.path.exists(part) else 0
+            # identity: размер и смещения Range относятся к файлу как он лежит на сервере
+            headers = {'Accept-Encoding': 'identity'}
+            if offset:
+                headers['Range'] = f'bytes={offset}-'
+
+            self.limiter.wait()
+            try:
+                with self.session.get(uri, headers=headers, stream=True, timeout=self.timeout) as response:
+                    if response.status_code == 416:
+                        return
+                    response.raise_for_status()
+                    # Сервер мог проигнорировать Range и отдать файл целиком
+                    mode = 'ab' if response.status_code == 206 else 'wb'
+                    with open(part, mode) as file:
+                        for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                            file.write(chunk)
+                return
+            except (requests.ConnectionError, requests.exceptions.ChunkedEncodingError) as e:
+                if attempt == retries:
+                    raise
+                logging.warning(f"Bulk data download interrupted at {offset} bytes, resuming: {e}")
+                time.sleep(min(2 ** attempt, 30))
+
+    def parse_defaulte_database(self, db=None, path: str = 'Cardhub/default-cards.json',
+                                bulk_type: str = 'default-cards', force: bool = False) -> dict:
+        """
+        Загрузка выгрузки Scryfall по манифесту bulk-data и импорт в каталог.
+        Файл качается потоково с докачкой через Range и сверяется с размером (и sha256, если он есть
+        в манифесте). Если updated_at в манифесте не изменился с прошлой загрузки, ничего не делается.
+        :param db: Database, в каталог которой синхронизируется файл; без него - только загрузка
+        :param path: куда сохранить файл; рядом пишется path.meta.json с данными загруженной версии
+        :param bulk_type: тип выгрузки в bulk-data
+        :param force: скачать и импортировать, даже если версия не изменилась
+        :return: updated_at, downloaded, path, import - статистика sync_cards_from_file или None
+        """
+        manifest = self.get_json(f"bulk-data/{bulk_type}", revalidate=True)
+        if manifest is None:
+            raise RuntimeError(f"Scryfall bulk data manifest is unavailable: {bulk_type}")
+
+        meta_path = path + '.meta.json'
+        part = path + '.part'
+        meta = {}
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding='utf-8') as file:
+                meta = json.load(file)
+
+        result = {'updated_at': manifest['updated_at'], 'downloaded': False, 'path': path, 'import': None}
+
+        if (not force and meta.get('complete') and meta.get('updated_at') == manifest['updated_at']
+                and os.path.exists(path)):
+            logging.info(f"Scryfall {bulk_type} is up to date: {manifest['updated_at']}")
+            return result
+
+        # Недокачанный файл другой версии продолжать нельзя
+        if meta.get('download_uri') != manifest['download_uri'] and os.path.exists(part):
+            os.remove(part)
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        meta = {'updated_at': manifest['updated_at'], 'download_uri': manifest['download_uri'], 'complete': False}
+        _write_json(meta_path, meta)
+
+        self._download(manifest['download_uri'], part)
+
+        size = os.path.getsize(part)
+        if manifest.get('size') is not None and size != manifest['size']:
+            os.remove(part)
+            raise ValueError(f"Scryfall {bulk_type} size mismatch: {size} != {manifest['size']}")
+
+        digest = _sha256(part)
+        if manifest.get('sha256') and digest != manifest['sha256']:
+            os.remove(part)
+            raise ValueError(f"Scryfall {bulk_type} checksum mismatch: {digest}")
+
+        os.replace(part, path)
+        _write_json(meta_path, dict(meta, complete=True, size=size, sha256=digest))
+        result['downloaded'] = True
+        logging.info(f"Scryfall {bulk_type} downloaded: {size} bytes, {manifest['updated_at']}")
+
+        if db is not None:
+            result['import'] = db.sync_cards_from_file(file_path=path)
+
+        return result
+
 
-        if request.status_code == 200:
-            return request.json()
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(DOWNLOAD_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
 
-        return []
 
-    def parse_defaulte_database(self):
-        pass
\ No newline at end of file
+def _write_json(path: str, data: dict):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as file:
+        json.dump(data, file)
+    os.replace(tmp, path)
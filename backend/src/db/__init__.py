@@ -1,5 +1,6 @@
 import os
 import logging
+import threading
 from dotenv import load_dotenv
 
 import psycopg2
@@ -7,39 +8,177 @@ import psycopg2
 from contextlib import contextmanager
 from typing import Iterator, Optional
 
-from backend.src.db._queries import TABLE_CREATE
+from backend.src.db._queries import TABLE_CREATE, USER_CHANGED_CHANNEL, CATALOG_CHANGED_CHANNEL
 
 from backend.src.db._common import with_cursor
+from backend.src.db._pool import ConnectionPool
+from backend.src.db._cache import LRUCache, cached, invalidates, evicts
+from backend.src.db._cards import search_cache_key, ranked_search_cache_key, image_url_cache_key
+from backend.src.db._base_user import user_cache_key
+from backend.src.db._listener import NotificationListener
+from backend.src.db._suggest import NameIndex
 
 load_dotenv()
 
 
 class Database:
-    def __init__(self):
-        self._conn: Optional[psycopg2.extensions.connection] = None
+    def __init__(self, maxconn: int = None, timeout: float = None):
+        """
+        :param maxconn: максимальное число соединений в пуле (DB_POOL_MAX)
+        :param timeout: сколько секунд ждать свободное соединение (DB_POOL_TIMEOUT)
+        """
+        self._pool = ConnectionPool(
+            connect=self._connect,
+            maxconn=maxconn or int(os.getenv('DB_POOL_MAX', 10)),
+            timeout=timeout or float(os.getenv('DB_POOL_TIMEOUT', 30)),
+            check_interval=float(os.getenv('DB_POOL_CHECK_INTERVAL', 5))
+        )
+        self._local = threading.local()
+        self._search_cache = LRUCache(
+            maxsize=int(os.getenv('SEARCH_CACHE_SIZE', 1024)),
+            ttl=float(os.getenv('SEARCH_CACHE_TTL', 60))
+        )
+        # Пользователи по id для проверки JWT. Изменения из других процессов (бот, другие воркеры)
+        # приходят через USER_CHANGED_CHANNEL, см. listen_changes()
+        self._user_cache = LRUCache(
+            maxsize=int(os.getenv('USER_CACHE_SIZE', 10000)),
+            ttl=float(os.getenv('USER_CACHE_TTL', 60))
+        )
+        # Адреса картинок для прокси /api/cards/<id>/image: меняются только вместе с каталогом карт
+        self._image_url_cache = LRUCache(
+            maxsize=int(os.getenv('IMAGE_URL_CACHE_SIZE', 20000)),
+            ttl=float(os.getenv('IMAGE_URL_CACHE_TTL', 3600))
+        )
+        self._listener = None
+        self._name_index = NameIndex(refresh_interval=float(os.getenv('SUGGEST_REFRESH_INTERVAL', 600)))
+        self._name_index_lock = threading.Lock()
 
-    @property
-    def conn(self) -> psycopg2.extensions.connection:
+    @staticmethod
+    def _connect() -> psycopg2.extensions.connection:
         """
-        Подключение к базе данных
+        Новое подключение к базе данных
         :return: psycopg2.extensions.connection
         """
         try:
-            if self._conn is None or self._conn.closed:
-                self._conn = psycopg2.connect(
-                    host=os.getenv('PGHOST'),
-                    database=os.getenv('PGDATABASE'),
-                    user=os.getenv('PGUSER'),
-                    password=os.getenv('PGPASSWORD'),
-                    port=os.getenv('DB_PORT')
-                )
-                print("Connected to PostgreSQL successfully")
-                logging.info("Connected to PostgreSQL successfully")
-
-            return self._conn
+            conn = psycopg2.connect(
+                host=os.getenv('PGHOST'),
+                database=os.getenv('PGDATABASE'),
+                user=os.getenv('PGUSER'),
+                password=os.getenv('PGPASSWORD'),
+                port=os.getenv('DB_PORT')
+            )
+            logging.info("Connected to PostgreSQL successfully")
+
+            return conn
         except Exception as e:
             print(f"Connection error: {e}")
             logging.error(f"Connection error: {e}")
+            raise
+
+    @property
+    def _conn(self) -> Optional[psycopg2.extensions.connection]:
+        """
+        Соединение, выданное текущему потоку (внутри cursor() или через conn)
+        """
+        if getattr(self._local, 'pid', None) != os.getpid():
+            return None
+        return getattr(self._local, 'conn', None)
+
+    @_conn.setter
+    def _conn(self, conn: Optional[psycopg2.extensions.connection]):
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+
+    @property
+    def conn(self) -> psycopg2.extensions.connection:
+        """
+        Подключение к базе данных, закреплённое за текущим потоком до release() или выхода из контекста
+        :return: psycopg2.extensions.connection
+        """
+        if self._conn is not None and self._conn.closed:
+            self.release(discard=True)
+        if self._conn is None:
+            self._conn = self._pool.getconn()
+
+        return self._conn
+
+    def release(self, discard: bool = False):
+        """
+        Вернуть в пул соединение, закреплённое за текущим потоком
+        :param discard: закрыть соединение вместо возврата
+        """
+        conn = self._conn
+        if conn is not None:
+            self._conn = None
+            self._pool.putconn(conn, discard=discard)
+
+    def pool_stats(self) -> dict:
+        """
+        Статистика пула соединений
+        :return: размер пула, занятые и ожидающие соединения, время ожидания
+        """
+        return self._pool.stats()
+
+    def cache_stats(self) -> dict:
+        """
+        Счётчики кэшей
+        :return: словарь имя кэша -> статистика
+        """
+        return {'search': self._search_cache.stats(), 'users': self._user_cache.stats(),
+                'image_urls': self._image_url_cache.stats()}
+
+    def invalidate_search_cache(self):
+        """
+        Сбросить кэш поиска карт, вызывается при изменении каталога или склада
+        """
+        self._search_cache.clear()
+
+    def invalidate_user(self, uuid: int):
+        """
+        Сбросить пользователя в кэше get_user_by_id
+        """
+        self._user_cache.pop(('get_user_by_id', user_cache_key(uuid)))
+
+    def _on_user_changed(self, payload: str):
+        try:
+            self.invalidate_user(payload)
+        except ValueError:
+            self._user_cache.clear()
+
+    def _on_catalog_changed(self, payload: str):
+        self._search_cache.clear()
+        if payload == 'cards':
+            self._image_url_cache.clear()
+            self._name_index.clear()
+
+    def _on_subscribe(self):
+        self._user_cache.clear()
+        self._search_cache.clear()
+        self._image_url_cache.clear()
+
+    def listen_changes(self):
+        """
+        Запустить фоновую подписку на USER_CHANGED_CHANNEL и CATALOG_CHANGED_CHANNEL. Пока подписки нет
+        (ещё не подключилась или соединение потеряно), изменения из других процессов видны с задержкой
+        до USER_CACHE_TTL, SEARCH_CACHE_TTL, IMAGE_URL_CACHE_TTL и SUGGEST_REFRESH_INTERVAL; после каждой
+        переподписки кэши пользователей, поиска и адресов картинок сбрасываются целиком.
+        """
+        if self._listener is None:
+            self._listener = NotificationListener(
+                connect=self._connect,
+                handlers={USER_CHANGED_CHANNEL: self._on_user_changed,
+                          CATALOG_CHANGED_CHANNEL: self._on_catalog_changed},
+                on_subscribe=self._on_subscribe
+            )
+        self._listener.start()
+
+    def close(self):
+        """
+        Закрыть пул соединений и остановить подписку на уведомления; вызывается при остановке процесса
+        """
+        if self._listener is not None:
+            self._listener.stop()
+        self._pool.closeall()
 
     def __enter__(self):
         """
@@ -50,36 +189,49 @@ class Database:
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         """
-        Выход из контекста
+        Выход из контекста: фиксация или откат транзакции закреплённого соединения и его освобождение.
+        Пул остаётся открытым, его закрывает close() при остановке процесса
         :param exc_type: тип ошибки
         """
-        if self._conn and not self._conn.closed:
+        conn = self._conn
+        if conn and not conn.closed:
             if exc_type is None:
-                self._conn.commit()
+                conn.commit()
             else:
-                self._conn.rollback()
-            self._conn.close()
+                conn.rollback()
+        self.release(discard=True)
 
     @contextmanager
     def cursor(self) -> Iterator[psycopg2.extensions.cursor]:
         """
-        Контекст для менеджера курсора
+        Контекст для менеджера курсора. Соединение берётся из пула на время вызова;
+        вложенные вызовы в том же потоке используют уже выданное соединение
+        и не фиксируют транзакцию сами.
         :yield: курсор
         """
-        with self.conn.cursor() as cursor:
-            try:
+        conn = self._conn
+        if conn is not None and not conn.closed:
+            with conn.cursor() as cursor:
                 yield cursor
-                self._conn.commit()
-            except Exception:
-                self.conn.rollback()
-                raise
+            return
+
+        with self._pool.connection() as conn:
+            self._conn = conn
+            try:
+                with conn.cursor() as cursor:
+                    try:
+                        yield cursor
+                        conn.commit()
+                    except Exception:
+                        conn.rollback()
+                        raise
             finally:
-                cursor.close()
+                self._conn = None
 
     @with_cursor
     def create_tables(self, cursor):
         """
-        Создание таблиц базы данных
+        Создание таблиц базы данных. Изменения уже созданных таблиц и индексы применяет migrate()
         """
         try:
             for table, query in TABLE_CREATE.items():
@@ -90,38 +242,52 @@ class Database:
             print(f"Create tables error: {e}")
             logging.error(f"Create tables error: {e}")
 
-    @with_cursor
-    def set_indexs(self, cursor):
-        try:
-            self._conn.autocommit = True
-            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
-
-            transactions = [
-                "CREATE INDEX CONCURRENTLY idx_cards_name_gin_trgm ON cards USING gin (name gin_trgm_ops);",
-                "CREATE INDEX CONCURRENTLY idx_cards_set_code ON cards(set_code);",
-                "CREATE INDEX CONCURRENTLY idx_cards_card_type ON cards(card_type);",
-                "CREATE INDEX CONCURRENTLY idx_cards_color ON cards(color);"
-            ]
-
-            for tran in transactions:
-                cursor.execute(tran)
+    def set_indexs(self):
+        """
+        Индексы создаются миграциями, см. migrate()
+        """
+        return self.migrate()
 
-        except Exception as e:
-            print(f"Error in set indexses error: {e}")
-            logging.error(f"Error in set indexses error: {e}")
-            self._conn.rollback()
-        finally:
-            self._conn.autocommit = False
+    """ ---- Migrations ---- """
+    from backend.src.db._migrations import migrate, migration_status, check_query_plans
 
     """ ---- Cards ---- """
     from backend.src.db._cards import add_cards_from_file, transform_card_data, search_card, search_cards_with_inventory
+    from backend.src.db._cards import sync_cards_from_file, search_card_ranked, get_card_image_url
+
+    search_card = cached('_search_cache', search_cache_key)(search_card)
+    search_cards_with_inventory = cached('_search_cache', search_cache_key)(search_cards_with_inventory)
+    search_card_ranked = cached('_search_cache', ranked_search_cache_key)(search_card_ranked)
+    get_card_image_url = cached('_image_url_cache', image_url_cache_key)(get_card_image_url)
+    add_cards_from_file = invalidates('_search_cache', '_image_url_cache', '_name_index')(add_cards_from_file)
+    sync_cards_from_file = invalidates('_search_cache', '_image_url_cache', '_name_index')(sync_cards_from_file)
+
+    from backend.src.db._suggest import load_card_names, refresh_card_names, suggest_card_names
+
+    """ ---- Inventory ---- """
+    from backend.src.db._inventory import rebuild_inventory_summary, get_top_stocked_card_images
+
+    rebuild_inventory_summary = invalidates('_search_cache')(rebuild_inventory_summary)
+
+    """ ---- Card requests ---- """
+    from backend.src.db._requests import match_card_requests, match_all_card_requests
+
+    """ ---- Cart ---- """
+    from backend.src.db._cart import get_cart, add_cart_item, set_cart_item_quantity, remove_cart_item, clear_cart
 
     """ ---- Base_user  ---- """
     from backend.src.db._base_user import register_new_user, get_user, get_user_by_id, update_telegram_username
-    from backend.src.db._base_user import update_username
+    from backend.src.db._base_user import update_username, update_password_hash, update_user
+
+    get_user_by_id = cached('_user_cache', user_cache_key)(get_user_by_id)
+    update_telegram_username = evicts('_user_cache', 'get_user_by_id', user_cache_key)(update_telegram_username)
+    update_username = evicts('_user_cache', 'get_user_by_id', user_cache_key)(update_username)
+    update_password_hash = evicts('_user_cache', 'get_user_by_id', user_cache_key)(update_password_hash)
+    update_user = evicts('_user_cache', 'get_user_by_id', user_cache_key)(update_user)
 
 
 if __name__ == '__main__':
     db = Database()
     db.create_tables()
+    db.migrate()
 
@@ -0,0 +1,86 @@
+import sys
+import time
+import argparse
+import logging
+
+from contextlib import closing
+
+from backend.src.db import Database
+from backend.src.api.scryfall import Scryfall
+from backend.src.api.images import ImageCache
+
+
+def main():
+    """
+    Служебные команды базы данных: python -m backend.src.db <команда>
+    """
+    parser = argparse.ArgumentParser(prog='python -m backend.src.db')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('create-tables', help='создать таблицы')
+    migrate = commands.add_parser('migrate', help='создать таблицы и применить миграции схемы')
+    migrate.add_argument('--target', type=int, help='последняя применяемая версия')
+    migrate.add_argument('--check', action='store_true',
+                         help='не применять миграции, а проверить планы горячих запросов на Seq Scan')
+    commands.add_parser('migration-status', help='показать применённые миграции')
+    commands.add_parser('rebuild-inventory-summary', help='пересчитать сводку по складу card_inventory_summary')
+    match = commands.add_parser('match-card-requests', help='сопоставить заявки card_requests с поступлениями на склад')
+    match.add_argument('--batch-size', type=int, default=1000, help='записей очереди за транзакцию')
+    match.add_argument('--interval', type=float, help='повторять каждые N секунд, без него - один проход')
+    sync = commands.add_parser('sync-scryfall', help='скачать выгрузку Scryfall, если она обновилась, и синхронизировать каталог')
+    sync.add_argument('--path', default='Cardhub/default-cards.json', help='куда сохранить выгрузку')
+    sync.add_argument('--force', action='store_true', help='скачать и импортировать, даже если версия не изменилась')
+    prefetch = commands.add_parser('prefetch-images', help='прогреть кэш картинок для карт, которых больше всего на складе')
+    prefetch.add_argument('--limit', type=int, default=500, help='сколько карт взять')
+    prefetch.add_argument('--size', default='normal', help='размер картинки: small, normal, large')
+    prefetch.add_argument('--workers', type=int, default=8, help='число параллельных загрузок')
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    # Выход из контекста Database фиксирует транзакцию, closing() затем закрывает пул
+    with closing(Database()) as db, db:
+        if args.command == 'create-tables':
+            db.create_tables()
+        elif args.command == 'migrate' and args.check:
+            failed = False
+            for result in db.check_query_plans():
+                if result['error']:
+                    status = f"ERROR {result['error'].strip()}"
+                    failed = True
+                elif result['seq_scans']:
+                    status = f"SEQ SCAN on {', '.join(result['seq_scans'])}"
+                    failed = True
+                else:
+                    status = 'ok'
+                print(f"{result['query']}: {status}")
+            if failed:
+                sys.exit(1)
+        elif args.command == 'migrate':
+            db.create_tables()
+            applied = db.migrate(target=args.target)
+            print(f"Applied migrations: {', '.join(map(str, applied)) or 'none'}")
+        elif args.command == 'migration-status':
+            for migration in db.migration_status():
+                print(f"{migration['version']:>4} {migration['name']:<40} {migration['applied_at'] or 'pending'}")
+        elif args.command == 'rebuild-inventory-summary':
+            print(f"Cards in stock: {db.rebuild_inventory_summary()}")
+        elif args.command == 'match-card-requests':
+            while True:
+                print(f"Card requests matched: {db.match_all_card_requests(batch_size=args.batch_size)}")
+                if args.interval is None:
+                    break
+                time.sleep(args.interval)
+        elif args.command == 'sync-scryfall':
+            with Scryfall() as scryfall:
+                result = scryfall.parse_defaulte_database(db=db, path=args.path, force=args.force)
+            print(f"Scryfall {result['updated_at']}: downloaded={result['downloaded']} import={result['import']}")
+        elif args.command == 'prefetch-images':
+            images = db.get_top_stocked_card_images(limit=args.limit, size=args.size)
+            image_cache = ImageCache()
+            stats = image_cache.prefetch((url for _, url in images), workers=args.workers)
+            print(f"Images prefetched: {stats}, cache: {image_cache.stats()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,16 +1,39 @@
 import logging
 
+from psycopg2 import errors
+from psycopg2.extras import Json
+
 from backend.src.db._common import with_cursor
-from backend.src.db._classes import User
+from backend.src.db._classes import User, USER_AUTH_FIELDS, USER_PROFILE_FIELDS, USER_UPDATE_FIELDS
+from backend.src.db._classes import USER_UNIQUE_FIELDS
+from backend.src.db._queries import TG_VERIFICATION_CHANNEL, USER_CHANGED_CHANNEL, select_user
+
+
+def user_cache_key(uuid, *args, **kwargs) -> int:
+    """
+    Ключ кэша пользователя: id из JWT приходит строкой, из базы и бота - числом
+    """
+    return int(uuid)
+
+
+def notify_user_changed(cursor, uuid: int):
+    """
+    Уведомление USER_CHANGED_CHANNEL уходит при фиксации транзакции: другие процессы сбрасывают
+    пользователя в кэше get_user_by_id. При откате оно не отправляется.
+    """
+    cursor.execute("SELECT pg_notify(%s, %s)", (USER_CHANGED_CHANNEL, str(uuid)))
 
 
 @with_cursor
 def register_new_user(self, cursor, username: str, email: str, password_hash: str) -> bool:
     try:
         cursor.execute(
-            "INSERT INTO users (username, email, password_hash) VALUES (%s, %s, %s)",
+            "INSERT INTO users (username, email, password_hash) VALUES (%s, %s, %s) RETURNING id",
             (username, email, password_hash)
         )
+        uuid = cursor.fetchone()[0]
+        notify_user_changed(cursor, uuid)
+        self.invalidate_user(uuid)
 
         return True
     except Exception as e:
@@ -22,12 +45,15 @@ def register_new_user(self, cursor, username: str, email: str, password_hash: st
 
 
 @with_cursor
-def get_user(self, cursor, email: str) -> User or None:
+def get_user(self, cursor, email: str, fields: tuple = USER_AUTH_FIELDS) -> User or None:
+    """
+    Пользователь по email
+    :param fields: столбцы users, по умолчанию только нужные для входа
+    """
     try:
-        cursor.execute("SELECT * FROM users WHERE email = %s", (email,))
-        user_data = cursor.fetchone()
+        cursor.execute(select_user(User.columns(fields), 'email'), (email,))
 
-        return User(user_data) if user_data is not None else None
+        return User.fetchone(cursor)
 
     except Exception as e:
         print(f"Error in get_user err: {e}")
@@ -36,11 +62,13 @@ def get_user(self, cursor, email: str) -> User or None:
 
 @with_cursor
 def get_user_by_id(self, cursor, uuid: int) -> User or None:
+    """
+    Профиль пользователя (USER_PROFILE_FIELDS) по id, без хэша пароля
+    """
     try:
-        cursor.execute("SELECT * FROM users WHERE id = %s", (uuid,))
-        user = User(cursor.fetchone())
+        cursor.execute(select_user(User.columns(USER_PROFILE_FIELDS), 'id'), (uuid,))
 
-        return user
+        return User.fetchone(cursor)
     except Exception as e:
         print(f"Error in get_user err: {e}")
         logging.error(f"Error in get_user err: {e}")
@@ -49,7 +77,18 @@ def get_user_by_id(self, cursor, uuid: int) -> User or None:
 @with_cursor
 def update_telegram_username(self, cursor, uuid: int, telegram_username: str):
     try:
-        cursor.execute("UPDATE users SET telegram_username = %s WHERE id = %s", (telegram_username, uuid,))
+        # Уведомление о старом и новом username уходит при фиксации транзакции, бот сбрасывает их в кэше
+        cursor.execute("""
+            WITH old AS (SELECT id, telegram_username FROM users WHERE id = %s FOR UPDATE),
+            updated AS (
+                UPDATE users u SET telegram_username = %s FROM old WHERE u.id = old.id
+                RETURNING old.telegram_username AS old_username, u.telegram_username
+            )
+            SELECT pg_notify(%s, v.name)
+            FROM updated, LATERAL (VALUES (updated.old_username), (updated.telegram_username)) v(name)
+            WHERE v.name IS NOT NULL
+        """, (uuid, telegram_username, TG_VERIFICATION_CHANNEL))
+        notify_user_changed(cursor, uuid)
     except Exception as e:
         print(f"Error in update_telegram_username err: {e}")
         logging.error(f"Error in update_telegram_username err: {e}")
@@ -59,6 +98,86 @@ def update_telegram_username(self, cursor, uuid: int, telegram_username: str):
 def update_username(self, cursor, uuid: int, username: str):
     try:
         cursor.execute("UPDATE users SET username = %s WHERE id = %s", (username, uuid,))
+        notify_user_changed(cursor, uuid)
     except Exception as e:
         print(f"Error in update_telegram_username err: {e}")
-        logging.error(f"Error in update_telegram_username err: {e}")
\ No newline at end of file
+        logging.error(f"Error in update_telegram_username err: {e}")
+
+
+@with_cursor
+def update_password_hash(self, cursor, uuid: int, password_hash: str):
+    try:
+        cursor.execute("UPDATE users SET password_hash = %s WHERE id = %s", (password_hash, uuid))
+        notify_user_changed(cursor, uuid)
+    except Exception as e:
+        print(f"Error in update_password_hash err: {e}")
+        logging.error(f"Error in update_password_hash err: {e}")
+
+
+@with_cursor
+def update_user(self, cursor, uuid: int, **fields) -> tuple:
+    """
+    Изменить любые поля из USER_UPDATE_FIELDS одним UPDATE ... RETURNING.
+    Занятость уникальных значений проверяется в том же запросе, и если что-то занято, строка не меняется.
+    :param fields: столбец -> новое значение
+    :raise ValueError: поле нельзя менять или поля не переданы
+    :return: (профиль USER_PROFILE_FIELDS или None, если пользователя нет или есть конфликты,
+    список полей с уже занятыми значениями)
+    """
+    unknown = [field for field in fields if field not in USER_UPDATE_FIELDS]
+    if unknown or not fields:
+        raise ValueError(f"Fields can not be updated: {', '.join(unknown) or 'none given'}")
+
+    params = dict(fields, id=uuid, user_channel=USER_CHANGED_CHANNEL, tg_channel=TG_VERIFICATION_CHANNEL)
+    if params.get('shipping_address') is not None:
+        params['shipping_address'] = Json(params['shipping_address'])
+
+    checks = ', '.join(
+        f"CASE WHEN EXISTS (SELECT 1 FROM users WHERE {field} = %({field})s AND id <> %(id)s) THEN '{field}' END"
+        for field in fields if field in USER_UNIQUE_FIELDS
+    )
+    assignments = ', '.join(f"{field} = %({field})s" for field in fields)
+    returning = ', '.join(f"u.{field}" for field in USER_PROFILE_FIELDS)
+
+    # Уведомление TG_VERIFICATION_CHANNEL о старом и новом username, как в update_telegram_username,
+    # и USER_CHANGED_CHANNEL о пользователе уходят при фиксации транзакции
+    query = f"""
+        WITH conflicts AS (
+            SELECT array_remove(ARRAY[{checks}]::text[], NULL) AS fields
+        ),
+        old AS (
+            SELECT id, telegram_username FROM users
+            WHERE id = %(id)s AND cardinality((SELECT fields FROM conflicts)) = 0
+            FOR UPDATE
+        ),
+        updated AS (
+            UPDATE users u SET {assignments}, updated_at = CURRENT_TIMESTAMP
+            FROM old WHERE u.id = old.id
+            RETURNING {returning}, old.telegram_username AS old_telegram_username
+        )
+        SELECT
+            (SELECT fields FROM conflicts),
+            {', '.join(f"updated.{field}" for field in USER_PROFILE_FIELDS)},
+            CASE WHEN updated.id IS NOT NULL THEN pg_notify(%(user_channel)s, updated.id::text) END,
+            CASE WHEN updated.old_telegram_username IS DISTINCT FROM updated.telegram_username
+                AND updated.old_telegram_username IS NOT NULL
+                THEN pg_notify(%(tg_channel)s, updated.old_telegram_username) END,
+            CASE WHEN updated.old_telegram_username IS DISTINCT FROM updated.telegram_username
+                AND updated.telegram_username IS NOT NULL
+                THEN pg_notify(%(tg_channel)s, updated.telegram_username) END
+        FROM (SELECT 1) one
+        LEFT JOIN updated ON TRUE
+    """
+    try:
+        cursor.execute(query, params)
+    except errors.UniqueViolation as e:
+        # Значение заняли между проверкой и UPDATE
+        self._conn.rollback()
+        constraint = e.diag.constraint_name or ''
+        return None, [field for field in USER_UNIQUE_FIELDS if constraint == f'users_{field}_key']
+
+    row = cursor.fetchone()
+    if row[1] is None:
+        return None, row[0]
+
+    return User.from_row(USER_PROFILE_FIELDS, row[1:]), row[0]
@@ -0,0 +1,180 @@
+import time
+import threading
+
+from collections import OrderedDict
+from functools import wraps
+from typing import Callable, Hashable
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Потокобезопасный кэш с ограниченным размером, вытеснением LRU и временем жизни записей
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        """
+        :param maxsize: максимальное число записей
+        :param ttl: время жизни записи в секундах
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+        self._generation = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    @property
+    def generation(self) -> int:
+        """
+        Номер поколения, растёт при каждой инвалидации. Значение, посчитанное до инвалидации,
+        не попадёт в кэш, если передать в set() поколение на момент начала расчёта.
+        """
+        return self._generation
+
+    def get(self, key: Hashable, default=None):
+        """
+        Значение из кэша
+        :return: значение или default, если записи нет или она устарела
+        """
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self._hits += 1
+                    return value
+                del self._data[key]
+                self._expirations += 1
+            self._misses += 1
+            return default
+
+    def set(self, key: Hashable, value, generation: int = None):
+        """
+        Положить значение в кэш
+        :param generation: поколение, в котором значение было посчитано
+        """
+        if self.maxsize <= 0:
+            return
+
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._evictions += 1
+
+    def pop(self, key: Hashable):
+        """
+        Удалить запись
+        """
+        with self._lock:
+            self._generation += 1
+            self._data.pop(key, None)
+
+    def clear(self):
+        """
+        Удалить все записи
+        """
+        with self._lock:
+            self._generation += 1
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        """
+        Счётчики кэша
+        :return: размер, попадания, промахи, вытеснения и доля попаданий
+        """
+        with self._lock:
+            requests = self._hits + self._misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'expirations': self._expirations,
+                'hit_rate': self._hits / requests if requests else 0.0,
+            }
+
+
+def cached(cache_attr: str, key: Callable) -> Callable:
+    """
+    Декоратор метода Database: результат кэшируется в self.<cache_attr>.
+    None (ошибка запроса или отсутствующая запись) не кэшируется.
+    :param cache_attr: имя атрибута с LRUCache
+    :param key: функция (*args, **kwargs) -> ключ кэша, к нему добавляется имя метода
+    """
+
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(self, *args, **kwargs):
+            cache: LRUCache = getattr(self, cache_attr)
+            cache_key = (func.__name__, key(*args, **kwargs))
+
+            value = cache.get(cache_key, _MISSING)
+            if value is not _MISSING:
+                return value
+
+            generation = cache.generation
+            value = func(self, *args, **kwargs)
+            if value is not None:
+                cache.set(cache_key, value, generation)
+
+            return value
+
+        return wrapper
+
+    return decorator
+
+
+def invalidates(*cache_attrs: str) -> Callable:
+    """
+    Декоратор метода Database: после выполнения (и фиксации транзакции) очищает кэши self.<cache_attrs>
+    """
+
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(self, *args, **kwargs):
+            try:
+                return func(self, *args, **kwargs)
+            finally:
+                for cache_attr in cache_attrs:
+                    getattr(self, cache_attr).clear()
+
+        return wrapper
+
+    return decorator
+
+
+def evicts(cache_attr: str, method: str, key: Callable) -> Callable:
+    """
+    Декоратор метода Database: после выполнения (и фиксации транзакции) удаляет из self.<cache_attr>
+    одну запись, которую cached() сохранил для метода method
+    :param method: имя кэшируемого метода
+    :param key: функция (*args, **kwargs) декорируемого метода -> ключ кэша method
+    """
+
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(self, *args, **kwargs):
+            try:
+                return func(self, *args, **kwargs)
+            finally:
+                getattr(self, cache_attr).pop((method, key(*args, **kwargs)))
+
+        return wrapper
+
+    return decorator
@@ -1,29 +1,308 @@
+import io
+import os
+import gzip
 import json
+import time
+import hashlib
 import logging
 
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import IO, Iterator
+
 from tqdm import tqdm
 
-from backend.src.db._common import with_cursor
+from backend.src.db._common import with_cursor, iter_json_array
+from backend.src.db._classes import Card
+from backend.src.db._queries import CATALOG_CHANGED_CHANNEL, CARD_PRINTING_KEY, CARD_NAME_MATCH, CARD_SEARCH_KEY
+from backend.src.db._queries import INVENTORY_SUMMARY_JOIN, RANKED_CARD_SEARCH
+
+
+CARD_COLUMNS = ('color', 'set_code', 'set_name', 'collector_number', 'name',
+                'card_type', 'image_url_small', 'image_url_normal', 'image_url_large')
+
+# Колонки, которые пишет импорт: данные карты и хэш их содержимого
+IMPORT_COLUMNS = CARD_COLUMNS + ('content_hash',)
+
+_COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+# Колонки карты в результатах поиска
+SEARCH_COLUMNS = ('id',) + CARD_COLUMNS + ('created_at', 'updated_at')
+
+# Поля наличия на складе из card_inventory_summary s
+INVENTORY_FIELDS = {
+    'total_quantity': 'COALESCE(s.total_quantity, 0)',
+    'min_price': 's.min_price',
+    'available_qualities': 's.available_qualities'
+}
+
+# Поля, которые можно запросить у поиска, и их выражения в SQL
+SEARCH_FIELDS = dict({column: f'c.{column}' for column in SEARCH_COLUMNS}, **INVENTORY_FIELDS)
+
+# Поля ключа keyset-пагинации (name, set_name, id) выбираются всегда
+KEY_FIELDS = ('id', 'name', 'set_name')
+
+SEARCH_COUNT_MODES = ('exact', 'estimate', 'none')
+
+# Размеры картинок карты, у каждого своя колонка image_url_<размер>
+IMAGE_SIZES = ('small', 'normal', 'large')
+
+# Порог сходства pg_trgm по умолчанию, как у самого расширения
+DEFAULT_SIMILARITY_THRESHOLD = 0.3
+
+_SYNC_UPSERT = f"""
+    WITH upserted AS (
+        INSERT INTO cards ({', '.join(IMPORT_COLUMNS)})
+        SELECT {', '.join(IMPORT_COLUMNS)} FROM cards_sync_stage
+        ON CONFLICT ({', '.join(CARD_PRINTING_KEY)}) DO UPDATE SET
+            {', '.join(f'{column} = EXCLUDED.{column}' for column in IMPORT_COLUMNS)},
+            updated_at = CURRENT_TIMESTAMP
+        WHERE cards.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+        RETURNING (xmax = 0) AS inserted
+    )
+    SELECT COUNT(*) FILTER (WHERE inserted), COUNT(*) FILTER (WHERE NOT inserted) FROM upserted
+"""
+
+
+def open_cards_file(file_path: str) -> IO[str]:
+    """
+    Открывает файл выгрузки Scryfall, в том числе сжатый gzip
+    :param file_path: путь к .json или .json.gz
+    :return: текстовый файл
+    """
+    with open(file_path, 'rb') as file:
+        is_gzip = file.read(2) == b'\x1f\x8b'
+
+    if is_gzip:
+        return gzip.open(file_path, 'rt', encoding='UTF-8')
+    return open(file_path, 'r', encoding='UTF-8')
+
+
+def card_content_hash(values) -> str:
+    """
+    Хэш содержимого строки карты: по нему синхронизация понимает, изменилась ли печать
+    :param values: значения колонок CARD_COLUMNS
+    :return: md5 в hex
+    """
+    data = '\x1f'.join('' if value is None else str(value) for value in values)
+    return hashlib.md5(data.encode('UTF-8'), usedforsecurity=False).hexdigest()
+
+
+def _iter_raw_cards(file_path: str) -> Iterator:
+    """
+    Потоково читает карты из файла выгрузки. Выгрузки Scryfall пишут по одной карте на строку,
+    такие строки отдаются как есть и разбираются уже в процессах-обработчиках.
+    Файлы другого вида разбираются здесь же и отдаются словарями.
+    """
+    with open_cards_file(file_path) as file:
+        head = file.readline().strip(), file.readline().strip().rstrip(',')
+        line_per_card = head[0].lstrip('\ufeff') == '[' and head[1].startswith('{') and head[1].endswith('}')
+        file.seek(0)
+
+        if not line_per_card:
+            yield from iter_json_array(file)
+            return
+
+        for line in file:
+            line = line.strip().lstrip('\ufeff')
+            if line in ('', '[', ']'):
+                continue
+            yield line[:-1] if line.endswith(',') else line
+
+
+def _transform_chunk(chunk: list) -> list:
+    """
+    Преобразует пачку карт в строки для IMPORT_COLUMNS, выполняется в процессе-обработчике
+    :param chunk: карты - словари или JSON-строки
+    :return: строки с хэшем содержимого
+    """
+    rows = []
+    for card in chunk:
+        if isinstance(card, str):
+            card = json.loads(card)
+        values = tuple(transform_card_data(None, card).values())
+        rows.append(values + (card_content_hash(values),))
+
+    return rows
+
+
+def _iter_parallel_batches(file_path: str, batch_size: int, workers: int) -> Iterator[list]:
+    """
+    Раздаёт пачки карт пулу процессов и отдаёт результаты в исходном порядке.
+    В работе держится не больше 2 * workers пачек, чтобы чтение файла не убегало вперёд записи.
+    """
+    cards = _iter_raw_cards(file_path)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        while chunk := list(islice(cards, batch_size)):
+            pending.append(executor.submit(_transform_chunk, chunk))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _iter_card_batches(self, file_path: str, batch_size: int, workers: int = None) -> Iterator[list]:
+    """
+    Потоково читает файл выгрузки и отдаёт пачки строк для IMPORT_COLUMNS
+    :param workers: число процессов для преобразования карт (CARDS_IMPORT_WORKERS), 1 - в текущем процессе
+    """
+    workers = workers or int(os.getenv('CARDS_IMPORT_WORKERS', 1))
+
+    if workers > 1:
+        batches = _iter_parallel_batches(file_path, batch_size, workers)
+    else:
+        batches = _iter_serial_batches(self, file_path, batch_size)
+
+    with tqdm(unit=' cards') as progress:
+        for batch in batches:
+            yield batch
+            progress.update(len(batch))
+
+
+def _iter_serial_batches(self, file_path: str, batch_size: int) -> Iterator[list]:
+    with open_cards_file(file_path) as file:
+        batch = []
+        for card in iter_json_array(file):
+            values = tuple(self.transform_card_data(card).values())
+            batch.append(values + (card_content_hash(values),))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+def _copy_row(values) -> str:
+    """Строка для COPY ... FROM STDIN в текстовом формате"""
+    return '\t'.join('\\N' if value is None else str(value).translate(_COPY_ESCAPES) for value in values)
+
+
+def _copy_rows(cursor, table: str, rows: list):
+    buffer = io.StringIO()
+    buffer.writelines(_copy_row(row) + '\n' for row in rows)
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(IMPORT_COLUMNS)}) FROM STDIN", buffer)
+
+
+def _copy_cards(cursor, rows: list):
+    """
+    Загружает пачку строк через COPY. Если пачка не проходит целиком (например, печати уже загружены),
+    строки вставляются по одной: уже загруженные печати пропускаются по ON CONFLICT, ошибочные строки -
+    с записью в лог. Обновить уже загруженные печати может только sync_cards_from_file.
+    :return: число добавленных строк
+    """
+    cursor.execute("SAVEPOINT cards_batch")
+    try:
+        _copy_rows(cursor, 'cards', rows)
+        cursor.execute("RELEASE SAVEPOINT cards_batch")
+        return len(rows)
+    except Exception as e:
+        cursor.execute("ROLLBACK TO SAVEPOINT cards_batch")
+        cursor.execute("RELEASE SAVEPOINT cards_batch")
+        logging.warning(f"COPY batch failed, falling back to row inserts. Error: {e}")
+
+    added = 0
+    for row in rows:
+        cursor.execute("SAVEPOINT cards_row")
+        try:
+            cursor.execute(f"""INSERT INTO cards ({', '.join(IMPORT_COLUMNS)}) VALUES
+                ({', '.join(['%s'] * len(IMPORT_COLUMNS))})
+                ON CONFLICT ({', '.join(CARD_PRINTING_KEY)}) DO NOTHING""", row)
+            added += cursor.rowcount
+            cursor.execute("RELEASE SAVEPOINT cards_row")
+        except Exception as e:
+            cursor.execute("ROLLBACK TO SAVEPOINT cards_row")
+            cursor.execute("RELEASE SAVEPOINT cards_row")
+            logging.error(f"Can't add card: {row} Error: {e}")
+
+    return added
+
+
+def notify_catalog_changed(cursor, scope: str):
+    """
+    Уведомление CATALOG_CHANGED_CHANNEL уходит при фиксации транзакции: другие процессы обновляют
+    то, что построено по каталогу. При откате оно не отправляется.
+    :param scope: что изменилось: 'cards' - карты каталога, 'inventory' - склад
+    """
+    cursor.execute("SELECT pg_notify(%s, %s)", (CATALOG_CHANGED_CHANNEL, scope))
+
+
+def _import_stats(stats: dict, started: float) -> dict:
+    seconds = time.perf_counter() - started
+    stats.update(seconds=seconds, rows_per_second=stats['rows'] / seconds if seconds else 0.0)
+    logging.info(f"Imported cards: {stats} ({stats['rows_per_second']:.0f} rows/s)")
+
+    return stats
 
 
 @with_cursor
-def add_cards_from_file(self, cursor, file_path: str = 'Cardhub/default-cards.json'):
+def add_cards_from_file(self, cursor, file_path: str = 'Cardhub/default-cards.json', batch_size: int = 5000,
+                        workers: int = None) -> dict:
+    """
+    Импорт карт из выгрузки Scryfall (default-cards.json или .json.gz).
+    Файл разбирается потоково и грузится пачками через COPY, поэтому память не растёт с размером файла.
+    :param file_path: путь к файлу выгрузки
+    :param batch_size: число строк в одной пачке COPY
+    :param workers: число процессов для преобразования карт (CARDS_IMPORT_WORKERS)
+    :return: статистика импорта: rows, seconds, rows_per_second
+    """
+    started = time.perf_counter()
+    stats = {'rows': 0}
+
     try:
-        with open(file_path, 'r', encoding='UTF-8') as file:
-            cards = json.load(file)
-            for card in tqdm(cards):
-                card_data = tuple(self.transform_card_data(card).values())
-                try:
-                    cursor.execute("""INSERT INTO cards (color, set_code, set_name, collector_number, name, 
-                        card_type, image_url_small, image_url_normal, image_url_large) VALUES
-                        (%s, %s, %s, %s, %s, %s, %s, %s, %s)""", card_data)
-                except Exception as e:
-                    self._conn.rollback()
-                    logging.error(f"Can't add card: {card_data} Error: {e}")
+        for batch in _iter_card_batches(self, file_path, batch_size, workers):
+            stats['rows'] += _copy_cards(cursor, batch)
     except Exception as e:
         print(f"Error in parse/open file with default-cards.json. error: {e}")
         logging.error(f"Error in parse/open file with default-cards.json. error: {e}")
 
+    if stats['rows']:
+        notify_catalog_changed(cursor, 'cards')
+
+    return _import_stats(stats, started)
+
+
+@with_cursor
+def sync_cards_from_file(self, cursor, file_path: str = 'Cardhub/default-cards.json', batch_size: int = 5000,
+                         workers: int = None) -> dict:
+    """
+    Повторная синхронизация каталога с выгрузкой Scryfall. Печати сопоставляются по (set_code, collector_number),
+    перезаписываются только новые и изменившиеся по content_hash строки.
+    :param file_path: путь к файлу выгрузки
+    :param batch_size: число строк в одной пачке
+    :param workers: число процессов для преобразования карт (CARDS_IMPORT_WORKERS)
+    :return: статистика: rows, added, updated, unchanged, duplicates (повторы печати в одной пачке),
+    seconds, rows_per_second
+    """
+    started = time.perf_counter()
+    stats = {'rows': 0, 'added': 0, 'updated': 0, 'unchanged': 0, 'duplicates': 0}
+
+    cursor.execute(f"""CREATE TEMP TABLE cards_sync_stage ON COMMIT DROP AS
+        SELECT {', '.join(IMPORT_COLUMNS)} FROM cards WITH NO DATA""")
+
+    for batch in _iter_card_batches(self, file_path, batch_size, workers):
+        # Одна печать может встретиться в пачке дважды - ON CONFLICT такого не допускает, оставляем последнюю
+        rows = list({(row[1], row[3]): row for row in batch}.values())
+
+        _copy_rows(cursor, 'cards_sync_stage', rows)
+        cursor.execute(_SYNC_UPSERT)
+        added, updated = cursor.fetchone()
+        cursor.execute("TRUNCATE cards_sync_stage")
+
+        stats['rows'] += len(batch)
+        stats['added'] += added
+        stats['updated'] += updated
+        stats['unchanged'] += len(rows) - added - updated
+        stats['duplicates'] += len(batch) - len(rows)
+
+    if stats['added'] or stats['updated']:
+        notify_catalog_changed(cursor, 'cards')
+
+    return _import_stats(stats, started)
+
 
 def transform_card_data(self, card_data):
     """Преобразует данные карты из Scryfall в формат для БД"""
@@ -55,42 +334,193 @@ def transform_card_data(self, card_data):
     }
 
 
+def _fetch_search_page(cursor, query: str, params: list, limit: int = None, after: tuple = None,
+                       key_index: tuple = (5, 3, 0)) -> tuple:
+    """
+    Страница результатов поиска с keyset-пагинацией по CARD_SEARCH_KEY
+    :param query: SELECT ... FROM ... WHERE ... без сортировки и лимита
+    :param key_index: позиции name, set_name и id в строке результата
+    :return: (строки страницы, ключ для следующей страницы или None)
+    """
+    params = list(params)
+    if after is not None:
+        query += f" AND {CARD_SEARCH_KEY} > (%s, %s, %s)"
+        params.extend(after)
+    query += f" ORDER BY {CARD_SEARCH_KEY}"
+    if limit is not None:
+        # Лишняя строка показывает, есть ли следующая страница
+        query += " LIMIT %s"
+        params.append(limit + 1)
+
+    cursor.execute(query, params)
+    rows = cursor.fetchall()
+
+    if limit is None or len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    name, set_name, card_id = key_index
+    return rows, (last[name], last[set_name] or '', last[card_id])
+
+
+def _count_search_matches(cursor, where: str, params: list, count: str):
+    """
+    Число совпадений поиска
+    :param count: 'exact' - COUNT(*), 'estimate' - оценка планировщика без выполнения запроса
+    """
+    if count == 'exact':
+        cursor.execute(f"SELECT COUNT(*) FROM cards c WHERE {where}", params)
+        return cursor.fetchone()[0]
+
+    cursor.execute(f"EXPLAIN (FORMAT JSON) SELECT 1 FROM cards c WHERE {where}", params)
+    plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def normalize_card_query(card_name: str) -> str:
+    """Поисковая строка без лишних пробелов"""
+    return ' '.join(card_name.split())
+
+
+def search_cache_key(card_name: str, limit: int = None, after: tuple = None, count: str = 'exact',
+                     fields: tuple = None) -> tuple:
+    """
+    Ключ кэша поиска: ILIKE не различает регистр, поэтому запрос приводится к нижнему
+    """
+    return (normalize_card_query(card_name).lower(), limit, tuple(after) if after else None, count,
+            tuple(fields) if fields else None)
+
+
+def ranked_search_cache_key(card_name: str, limit: int = 20, threshold: float = DEFAULT_SIMILARITY_THRESHOLD,
+                            fields: tuple = None) -> tuple:
+    return normalize_card_query(card_name).lower(), limit, threshold, tuple(fields) if fields else None
+
+
+def image_url_cache_key(card_id: int, size: str = 'normal') -> tuple:
+    return int(card_id), size
+
+
+def search_projection(fields) -> tuple:
+    """
+    Поля, которые выберет поиск: запрошенные в заданном порядке и недостающие поля ключа пагинации
+    :param fields: имена из SEARCH_FIELDS
+    :raise ValueError: неизвестное поле
+    """
+    unknown = [field for field in fields if field not in SEARCH_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown search fields: {', '.join(unknown)}")
+
+    fields = tuple(dict.fromkeys(fields))
+    return fields + tuple(field for field in KEY_FIELDS if field not in fields)
+
+
+def _select_list(fields: tuple) -> str:
+    return ', '.join(f'{SEARCH_FIELDS[field]} AS {field}' for field in fields)
+
+
+def _search(cursor, select: str, fields: tuple, card_name: str, limit: int, after: tuple, count: str) -> tuple:
+    if count not in SEARCH_COUNT_MODES:
+        raise ValueError(f"Unknown count mode: {count}")
+
+    card_name = normalize_card_query(card_name)
+    where, params = CARD_NAME_MATCH, [f"%{card_name}%"]
+    key_index = tuple(fields.index(field) for field in ('name', 'set_name', 'id'))
+    cards, next_key = _fetch_search_page(cursor, f"{select} WHERE {where}", params, limit, after, key_index)
+
+    if limit is None or (after is None and next_key is None):
+        # Все совпадения уже на странице - считать отдельно не нужно
+        total = len(cards)
+    elif count == 'none':
+        total = None
+    else:
+        total = _count_search_matches(cursor, where, params, count)
+
+    return total, cards, next_key
+
+
 @with_cursor
-def search_card(self, cursor, card_name) -> tuple:
-    cursor.execute("""SELECT * FROM cards WHERE name ILIKE %s;""", (f"%{card_name}%",))
-    cards = cursor.fetchall()
+def search_card(self, cursor, card_name, limit: int = None, after: tuple = None, count: str = 'exact',
+                fields: tuple = None) -> tuple:
+    """
+    Поиск карт по подстроке названия с keyset-пагинацией по (name, set_name, id)
+    :param card_name: подстрока названия
+    :param limit: размер страницы, None - все совпадения
+    :param after: ключ последней строки предыдущей страницы (next_key)
+    :param count: 'exact' - точное число совпадений, 'estimate' - оценка планировщика, 'none' - не считать
+    :param fields: поля карты из SEARCH_COLUMNS, None - все; колонки строк идут в порядке search_projection
+    :return: (total, cards, next_key)
+    """
+    fields = search_projection(fields) if fields else SEARCH_COLUMNS
+    if any(field in INVENTORY_FIELDS for field in fields):
+        raise ValueError("Inventory fields require search_cards_with_inventory")
 
-    return len(cards), cards
+    select = f"SELECT {_select_list(fields)} FROM cards c"
+
+    return _search(cursor, select, fields, card_name, limit, after, count)
 
 
 @with_cursor
-def search_cards_with_inventory(self, cursor, card_name):
-    query = """
-    SELECT 
-        c.id,
-        c.color,
-        c.set_code,
-        c.set_name, 
-        c.collector_number,
-        c.name,
-        c.card_type,
-        c.image_url_small,
-        c.image_url_normal,
-        c.image_url_large,
-        c.created_at,
-        c.updated_at,
-        COALESCE(SUM(ci.quantity), 0) as total_quantity,
-        MIN(CASE WHEN ci.quantity > 0 THEN ci.price END) as min_price,
-        ARRAY_AGG(DISTINCT ci.quality) FILTER (WHERE ci.quantity > 0) as available_qualities
+def search_cards_with_inventory(self, cursor, card_name, limit: int = None, after: tuple = None,
+                                count: str = 'exact', fields: tuple = None) -> tuple:
+    """
+    Поиск карт с наличием на складе, пагинация как в search_card.
+    Наличие читается из card_inventory_summary, которую поддерживают триггеры на card_inventory.
+    :param fields: поля из SEARCH_FIELDS, None - все
+    :return: (total, cards, next_key)
+    """
+    fields = search_projection(fields) if fields else SEARCH_COLUMNS + tuple(INVENTORY_FIELDS)
+
+    select = f"""
+    SELECT {_select_list(fields)}
     FROM cards c
-    LEFT JOIN card_inventory ci ON c.id = ci.card_id 
-        AND ci.quantity > 0 
-        AND ci.quality IN ('NM', 'SP', 'HP', 'MP', 'DM')
-    WHERE c.name ILIKE %s
-    GROUP BY c.id
-    ORDER BY c.name, c.set_name
-    """
-    cursor.execute(query, (f"%{card_name}%",))
+    {INVENTORY_SUMMARY_JOIN}"""
+
+    return _search(cursor, select, fields, card_name, limit, after, count)
+
+
+@with_cursor
+def search_card_ranked(self, cursor, card_name, limit: int = 20,
+                       threshold: float = DEFAULT_SIMILARITY_THRESHOLD, fields: tuple = None) -> tuple:
+    """
+    Нечёткий поиск по триграммам: находит названия с опечатками, лучшие совпадения идут первыми.
+    Фильтр name % query и сортировка по расстоянию name <-> query обслуживаются GiST-индексом
+    idx_cards_name_gist_trgm, так что top-N берётся из индекса без сортировки всех совпадений.
+    :param card_name: поисковая строка
+    :param limit: сколько лучших совпадений вернуть
+    :param threshold: минимальное сходство от 0 до 1
+    :param fields: поля из SEARCH_FIELDS, None - все поля карты без наличия
+    :return: (count, cards), у каждой строки последней колонкой идёт сходство
+    """
+    card_name = normalize_card_query(card_name)
+    fields = search_projection(fields) if fields else SEARCH_COLUMNS
+    join = ''
+    if any(field in INVENTORY_FIELDS for field in fields):
+        join = INVENTORY_SUMMARY_JOIN
+
+    cursor.execute("SELECT set_config('pg_trgm.similarity_threshold', %s, true)", (str(threshold),))
+    cursor.execute(RANKED_CARD_SEARCH.format(select=_select_list(fields), join=join),
+                   (card_name, card_name, card_name, limit))
     cards = cursor.fetchall()
 
     return len(cards), cards
+
+
+@with_cursor
+def get_card_image_url(self, cursor, card_id: int, size: str = 'normal'):
+    """
+    Адрес картинки карты
+    :param size: один из IMAGE_SIZES
+    :return: адрес или None, если карты или картинки нет
+    """
+    if size not in IMAGE_SIZES:
+        raise ValueError(f"Unknown image size: {size}")
+
+    column = f'image_url_{size}'
+    cursor.execute(f"SELECT {Card.columns((column,))} FROM cards WHERE id = %s", (card_id,))
+    card = Card.fetchone(cursor)
+
+    return (getattr(card, column) or None) if card else None
@@ -0,0 +1,83 @@
+from psycopg2 import errors
+
+from backend.src.db._common import with_cursor
+from backend.src.db._classes import CartItem
+from backend.src.db._queries import CART_SELECT
+
+
+@with_cursor
+def get_cart(self, cursor, user_id: int) -> tuple:
+    """
+    Корзина пользователя с текущими ценами и наличием
+    :return: (позиции CartItem, сумма корзины)
+    """
+    cursor.execute(CART_SELECT, (user_id,))
+    items = CartItem.fetchall(cursor)
+
+    return items, sum((item.line_total for item in items), 0)
+
+
+@with_cursor
+def add_cart_item(self, cursor, user_id: int, card_inventory_id: int, quantity: int = 1,
+                  max_quantity: int = None) -> int or None:
+    """
+    Добавить позицию склада в корзину или увеличить её количество одним upsert
+    :param max_quantity: предел количества одной позиции, None - без предела
+    :return: количество позиции в корзине или None, если позиции склада нет
+    """
+    try:
+        cursor.execute("""
+            INSERT INTO cart_items (user_id, card_inventory_id, quantity)
+            VALUES (%(user_id)s, %(card_inventory_id)s, LEAST(%(quantity)s, %(max_quantity)s))
+            ON CONFLICT (user_id, card_inventory_id)
+            DO UPDATE SET quantity = LEAST(cart_items.quantity + EXCLUDED.quantity, %(max_quantity)s)
+            RETURNING quantity
+        """, {'user_id': user_id, 'card_inventory_id': card_inventory_id, 'quantity': quantity,
+              'max_quantity': max_quantity})
+
+        return cursor.fetchone()[0]
+    except errors.ForeignKeyViolation:
+        self._conn.rollback()
+        return None
+
+
+@with_cursor
+def set_cart_item_quantity(self, cursor, user_id: int, card_inventory_id: int, quantity: int) -> int or None:
+    """
+    Задать количество позиции в корзине одним upsert, позиция добавляется, если её не было
+    :return: количество позиции в корзине или None, если позиции склада нет
+    """
+    try:
+        cursor.execute("""
+            INSERT INTO cart_items (user_id, card_inventory_id, quantity) VALUES (%s, %s, %s)
+            ON CONFLICT (user_id, card_inventory_id) DO UPDATE SET quantity = EXCLUDED.quantity
+            RETURNING quantity
+        """, (user_id, card_inventory_id, quantity))
+
+        return cursor.fetchone()[0]
+    except errors.ForeignKeyViolation:
+        self._conn.rollback()
+        return None
+
+
+@with_cursor
+def remove_cart_item(self, cursor, user_id: int, card_inventory_id: int) -> bool:
+    """
+    Убрать позицию из корзины
+    :return: была ли позиция в корзине
+    """
+    cursor.execute("DELETE FROM cart_items WHERE user_id = %s AND card_inventory_id = %s",
+                   (user_id, card_inventory_id))
+
+    return cursor.rowcount > 0
+
+
+@with_cursor
+def clear_cart(self, cursor, user_id: int) -> int:
+    """
+    Очистить корзину
+    :return: число удалённых позиций
+    """
+    cursor.execute("DELETE FROM cart_items WHERE user_id = %s", (user_id,))
+
+    return cursor.rowcount
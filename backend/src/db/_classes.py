@@ -1,9 +1,131 @@
-class User:
-    def __init__(self, data):
-        self.id, self.email, self.password_hash, self.username, self.role, self.email_verified, \
-            self.email_verification_token, self.telegram_chat_id, self.telegram_username, self.telegram_verified, \
-            self.shipping_address, self.created_at, self.updated_at = data
-        self.data = [dat for i, dat in enumerate(data) if i != 2]
-
-    def __str__(self):
-        return f"{self.data}"
+from typing import Iterable, List, Optional
+
+
+class Row:
+    """
+    Строка результата запроса со слотами вместо __dict__. Значения раскладываются по именам столбцов
+    (cursor.description у psycopg2, ключи Record у asyncpg), поэтому порядок столбцов в запросе неважен.
+    Столбцы, которых не было в запросе, читаются как None.
+    """
+    __slots__ = ()
+
+    def __init__(self, **values):
+        for name, value in values.items():
+            setattr(self, name, value)
+
+    def __getattr__(self, name):
+        # Вызывается только для незаполненных слотов и несуществующих атрибутов
+        if name in self.__slots__:
+            return None
+        raise AttributeError(f"{type(self).__name__} has no attribute {name!r}")
+
+    @classmethod
+    def columns(cls, fields: Iterable[str] = None) -> str:
+        """
+        Список столбцов для SELECT
+        :param fields: имена столбцов модели, None - все
+        :raise ValueError: неизвестный столбец
+        """
+        fields = tuple(fields) if fields else cls.__slots__
+        unknown = [field for field in fields if field not in cls.__slots__]
+        if unknown:
+            raise ValueError(f"Unknown {cls.__name__} fields: {', '.join(unknown)}")
+
+        return ', '.join(fields)
+
+    @classmethod
+    def from_row(cls, names: Iterable[str], row: Iterable):
+        obj = cls.__new__(cls)
+        for name, value in zip(names, row):
+            setattr(obj, name, value)
+        return obj
+
+    @classmethod
+    def fetchone(cls, cursor) -> Optional['Row']:
+        """
+        Следующая строка курсора psycopg2 или None
+        """
+        row = cursor.fetchone()
+        if row is None:
+            return None
+
+        return cls.from_row([column[0] for column in cursor.description], row)
+
+    @classmethod
+    def fetchall(cls, cursor) -> List['Row']:
+        """
+        Все строки курсора psycopg2, имена столбцов читаются один раз
+        """
+        rows = cursor.fetchall()
+        names = [column[0] for column in cursor.description] if rows else []
+
+        return [cls.from_row(names, row) for row in rows]
+
+    @classmethod
+    def from_record(cls, record) -> Optional['Row']:
+        """
+        Строка из asyncpg.Record или None
+        """
+        if record is None:
+            return None
+
+        return cls.from_row(record.keys(), record.values())
+
+    def to_dict(self, fields: Iterable[str] = None) -> dict:
+        """
+        Словарь для ответа API
+        :param fields: какие столбцы включить, None - все
+        """
+        return {name: getattr(self, name) for name in (fields or self.__slots__)}
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self):
+        values = ', '.join(f'{name}={getattr(self, name)!r}' for name in self.__slots__
+                           if getattr(self, name) is not None)
+        return f"{type(self).__name__}({values})"
+
+
+class User(Row):
+    """
+    Строка таблицы users
+    """
+    __slots__ = ('id', 'email', 'password_hash', 'username', 'role', 'email_verified', 'email_verification_token',
+                 'telegram_chat_id', 'telegram_username', 'telegram_verified', 'shipping_address',
+                 'created_at', 'updated_at')
+
+
+# Столбцы для проверки пароля при входе и регистрации
+USER_AUTH_FIELDS = ('id', 'email', 'password_hash')
+
+# Профиль, который видит сам пользователь: без хэша пароля, токена подтверждения почты и чата бота
+USER_PROFILE_FIELDS = ('id', 'email', 'username', 'role', 'email_verified', 'telegram_username',
+                       'telegram_verified', 'shipping_address', 'created_at', 'updated_at')
+
+# Столбцы, которые пользователь может менять сам, см. update_user
+USER_UPDATE_FIELDS = ('username', 'telegram_username', 'shipping_address')
+
+# Столбцы users с ограничением UNIQUE users_<столбец>_key
+USER_UNIQUE_FIELDS = ('email', 'username')
+
+# Столбцы, которые нужны боту для привязки Telegram
+USER_TELEGRAM_FIELDS = ('id', 'telegram_chat_id', 'telegram_username', 'telegram_verified')
+
+
+class Card(Row):
+    """
+    Строка таблицы cards
+    """
+    __slots__ = ('id', 'color', 'set_code', 'set_name', 'collector_number', 'name', 'card_type',
+                 'image_url_small', 'image_url_normal', 'image_url_large', 'content_hash', 'created_at', 'updated_at')
+
+
+class CartItem(Row):
+    """
+    Позиция корзины с данными позиции склада и карты, см. get_cart
+    """
+    __slots__ = ('card_inventory_id', 'card_id', 'name', 'set_name', 'image_url_small', 'lang', 'quality', 'foil',
+                 'price', 'quantity', 'available', 'line_total', 'added_at')
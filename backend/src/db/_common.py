@@ -1,5 +1,8 @@
+import re
+import json
+
 from functools import wraps
-from typing import Callable
+from typing import Callable, Iterator, IO
 
 
 def with_cursor(func: Callable) -> Callable:
@@ -13,3 +16,71 @@ def with_cursor(func: Callable) -> Callable:
             return func(self, cursor, *args, **kwargs)
 
     return wrapper
+
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+def iter_json_array(file: IO[str], chunk_size: int = 1 << 20) -> Iterator:
+    """
+    Потоковый разбор JSON-массива верхнего уровня: элементы отдаются по одному,
+    в памяти держится только текущий кусок файла
+    :param file: текстовый файл с JSON-массивом
+    :param chunk_size: размер читаемого куска в символах
+    :yield: элементы массива
+    """
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = '', 0, False
+    state = 'start'
+
+    while True:
+        pos = _WHITESPACE.match(buffer, pos).end()
+
+        if pos == len(buffer):
+            if eof:
+                raise ValueError("Unexpected end of JSON array")
+            chunk = file.read(chunk_size)
+            eof = not chunk
+            buffer, pos = buffer[pos:] + chunk, 0
+            if state == 'start':
+                buffer = buffer.lstrip('\ufeff')
+            continue
+
+        char = buffer[pos]
+
+        if state == 'start':
+            if char != '[':
+                raise ValueError(f"Expected JSON array, got {char!r}")
+            pos += 1
+            state = 'first'
+            continue
+
+        if state == 'next':
+            if char == ']':
+                return
+            if char != ',':
+                raise ValueError(f"Expected ',' or ']' at position {pos}, got {char!r}")
+            pos += 1
+            state = 'value'
+            continue
+
+        if state == 'first' and char == ']':
+            return
+
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            end = len(buffer)
+
+        # Элемент мог оборваться на границе куска - дочитываем и разбираем заново
+        if end == len(buffer) and not eof:
+            chunk = file.read(chunk_size)
+            eof = not chunk
+            buffer, pos = buffer[pos:] + chunk, 0
+            continue
+
+        pos = end
+        state = 'next'
+        yield item
@@ -0,0 +1,48 @@
+import logging
+
+from typing import List
+
+from backend.src.db._common import with_cursor
+from backend.src.db._queries import INVENTORY_SUMMARY_BACKFILL
+from backend.src.db._cards import IMAGE_SIZES, notify_catalog_changed
+
+
+@with_cursor
+def rebuild_inventory_summary(self, cursor) -> int:
+    """
+    Полный пересчёт card_inventory_summary по card_inventory, для восстановления после сбоев.
+    На время пересчёта запись в card_inventory блокируется.
+    :return: число карт в наличии
+    """
+    cursor.execute("LOCK TABLE card_inventory IN SHARE MODE")
+    cursor.execute("TRUNCATE card_inventory_summary")
+    cursor.execute(INVENTORY_SUMMARY_BACKFILL)
+    rows = cursor.rowcount
+    notify_catalog_changed(cursor, 'inventory')
+
+    logging.info(f"Inventory summary rebuilt: {rows} cards in stock")
+
+    return rows
+
+
+@with_cursor
+def get_top_stocked_card_images(self, cursor, limit: int = 500, size: str = 'normal') -> List[tuple]:
+    """
+    Картинки карт, которых больше всего на складе, для прогрева кэша картинок
+    :param limit: сколько карт взять
+    :param size: один из IMAGE_SIZES
+    :return: список (card_id, адрес картинки)
+    """
+    if size not in IMAGE_SIZES:
+        raise ValueError(f"Unknown image size: {size}")
+
+    cursor.execute(f"""
+        SELECT c.id, c.image_url_{size}
+        FROM card_inventory_summary s
+        JOIN cards c ON c.id = s.card_id
+        WHERE c.image_url_{size} <> ''
+        ORDER BY s.total_quantity DESC, c.id
+        LIMIT %s
+    """, (limit,))
+
+    return cursor.fetchall()
@@ -0,0 +1,69 @@
+import select
+import logging
+import threading
+
+from typing import Callable, Dict
+
+LISTEN_RETRY_INTERVAL = 30.0
+POLL_INTERVAL = 5.0
+
+
+class NotificationListener:
+    """
+    Подписка на каналы NOTIFY в фоновом потоке на отдельном соединении в autocommit.
+    Потерянное соединение восстанавливается не чаще раза в LISTEN_RETRY_INTERVAL секунд.
+    """
+
+    def __init__(self, connect: Callable, handlers: Dict[str, Callable[[str], None]],
+                 on_subscribe: Callable[[], None] = None):
+        """
+        :param connect: функция без аргументов, возвращающая новое соединение psycopg2
+        :param handlers: канал -> обработчик payload
+        :param on_subscribe: вызывается после каждой (пере)подписки: уведомления, пришедшие без неё, потеряны
+        """
+        self._connect = connect
+        self._handlers = handlers
+        self._on_subscribe = on_subscribe
+        self._stop = threading.Event()
+        self._thread = None
+        self.active = False
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='db-notification-listener', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._listen()
+            except Exception as e:
+                logging.error(f"Notification listener error: {e}")
+            self.active = False
+            self._stop.wait(LISTEN_RETRY_INTERVAL)
+
+    def _listen(self):
+        conn = self._connect()
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                for channel in self._handlers:
+                    cursor.execute(f"LISTEN {channel}")
+            self.active = True
+            if self._on_subscribe is not None:
+                self._on_subscribe()
+
+            while not self._stop.is_set():
+                if select.select([conn], [], [], POLL_INTERVAL) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    self._handlers[notify.channel](notify.payload)
+        finally:
+            conn.close()
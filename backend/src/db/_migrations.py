@@ -0,0 +1,260 @@
+import os
+import re
+import json
+import logging
+
+from typing import List, NamedTuple, Sequence
+
+from backend.src.db._common import with_cursor
+from backend.src.db._classes import User, USER_AUTH_FIELDS, USER_PROFILE_FIELDS, USER_TELEGRAM_FIELDS
+from backend.src.db._queries import (INVENTORY_SUMMARY_TRIGGERS, INVENTORY_SUMMARY_BACKFILL,
+                                     INVENTORY_ARRIVALS_TRIGGERS, INVENTORY_SUMMARY_FOR_CARDS,
+                                     CARD_REQUEST_MATCHED_CHANNEL, CARD_PRINTING_KEY, CARD_NAME_MATCH,
+                                     CARD_SEARCH_KEY, INVENTORY_SUMMARY_JOIN, RANKED_CARD_SEARCH, CART_SELECT,
+                                     MATCH_CARD_REQUESTS, USER_ORDERS_PAGE, select_user)
+
+
+class Migration(NamedTuple):
+    """
+    Шаг изменения схемы. Каждый оператор должен быть идемпотентным (IF NOT EXISTS и т.п.),
+    чтобы прерванный шаг можно было просто запустить повторно.
+    """
+    version: int
+    name: str
+    statements: Sequence[str]
+    # CREATE INDEX CONCURRENTLY нельзя выполнять в транзакции: такие шаги идут в autocommit,
+    # по одному оператору
+    transactional: bool = True
+
+
+# Дубли (set_code, collector_number) из импорта до UNIQUE-ключа: остаётся строка с наименьшим id
+_DUPLICATE_CARDS = """(SELECT id, min(id) OVER (PARTITION BY set_code, collector_number) AS keep_id FROM cards) dup"""
+
+MIGRATIONS = [
+    Migration(1, 'cards_content_hash', [
+        # Колонка без значения по умолчанию добавляется без переписывания таблицы
+        "ALTER TABLE cards ADD COLUMN IF NOT EXISTS content_hash CHAR(32)",
+    ]),
+    Migration(2, 'cards_set_code_collector_number_key', [
+        # Без схлопывания дублей индекс не строится, а упавшая миграция блокирует все следующие.
+        # Склад и заявки переводятся на оставшуюся карту; cart_items и order_items ссылаются
+        # на card_inventory и не меняются, сводка по удалённым картам уходит каскадом
+        f"UPDATE card_inventory ci SET card_id = dup.keep_id FROM {_DUPLICATE_CARDS} "
+        "WHERE ci.card_id = dup.id AND dup.id <> dup.keep_id",
+        f"UPDATE card_requests cr SET card_inventory_id = dup.keep_id FROM {_DUPLICATE_CARDS} "
+        "WHERE cr.card_inventory_id = dup.id AND dup.id <> dup.keep_id",
+        f"DELETE FROM cards c USING {_DUPLICATE_CARDS} WHERE c.id = dup.id AND dup.id <> dup.keep_id",
+        "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS cards_set_code_collector_number_key "
+        "ON cards (set_code, collector_number)",
+    ], transactional=False),
+    # Триггеры обновляют сводку только при изменениях, поэтому в той же транзакции она заполняется
+    # по текущему складу. CREATE TRIGGER держит блокировку card_inventory до COMMIT, и записи склада
+    # между созданием триггеров и заполнением не теряются
+    Migration(3, 'card_inventory_summary_triggers', [
+        *INVENTORY_SUMMARY_TRIGGERS,
+        "DELETE FROM card_inventory_summary",
+        INVENTORY_SUMMARY_BACKFILL,
+    ]),
+    Migration(4, 'hot_path_indexes', [
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_card_inventory_card_id ON card_inventory (card_id)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_telegram_username ON users (telegram_username)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_telegram_chat_id ON users (telegram_chat_id)",
+        # Страница заказов пользователя по убыванию id читается из индекса без сортировки;
+        # (user_id, id) покрывает и фильтр только по user_id
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_orders_user_id_id ON orders (user_id, id)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_order_items_order_id ON order_items (order_id)",
+        # cart_items.user_id отдельный индекс не нужен: его покрывает UNIQUE (user_id, card_inventory_id)
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_cards_set_code ON cards (set_code)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_cards_card_type ON cards (card_type)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_cards_color ON cards (color)",
+    ], transactional=False),
+    # Требует расширения pg_trgm на сервере, поэтому идёт после индексов, не зависящих от него
+    Migration(5, 'cards_name_trgm_indexes', [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_cards_name_gin_trgm ON cards USING gin (name gin_trgm_ops)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_cards_name_gist_trgm ON cards USING gist (name gist_trgm_ops)",
+    ], transactional=False),
+    Migration(6, 'inventory_arrivals_trigger', INVENTORY_ARRIVALS_TRIGGERS),
+    Migration(7, 'card_requests_open_index', [
+        # Только открытые заявки: закрытые не раздувают индекс, по которому идёт сопоставление
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_card_requests_open ON card_requests (card_inventory_id, max_price) "
+        "WHERE status = 'open'",
+    ], transactional=False),
+]
+
+MIGRATIONS_TABLE = """CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INTEGER PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    applied_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+)"""
+
+# Ключ advisory-блокировки, чтобы миграции не запускались из двух процессов одновременно
+MIGRATIONS_LOCK_KEY = 0x63617264
+
+_CONCURRENT_INDEX = re.compile(r'CREATE (?:UNIQUE )?INDEX CONCURRENTLY IF NOT EXISTS (\w+)', re.IGNORECASE)
+
+# Страница поиска карт так, как её строит _cards._search: фильтр по названию, keyset-сортировка и лимит
+_CARD_SEARCH_PAGE = ("SELECT {select} FROM cards c {join} "
+                     f"WHERE {CARD_NAME_MATCH} ORDER BY {CARD_SEARCH_KEY} LIMIT %s")
+
+# Горячие запросы _cards.py, _base_user.py, _tg_bot.py, корзины, заявок, заказов и триггеров склада:
+# (имя, запрос, параметры). Текст запросов общий с методами Database, см. _queries.py
+HOT_QUERIES = [
+    ('cards.search_card', _CARD_SEARCH_PAGE.format(select='c.id', join=''), ('%bolt%', 21)),
+    ('cards.search_card_ranked', RANKED_CARD_SEARCH.format(select='c.id', join=''), ('bolt', 'bolt', 'bolt', 20)),
+    ('cards.search_cards_with_inventory',
+     _CARD_SEARCH_PAGE.format(select='c.id, s.total_quantity', join=INVENTORY_SUMMARY_JOIN), ('%bolt%', 21)),
+    # Печать, которую ищет ON CONFLICT в sync_cards_from_file
+    ('cards.sync_cards_from_file',
+     f"SELECT id FROM cards WHERE {' AND '.join(f'{column} = %s' for column in CARD_PRINTING_KEY)}", ('lea', '1')),
+    ('base_user.get_user', select_user(User.columns(USER_AUTH_FIELDS), 'email'), ('user@example.com',)),
+    ('base_user.get_user_by_id', select_user(User.columns(USER_PROFILE_FIELDS), 'id'), (1,)),
+    ('tg_bot.get_user_by_telegram_username', select_user(User.columns(USER_TELEGRAM_FIELDS), 'telegram_username'),
+     ('user',)),
+    ('inventory.refresh_card_inventory_summary', INVENTORY_SUMMARY_FOR_CARDS.format(card_ids='%s'), ([1],)),
+    ('cart.get_cart', CART_SELECT, (1,)),
+    ('requests.match_card_requests', MATCH_CARD_REQUESTS, (1000, CARD_REQUEST_MATCHED_CHANNEL)),
+    ('tg_bot.get_user_orders', USER_ORDERS_PAGE.format(chat_id='%s', limit='%s', keyset='', direction='DESC'),
+     (1, 6)),
+]
+
+
+def _applied_versions(cursor) -> set:
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def _drop_invalid_index(cursor, statement: str):
+    """
+    Прерванный CREATE INDEX CONCURRENTLY оставляет невалидный индекс, который IF NOT EXISTS
+    пропустил бы. Такой индекс удаляется перед повторной попыткой.
+    """
+    match = _CONCURRENT_INDEX.search(statement)
+    if match is None:
+        return
+
+    cursor.execute("""
+        SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = %s AND NOT i.indisvalid
+    """, (match.group(1),))
+    if cursor.fetchone() is not None:
+        logging.warning(f"Dropping invalid index {match.group(1)} left by an interrupted migration")
+        cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {match.group(1)}")
+
+
+def _apply_migration(cursor, migration: Migration):
+    if migration.transactional:
+        cursor.execute("BEGIN")
+        try:
+            for statement in migration.statements:
+                cursor.execute(statement)
+            cursor.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                           (migration.version, migration.name))
+            cursor.execute("COMMIT")
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+        return
+
+    for statement in migration.statements:
+        _drop_invalid_index(cursor, statement)
+        cursor.execute(statement)
+    cursor.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s) ON CONFLICT DO NOTHING",
+                   (migration.version, migration.name))
+
+
+def migrate(self, target: int = None) -> List[int]:
+    """
+    Применить ещё не выполненные шаги MIGRATIONS по порядку версий.
+    Выполняется на отдельном соединении в autocommit, чтобы индексы строились CONCURRENTLY
+    без блокировки записи; lock_timeout (MIGRATION_LOCK_TIMEOUT) не даёт DDL повиснуть
+    в очереди за долгими транзакциями и заблокировать трафик.
+    :param target: последняя версия, которую нужно применить, None - все
+    :return: список применённых версий
+    """
+    applied = []
+
+    with self._pool.connection() as conn:
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_lock(%s)", (MIGRATIONS_LOCK_KEY,))
+                try:
+                    cursor.execute(MIGRATIONS_TABLE)
+                    cursor.execute("SET lock_timeout = %s", (os.getenv('MIGRATION_LOCK_TIMEOUT', '5s'),))
+                    done = _applied_versions(cursor)
+
+                    for migration in sorted(MIGRATIONS, key=lambda m: m.version):
+                        if migration.version in done or (target is not None and migration.version > target):
+                            continue
+
+                        logging.info(f"Applying migration {migration.version} {migration.name}")
+                        try:
+                            _apply_migration(cursor, migration)
+                        except Exception as e:
+                            logging.error(f"Migration {migration.version} {migration.name} error: {e}")
+                            raise
+                        applied.append(migration.version)
+                finally:
+                    cursor.execute("RESET lock_timeout")
+                    cursor.execute("SELECT pg_advisory_unlock(%s)", (MIGRATIONS_LOCK_KEY,))
+        finally:
+            if not conn.closed:
+                conn.autocommit = False
+
+    return applied
+
+
+@with_cursor
+def migration_status(self, cursor) -> List[dict]:
+    """
+    Состояние миграций
+    :return: список {'version', 'name', 'applied_at'}, applied_at = None для невыполненных
+    """
+    cursor.execute(MIGRATIONS_TABLE)
+    cursor.execute("SELECT version, applied_at FROM schema_migrations")
+    applied = dict(cursor.fetchall())
+
+    return [{'version': m.version, 'name': m.name, 'applied_at': applied.get(m.version)} for m in MIGRATIONS]
+
+
+def _seq_scans(plan: dict) -> List[str]:
+    """
+    Таблицы, которые план читает целиком: Seq Scan или индексный скан без условия по индексу
+    """
+    relations = []
+    full_index_scan = plan.get('Node Type') in ('Index Scan', 'Index Only Scan') and 'Index Cond' not in plan
+    if plan.get('Node Type') == 'Seq Scan' or full_index_scan:
+        relations.append(plan.get('Relation Name'))
+    for child in plan.get('Plans', []):
+        relations.extend(_seq_scans(child))
+
+    return relations
+
+
+@with_cursor
+def check_query_plans(self, cursor) -> List[dict]:
+    """
+    EXPLAIN горячих запросов (HOT_QUERIES) с поиском последовательных сканирований.
+    Планы строятся с enable_seqscan = off: на маленькой таблице Seq Scan выгоднее индекса,
+    а так Seq Scan в плане остаётся, только если подходящего индекса нет.
+    :return: список {'query', 'seq_scans', 'error'}
+    """
+    report = []
+
+    for name, query, params in HOT_QUERIES:
+        cursor.execute("SAVEPOINT plan_check")
+        try:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {query}", params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            report.append({'query': name, 'seq_scans': sorted(set(_seq_scans(plan[0]['Plan']))), 'error': None})
+        except Exception as e:
+            report.append({'query': name, 'seq_scans': [], 'error': str(e)})
+        finally:
+            # Откат к точке сохранения снимает и SET LOCAL, и ошибку транзакции
+            cursor.execute("ROLLBACK TO SAVEPOINT plan_check")
+
+    return report
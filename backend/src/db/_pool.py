@@ -0,0 +1,247 @@
+import os
+import time
+import logging
+import threading
+
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+import psycopg2
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_UNKNOWN
+from psycopg2.pool import PoolError
+
+
+class ConnectionPool:
+    """
+    Ограниченный потокобезопасный пул соединений psycopg2.
+
+    Соединения создаются лениво, выдаются по одному на вызов и возвращаются
+    обратно после него. При выдаче соединение проверяется, после fork()
+    унаследованные от родителя соединения забываются без закрытия.
+    """
+
+    def __init__(self, connect: Callable[[], psycopg2.extensions.connection], maxconn: int = 10,
+                 timeout: float = 30.0, check_interval: float = 5.0):
+        """
+        :param connect: функция создания нового соединения
+        :param maxconn: максимальное число соединений
+        :param timeout: сколько секунд ждать свободное соединение
+        :param check_interval: после скольких секунд простоя соединение пингуется при выдаче
+        """
+        if maxconn < 1:
+            raise ValueError(f"Invalid pool size: maxconn={maxconn}")
+
+        self._connect = connect
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.check_interval = check_interval
+
+        self._closed = False
+        self._init_state()
+
+    def _init_state(self):
+        self._pid = os.getpid()
+        self._cond = threading.Condition()
+        self._idle = deque()
+        self._in_use = set()
+        self._size = 0
+        self._waiting = 0
+        self._checkouts = 0
+        self._timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _check_fork(self):
+        """
+        После fork() соединения родителя нельзя ни использовать, ни закрывать:
+        закрытие отправит серверу Terminate и оборвёт сессию родителя.
+        """
+        if self._pid != os.getpid():
+            logging.info("Connection pool reset after fork")
+            self._init_state()
+
+    def getconn(self, timeout: float = None) -> psycopg2.extensions.connection:
+        """
+        Взять соединение из пула
+        :param timeout: время ожидания в секундах, по умолчанию self.timeout
+        :return: psycopg2.extensions.connection
+        """
+        self._check_fork()
+        timeout = self.timeout if timeout is None else timeout
+
+        started = time.monotonic()
+        deadline = started + timeout
+        conn, last_used = None, None
+
+        with self._cond:
+            self._waiting += 1
+            try:
+                while True:
+                    if self._closed:
+                        raise PoolError("connection pool is closed")
+                    if self._idle:
+                        conn, last_used = self._idle.pop()
+                        break
+                    if self._size < self.maxconn:
+                        # Резервируем место под новое соединение, само подключение - вне блокировки
+                        self._size += 1
+                        break
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolError(f"connection pool exhausted: no free connection in {timeout}s")
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+
+            waited = time.monotonic() - started
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+
+        try:
+            if conn is not None and not self._is_healthy(conn, last_used):
+                self._close_quietly(conn)
+                conn = None
+            if conn is None:
+                conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self._in_use.add(conn)
+
+        return conn
+
+    def putconn(self, conn: psycopg2.extensions.connection, discard: bool = False):
+        """
+        Вернуть соединение в пул
+        :param conn: соединение, полученное из getconn
+        :param discard: закрыть соединение вместо возврата
+        """
+        self._check_fork()
+
+        with self._cond:
+            if conn not in self._in_use:
+                # Чужое или унаследованное соединение - в пул не берём
+                if discard:
+                    self._close_quietly(conn)
+                return
+            self._in_use.discard(conn)
+
+        if not discard and not self._closed:
+            discard = not self._reset(conn)
+
+        with self._cond:
+            if discard or self._closed:
+                self._close_quietly(conn)
+                self._size -= 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout: float = None) -> Iterator[psycopg2.extensions.connection]:
+        """
+        Контекст для выдачи соединения на время одного вызова
+        :yield: соединение
+        """
+        conn = self.getconn(timeout)
+        broken = False
+        try:
+            yield conn
+        except psycopg2.OperationalError:
+            broken = True
+            raise
+        finally:
+            self.putconn(conn, discard=broken or bool(conn.closed))
+
+    def closeall(self):
+        """
+        Закрыть пул и все свободные соединения. Занятые закрываются при возврате.
+        """
+        self._check_fork()
+
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._close_quietly(conn)
+                self._size -= 1
+            self._cond.notify_all()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def stats(self) -> dict:
+        """
+        Статистика пула
+        :return: словарь с размером пула, занятыми/ожидающими и временем ожидания
+        """
+        with self._cond:
+            return {
+                'size': self._size,
+                'max': self.maxconn,
+                'idle': len(self._idle),
+                'in_use': len(self._in_use),
+                'waiting': self._waiting,
+                'checkouts': self._checkouts,
+                'timeouts': self._timeouts,
+                'wait_time_total': self._wait_total,
+                'wait_time_avg': self._wait_total / self._checkouts if self._checkouts else 0.0,
+                'wait_time_max': self._wait_max,
+            }
+
+    def _is_healthy(self, conn, last_used: float) -> bool:
+        """
+        Проверка соединения при выдаче. Давно простаивающие соединения пингуются.
+        """
+        if conn.closed:
+            return False
+        if conn.get_transaction_status() == TRANSACTION_STATUS_UNKNOWN:
+            return False
+        if time.monotonic() - last_used < self.check_interval:
+            return True
+
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception as e:
+            logging.warning(f"Dropping broken pooled connection: {e}")
+            return False
+
+    @staticmethod
+    def _reset(conn) -> bool:
+        """
+        Привести соединение в исходное состояние перед возвратом в пул
+        :return: можно ли переиспользовать соединение
+        """
+        if conn.closed:
+            return False
+        try:
+            status = conn.get_transaction_status()
+            if status == TRANSACTION_STATUS_UNKNOWN:
+                return False
+            if status != TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+            if conn.autocommit:
+                conn.autocommit = False
+            return True
+        except Exception as e:
+            logging.warning(f"Can't reset pooled connection: {e}")
+            return False
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
@@ -10,8 +10,10 @@ TABLE_CREATE = {
         image_url_small VARCHAR(255),
         image_url_normal VARCHAR(255),
         image_url_large VARCHAR(255),
+        content_hash CHAR(32),
         created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-        updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+        updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE (set_code, collector_number)
     )""",
 
     "users": """CREATE TABLE IF NOT EXISTS users (
@@ -45,6 +47,15 @@ TABLE_CREATE = {
     )
     """,
 
+    "card_inventory_summary": """CREATE TABLE IF NOT EXISTS card_inventory_summary (
+        card_id INTEGER PRIMARY KEY REFERENCES cards(id) ON DELETE CASCADE,
+        total_quantity INTEGER NOT NULL,
+        min_price DECIMAL(10,2),
+        available_qualities VARCHAR(20)[],
+        updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+
     "orders": """CREATE TABLE IF NOT EXISTS orders (
         id SERIAL PRIMARY KEY,
         user_id INTEGER REFERENCES users(id) NOT NULL,
@@ -96,6 +107,228 @@ TABLE_CREATE = {
         used BOOLEAN DEFAULT FALSE,
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     )
+    """,
+
+    # Очередь поступлений на склад для сопоставления с заявками card_requests, см. match_card_requests
+    "inventory_arrivals": """CREATE TABLE IF NOT EXISTS inventory_arrivals (
+        id BIGSERIAL PRIMARY KEY,
+        card_id INTEGER NOT NULL,
+        price DECIMAL(10,2) NOT NULL,
+        created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+    )
     """
 }
 
+
+
+# Строки склада, которые попадают в сводку и в поиск
+SELLABLE_INVENTORY = "ci.quantity > 0 AND ci.quality IN ('NM', 'SP', 'HP', 'MP', 'DM')"
+
+# Агрегаты сводки по складу для card_id
+INVENTORY_SUMMARY_SELECT = f"""
+    SELECT ci.card_id, SUM(ci.quantity), MIN(ci.price), ARRAY_AGG(DISTINCT ci.quality), CURRENT_TIMESTAMP
+    FROM card_inventory ci
+    WHERE {SELLABLE_INVENTORY}
+"""
+
+# Сводка по складу для массива card_id, {card_ids} - выражение с массивом
+INVENTORY_SUMMARY_FOR_CARDS = INVENTORY_SUMMARY_SELECT + """    AND ci.card_id = ANY({card_ids})
+    GROUP BY ci.card_id"""
+
+# Заполнение пустой card_inventory_summary по всему складу
+INVENTORY_SUMMARY_BACKFILL = f"""INSERT INTO card_inventory_summary (card_id, total_quantity, min_price, available_qualities,
+    updated_at) {INVENTORY_SUMMARY_SELECT} GROUP BY ci.card_id"""
+
+# Канал NOTIFY об изменении каталога или склада, payload - что изменилось ('cards' или 'inventory').
+# Его слушают веб-процессы, чтобы сбросить кэш поиска и обновить индекс подсказок названий.
+CATALOG_CHANGED_CHANNEL = 'catalog_changed'
+
+# card_inventory_summary поддерживается триггерами на уровне оператора: пачка изменений склада
+# пересчитывает сводку один раз для каждой затронутой карты. Пересчёт идёт под advisory-блокировкой
+# карты, поэтому параллельные транзакции не затирают результат друг друга. Каждое изменение склада
+# сообщает в CATALOG_CHANGED_CHANNEL: одинаковые уведомления одной транзакции Postgres склеивает в одно.
+INVENTORY_SUMMARY_TRIGGERS = [
+    f"""CREATE OR REPLACE FUNCTION refresh_card_inventory_summary(card_ids INTEGER[]) RETURNS void AS $$
+    BEGIN
+        PERFORM pg_advisory_xact_lock(hashtext('card_inventory_summary'), id)
+        FROM (SELECT DISTINCT unnest(card_ids) AS id ORDER BY 1) ids;
+
+        DELETE FROM card_inventory_summary WHERE card_id = ANY(card_ids);
+
+        INSERT INTO card_inventory_summary (card_id, total_quantity, min_price, available_qualities, updated_at)
+        {INVENTORY_SUMMARY_FOR_CARDS.format(card_ids='card_ids')};
+    END;
+    $$ LANGUAGE plpgsql""",
+
+    f"""CREATE OR REPLACE FUNCTION card_inventory_summary_trigger() RETURNS trigger AS $$
+    BEGIN
+        PERFORM pg_notify('{CATALOG_CHANGED_CHANNEL}', 'inventory');
+        IF TG_OP = 'TRUNCATE' THEN
+            TRUNCATE card_inventory_summary;
+        ELSIF TG_OP = 'INSERT' THEN
+            PERFORM refresh_card_inventory_summary(ARRAY(SELECT card_id FROM new_rows WHERE card_id IS NOT NULL));
+        ELSIF TG_OP = 'DELETE' THEN
+            PERFORM refresh_card_inventory_summary(ARRAY(SELECT card_id FROM old_rows WHERE card_id IS NOT NULL));
+        ELSE
+            PERFORM refresh_card_inventory_summary(ARRAY(
+                SELECT card_id FROM new_rows WHERE card_id IS NOT NULL
+                UNION SELECT card_id FROM old_rows WHERE card_id IS NOT NULL
+            ));
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql""",
+
+    "DROP TRIGGER IF EXISTS card_inventory_summary_insert ON card_inventory",
+    """CREATE TRIGGER card_inventory_summary_insert AFTER INSERT ON card_inventory
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION card_inventory_summary_trigger()""",
+
+    "DROP TRIGGER IF EXISTS card_inventory_summary_update ON card_inventory",
+    """CREATE TRIGGER card_inventory_summary_update AFTER UPDATE ON card_inventory
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION card_inventory_summary_trigger()""",
+
+    "DROP TRIGGER IF EXISTS card_inventory_summary_delete ON card_inventory",
+    """CREATE TRIGGER card_inventory_summary_delete AFTER DELETE ON card_inventory
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION card_inventory_summary_trigger()""",
+
+    "DROP TRIGGER IF EXISTS card_inventory_summary_truncate ON card_inventory",
+    """CREATE TRIGGER card_inventory_summary_truncate AFTER TRUNCATE ON card_inventory
+    FOR EACH STATEMENT EXECUTE FUNCTION card_inventory_summary_trigger()""",
+]
+
+# Канал NOTIFY об изменении привязки Telegram, payload - telegram_username, чей статус изменился.
+# Его слушает бот, чтобы сбросить кэш статуса подтверждения.
+TG_VERIFICATION_CHANNEL = 'tg_verification'
+
+# Канал NOTIFY об изменении строки users, payload - id пользователя.
+# Его слушают веб-процессы, чтобы сбросить кэш get_user_by_id.
+USER_CHANGED_CHANNEL = 'user_changed'
+
+# Канал NOTIFY о заявке card_requests, которой нашлось предложение на складе, payload - id заявки
+CARD_REQUEST_MATCHED_CHANNEL = 'card_request_matched'
+
+# Вставки в card_inventory попадают в очередь inventory_arrivals одной строкой на карту за оператор:
+# загрузка продавца на тысячи строк - это одна вставка в очередь, а не триггер на каждую строку
+INVENTORY_ARRIVALS_TRIGGERS = [
+    f"""CREATE OR REPLACE FUNCTION card_inventory_arrivals_trigger() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO inventory_arrivals (card_id, price)
+        SELECT ci.card_id, MIN(ci.price)
+        FROM new_rows ci
+        WHERE ci.card_id IS NOT NULL AND {SELLABLE_INVENTORY}
+        GROUP BY ci.card_id;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql""",
+
+    "DROP TRIGGER IF EXISTS card_inventory_arrivals_insert ON card_inventory",
+    """CREATE TRIGGER card_inventory_arrivals_insert AFTER INSERT ON card_inventory
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION card_inventory_arrivals_trigger()""",
+]
+
+
+# Горячие запросы. Их выполняют методы Database, а check_query_plans проверяет их планы (HOT_QUERIES
+# в _migrations.py), поэтому текст у них общий: проверяется ровно то, что уходит в базу.
+
+def select_user(columns: str, key: str, placeholder: str = '%s') -> str:
+    """
+    Пользователь по уникальному ключу users: id, email или telegram_username
+    :param columns: список столбцов, см. User.columns
+    :param placeholder: параметр запроса: %s для psycopg2, $1 для asyncpg
+    """
+    return f"SELECT {columns} FROM users WHERE {key} = {placeholder}"
+
+
+# Ключ печати карты: по нему импорт сопоставляет выгрузку Scryfall с cards (UNIQUE-ключ таблицы)
+CARD_PRINTING_KEY = ('set_code', 'collector_number')
+
+# Поиск карт по подстроке названия, ключ его сортировки и keyset-пагинации
+CARD_NAME_MATCH = "c.name ILIKE %s"
+CARD_SEARCH_KEY = "(c.name, COALESCE(c.set_name, ''), c.id)"
+
+# Наличие на складе из card_inventory_summary s для карт c
+INVENTORY_SUMMARY_JOIN = "LEFT JOIN card_inventory_summary s ON s.card_id = c.id"
+
+# Нечёткий поиск по триграммам: {select} - выбираемые поля, {join} - INVENTORY_SUMMARY_JOIN или пусто.
+# Параметры: запрос (для similarity), запрос (фильтр), запрос (сортировка), лимит
+RANKED_CARD_SEARCH = """
+        SELECT {select}, similarity(c.name, %s) AS score
+        FROM cards c
+        {join}
+        WHERE c.name %% %s
+        ORDER BY c.name <-> %s, c.id
+        LIMIT %s
+    """
+
+# Позиции корзины вместе с текущей ценой и остатком позиции склада и данными карты.
+# Строки пользователя выбираются по индексу UNIQUE (user_id, card_inventory_id)
+CART_SELECT = """
+    SELECT ci.id AS card_inventory_id, c.id AS card_id, c.name, c.set_name, c.image_url_small,
+           ci.lang, ci.quality, ci.foil, ci.price, ct.quantity, ci.quantity AS available,
+           ci.price * ct.quantity AS line_total, ct.added_at
+    FROM cart_items ct
+    JOIN card_inventory ci ON ci.id = ct.card_inventory_id
+    JOIN cards c ON c.id = ci.card_id
+    WHERE ct.user_id = %s
+    ORDER BY ct.added_at, ct.id
+"""
+
+# Пачка из очереди поступлений сворачивается до минимальной цены на карту и сопоставляется
+# с открытыми заявками по частичному индексу (card_inventory_id, max_price) WHERE status = 'open':
+# стоимость зависит от размера пачки и числа совпадений, а не от числа открытых заявок.
+# SKIP LOCKED позволяет запускать несколько обработчиков параллельно.
+# Параметры: размер пачки, CARD_REQUEST_MATCHED_CHANNEL
+MATCH_CARD_REQUESTS = """
+    WITH batch AS (
+        DELETE FROM inventory_arrivals
+        WHERE id IN (
+            SELECT id FROM inventory_arrivals ORDER BY id LIMIT %s FOR UPDATE SKIP LOCKED
+        )
+        RETURNING card_id, price
+    ),
+    offers AS (
+        SELECT card_id, MIN(price) AS price FROM batch GROUP BY card_id
+    ),
+    matched AS (
+        UPDATE card_requests r SET status = 'in_progress'
+        FROM offers o
+        WHERE r.card_inventory_id = o.card_id
+          AND r.status = 'open'
+          AND (r.max_price IS NULL OR r.max_price >= o.price)
+        RETURNING r.id, r.user_id, r.card_inventory_id, o.price
+    )
+    SELECT m.id, m.user_id, m.card_inventory_id, m.price
+    FROM matched m, pg_notify(%s, m.id::text)
+    ORDER BY m.id
+"""
+
+# Заказы страницы и их позиции с названиями карт одним запросом: страница выбирается
+# по индексу (user_id, id), позиции присоединяются только к её заказам.
+# {chat_id}, {limit} - параметры запроса, {keyset} - условие на o.id или пусто, {direction} - ASC/DESC
+USER_ORDERS_PAGE = """
+    WITH page AS (
+        SELECT o.id, o.status, o.total_amount, o.created_at
+        FROM users u
+        JOIN orders o ON o.user_id = u.id
+        WHERE u.telegram_chat_id = {chat_id} {keyset}
+        ORDER BY o.id {direction}
+        LIMIT {limit}
+    )
+    SELECT
+        p.id, p.status, p.total_amount, p.created_at,
+        COALESCE(
+            json_agg(json_build_object('name', c.name, 'quantity', oi.quantity, 'unit_price', oi.unit_price)
+                     ORDER BY oi.id) FILTER (WHERE oi.id IS NOT NULL),
+            '[]'
+        ) AS items
+    FROM page p
+    LEFT JOIN order_items oi ON oi.order_id = p.id
+    LEFT JOIN card_inventory ci ON ci.id = oi.card_inventory_id
+    LEFT JOIN cards c ON c.id = ci.card_id
+    GROUP BY p.id, p.status, p.total_amount, p.created_at
+    ORDER BY p.id {direction}
+"""
@@ -0,0 +1,39 @@
+import logging
+
+from typing import List
+
+from backend.src.db._common import with_cursor
+from backend.src.db._queries import CARD_REQUEST_MATCHED_CHANNEL, MATCH_CARD_REQUESTS
+
+
+@with_cursor
+def match_card_requests(self, cursor, batch_size: int = 1000) -> List[tuple]:
+    """
+    Обработать пачку поступлений на склад: открытые заявки на эти карты, чья максимальная цена
+    покрывает цену поступления, переводятся в in_progress. О каждой такой заявке отправляется
+    NOTIFY в CARD_REQUEST_MATCHED_CHANNEL при фиксации транзакции.
+    :param batch_size: сколько записей очереди inventory_arrivals взять за раз
+    :return: список (id заявки, user_id, card_id, цена)
+    """
+    cursor.execute(MATCH_CARD_REQUESTS, (batch_size, CARD_REQUEST_MATCHED_CHANNEL))
+    matches = cursor.fetchall()
+
+    if matches:
+        logging.info(f"Card requests matched: {len(matches)}")
+
+    return matches
+
+
+def match_all_card_requests(self, batch_size: int = 1000) -> int:
+    """
+    Разобрать очередь поступлений целиком, каждая пачка - отдельная транзакция.
+    Записи, которые уже разбирает другой обработчик, пропускаются.
+    :return: число сопоставленных заявок
+    """
+    total = 0
+    while True:
+        with self.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM inventory_arrivals LIMIT 1 FOR UPDATE SKIP LOCKED")
+            if cursor.fetchone() is None:
+                return total
+        total += len(self.match_card_requests(batch_size=batch_size))
@@ -0,0 +1,163 @@
+import time
+import logging
+import threading
+
+from bisect import bisect_left
+from typing import Iterable, List
+
+from backend.src.db._common import with_cursor
+
+
+class NameIndex:
+    """
+    Префиксный индекс названий карт в памяти процесса.
+
+    Названия лежат в отсортированном массиве, поиск - бинарный, поэтому top-k
+    стоит O(log n + k). Дополнительно индексируются хвосты названий с начала
+    каждого слова, чтобы "bolt" находил "Lightning Bolt".
+    """
+
+    def __init__(self, refresh_interval: float = 600.0):
+        """
+        :param refresh_interval: через сколько секунд индекс считается устаревшим
+        """
+        self.refresh_interval = refresh_interval
+
+        self._names = ([], [])
+        self._words = ([], [])
+        self._built_at = None
+        self._built_generation = None
+        self.generation = 0
+
+    @property
+    def ready(self) -> bool:
+        return self._built_at is not None
+
+    def needs_refresh(self) -> bool:
+        return (self._built_generation != self.generation
+                or time.monotonic() - self._built_at > self.refresh_interval)
+
+    def clear(self):
+        """
+        Пометить индекс устаревшим. Старые данные отдаются, пока не построен новый индекс.
+        """
+        self.generation += 1
+
+    def build(self, names: Iterable[str], generation: int = None):
+        """
+        Построить индекс заново. Новые массивы подменяют старые одним присваиванием,
+        читатели не блокируются.
+        :param generation: поколение на момент чтения names; если индекс с тех пор помечен
+        устаревшим, он останется устаревшим
+        """
+        full, words = {}, {}
+        for name in names:
+            if not name:
+                continue
+            key = normalize_name(name)
+            full.setdefault(key, name)
+            parts = key.split(' ')
+            for i in range(1, len(parts)):
+                words.setdefault((' '.join(parts[i:]), key), name)
+
+        full_keys = sorted(full)
+        word_keys = sorted(words)
+
+        self._names = (full_keys, [full[key] for key in full_keys])
+        self._words = ([key for key, _ in word_keys], [words[key] for key in word_keys])
+        self._built_at = time.monotonic()
+        self._built_generation = self.generation if generation is None else generation
+
+    def complete(self, prefix: str, limit: int = 10) -> List[str]:
+        """
+        Названия, начинающиеся с prefix; если их меньше limit - добавляются совпадения по началу слова
+        :param prefix: начало названия
+        :param limit: сколько названий вернуть
+        :return: список названий
+        """
+        prefix = normalize_name(prefix)
+        if not prefix or limit <= 0:
+            return []
+
+        result = self._scan(self._names, prefix, limit)
+        if len(result) < limit:
+            seen = set(result)
+            for name in self._scan(self._words, prefix, limit * 2):
+                if name not in seen:
+                    seen.add(name)
+                    result.append(name)
+                    if len(result) == limit:
+                        break
+
+        return result
+
+    @staticmethod
+    def _scan(index: tuple, prefix: str, limit: int) -> List[str]:
+        keys, names = index
+        result = []
+        i = bisect_left(keys, prefix)
+        while i < len(keys) and len(result) < limit and keys[i].startswith(prefix):
+            result.append(names[i])
+            i += 1
+
+        return result
+
+    def __len__(self):
+        return len(self._names[0])
+
+
+def normalize_name(name: str) -> str:
+    return ' '.join(name.lower().split())
+
+
+@with_cursor
+def load_card_names(self, cursor) -> List[str]:
+    """
+    Все различные названия карт
+    """
+    cursor.execute("SELECT DISTINCT name FROM cards")
+
+    return [row[0] for row in cursor.fetchall()]
+
+
+def refresh_card_names(self, force: bool = True):
+    """
+    Перестроить индекс названий по таблице cards
+    :param force: перестроить, даже если индекс актуален
+    """
+    index = self._name_index
+
+    with self._name_index_lock:
+        if not force and index.ready and not index.needs_refresh():
+            return
+
+        started = time.perf_counter()
+        generation = index.generation
+        index.build(self.load_card_names(), generation)
+        logging.info(f"Card name index built: {len(index)} names "
+                     f"in {time.perf_counter() - started:.2f}s")
+
+
+def _refresh_card_names_quietly(self):
+    try:
+        self.refresh_card_names(force=False)
+    except Exception as e:
+        logging.error(f"Card name index refresh error: {e}")
+
+
+def suggest_card_names(self, prefix: str, limit: int = 10) -> List[str]:
+    """
+    Подсказки названий карт из индекса в памяти, без запроса к базе.
+    Первый вызов строит индекс; устаревший индекс перестраивается в фоне, пока отдаются старые данные.
+    :param prefix: начало названия
+    :param limit: сколько подсказок вернуть
+    :return: список названий
+    """
+    index = self._name_index
+
+    if not index.ready:
+        self.refresh_card_names(force=False)
+    elif index.needs_refresh() and not self._name_index_lock.locked():
+        threading.Thread(target=_refresh_card_names_quietly, args=(self,), daemon=True).start()
+
+    return index.complete(prefix, limit)
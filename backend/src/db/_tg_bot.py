@@ -1,19 +1,17 @@
 import logging
 
 from backend.src.db._common import with_cursor
-from backend.src.db._classes import User
+from backend.src.db._classes import User, USER_TELEGRAM_FIELDS
+from backend.src.db._base_user import notify_user_changed
+from backend.src.db._queries import select_user
 
 
 @with_cursor
 def get_user_by_telegram_username(self, cursor, telegram_username: int) -> User | None:
     try:
-        cursor.execute("SELECT * FROM users WHERE telegram_username = %s", (telegram_username, ))
-        user = cursor.fetchone()
+        cursor.execute(select_user(User.columns(USER_TELEGRAM_FIELDS), 'telegram_username'), (telegram_username, ))
 
-        if user is not None:
-            return User(user)
-
-        return None
+        return User.fetchone(cursor)
     except Exception as e:
         logging.error(f"Ошибка верификации телеграмма пользователя: {e}")
 
@@ -21,12 +19,10 @@ def get_user_by_telegram_username(self, cursor, telegram_username: int) -> User
 @with_cursor
 def is_verified_tg_user(self, cursor, telegram_username: int) -> bool:
     try:
-        cursor.execute("SELECT * FROM users WHERE telegram_username = %s", (telegram_username, ))
-        user = cursor.fetchone()
+        cursor.execute(select_user('telegram_verified', 'telegram_username'), (telegram_username, ))
+        row = cursor.fetchone()
 
-        if user is not None:
-            return User(user).telegram_verified
-        return False
+        return bool(row[0]) if row is not None else False
     except Exception as e:
         logging.error(f"Ошибка верификации телеграмма пользователя: {e}")
 
@@ -36,6 +32,7 @@ def verified_tg_user(self, cursor, telegram_chat_id, uuid: int):
     try:
         cursor.execute("UPDATE users SET telegram_verified = TRUE, telegram_chat_id = %s WHERE id = %s",
                                (telegram_chat_id, uuid,))
+        notify_user_changed(cursor, uuid)
     except Exception as e:
         logging.error(f"Ошибка верификации телеграмма пользователя: {e}")
 
@@ -0,0 +1,177 @@
+import os
+import time
+import asyncio
+import logging
+from dotenv import load_dotenv
+
+import asyncpg
+
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from backend.src.db._cache import LRUCache
+from backend.src.db._queries import TG_VERIFICATION_CHANNEL
+
+load_dotenv()
+
+# Через сколько секунд повторять подписку на уведомления, если соединение потеряно
+LISTEN_RETRY_INTERVAL = 30.0
+
+
+class AsyncDatabase:
+    """
+    Асинхронный доступ к базе данных для кода на asyncio (Telegram-бот).
+    Запросы не блокируют цикл событий; соединения берутся из собственного пула asyncpg.
+    """
+
+    def __init__(self, maxconn: int = None, timeout: float = None):
+        """
+        :param maxconn: максимальное число соединений в пуле (DB_POOL_MAX)
+        :param timeout: сколько секунд ждать свободное соединение (DB_POOL_TIMEOUT)
+        """
+        self.maxconn = maxconn or int(os.getenv('DB_POOL_MAX', 10))
+        self.timeout = timeout or float(os.getenv('DB_POOL_TIMEOUT', 30))
+        self._pool: Optional[asyncpg.Pool] = None
+        self._pool_lock: Optional[asyncio.Lock] = None
+
+        # Статус подтверждения Telegram по username, см. is_verified_tg_user
+        self._verification_cache = LRUCache(
+            maxsize=int(os.getenv('TG_VERIFICATION_CACHE_SIZE', 10000)),
+            ttl=float(os.getenv('TG_VERIFICATION_CACHE_TTL', 300))
+        )
+        self._listener: Optional[asyncpg.Connection] = None
+        self._listen_attempted_at = None
+
+    @staticmethod
+    def _connect_args() -> dict:
+        return {
+            'host': os.getenv('PGHOST'),
+            'database': os.getenv('PGDATABASE'),
+            'user': os.getenv('PGUSER'),
+            'password': os.getenv('PGPASSWORD'),
+            'port': os.getenv('DB_PORT'),
+        }
+
+    async def _create_pool(self) -> asyncpg.Pool:
+        """
+        Новый пул подключений к базе данных
+        :return: asyncpg.Pool
+        """
+        try:
+            pool = await asyncpg.create_pool(**self._connect_args(), min_size=1, max_size=self.maxconn)
+            logging.info("Connected to PostgreSQL successfully (async)")
+
+            return pool
+        except Exception as e:
+            logging.error(f"Connection error: {e}")
+            raise
+
+    async def pool(self) -> asyncpg.Pool:
+        """
+        Пул соединений, создаётся при первом обращении в работающем цикле событий
+        """
+        if self._pool is None:
+            if self._pool_lock is None:
+                self._pool_lock = asyncio.Lock()
+            async with self._pool_lock:
+                if self._pool is None:
+                    self._pool = await self._create_pool()
+
+        return self._pool
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[asyncpg.Connection]:
+        """
+        Контекст для соединения из пула на время одного вызова.
+        Одиночные запросы выполняются в autocommit; для нескольких изменений нужен conn.transaction()
+        :yield: соединение
+        """
+        pool = await self.pool()
+        async with pool.acquire(timeout=self.timeout) as conn:
+            yield conn
+
+    async def listen_verification_changes(self) -> bool:
+        """
+        Подписка на TG_VERIFICATION_CHANNEL отдельным соединением: изменения привязки Telegram
+        из веб-приложения сбрасывают записи кэша статуса подтверждения.
+        Потерянная подписка восстанавливается не чаще раза в LISTEN_RETRY_INTERVAL секунд.
+        :return: активна ли подписка
+        """
+        if self._listener is not None and not self._listener.is_closed():
+            return True
+
+        now = time.monotonic()
+        if self._listen_attempted_at is not None and now - self._listen_attempted_at < LISTEN_RETRY_INTERVAL:
+            return False
+        self._listen_attempted_at = now
+
+        try:
+            listener = await asyncpg.connect(**self._connect_args())
+            await listener.add_listener(TG_VERIFICATION_CHANNEL, self._on_verification_changed)
+            listener.add_termination_listener(self._on_listener_terminated)
+        except Exception as e:
+            logging.error(f"Verification listener error: {e}")
+            return False
+
+        # Пока подписки не было, уведомления терялись
+        self._verification_cache.clear()
+        self._listener = listener
+
+        return True
+
+    def _on_verification_changed(self, conn, pid, channel, payload):
+        self._verification_cache.pop(payload)
+
+    def _on_listener_terminated(self, conn):
+        logging.warning("Verification listener connection lost")
+        self._listener = None
+        self._verification_cache.clear()
+
+    def cache_stats(self) -> dict:
+        """
+        Счётчики кэшей
+        :return: словарь имя кэша -> статистика
+        """
+        return {'verification': self._verification_cache.stats()}
+
+    def pool_stats(self) -> dict:
+        """
+        Статистика пула соединений
+        :return: размер пула, свободные и занятые соединения
+        """
+        if self._pool is None:
+            return {'size': 0, 'max': self.maxconn, 'idle': 0, 'in_use': 0}
+
+        size, idle = self._pool.get_size(), self._pool.get_idle_size()
+        return {'size': size, 'max': self.maxconn, 'idle': idle, 'in_use': size - idle}
+
+    async def close(self):
+        """
+        Закрыть пул соединений
+        """
+        if self._listener is not None:
+            listener, self._listener = self._listener, None
+            listener.remove_termination_listener(self._on_listener_terminated)
+            await listener.close()
+        if self._pool is not None:
+            pool, self._pool = self._pool, None
+            await pool.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    """ ---- Tg_bot ---- """
+    from backend.src.db.aio._tg_bot import get_user_by_telegram_username, is_verified_tg_user, verified_tg_user
+
+    """ ---- Orders ---- """
+    from backend.src.db.aio._orders import get_user_orders
+
+    """ ---- Notifications ---- """
+    from backend.src.db.aio._notifications import get_order_chat_id, get_restock_subscribers
+
+    """ ---- Base_user  ---- """
+    from backend.src.db.aio._base_user import register_new_user, get_user, get_user_by_id, update_telegram_username
+    from backend.src.db.aio._base_user import update_username
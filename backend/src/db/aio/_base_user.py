@@ -0,0 +1,79 @@
+import logging
+
+from backend.src.db.aio._common import with_connection
+from backend.src.db._classes import User, USER_AUTH_FIELDS, USER_PROFILE_FIELDS
+from backend.src.db._queries import TG_VERIFICATION_CHANNEL, USER_CHANGED_CHANNEL, select_user
+
+
+async def notify_user_changed(conn, uuid: int):
+    """
+    Сообщить веб-процессам, что строка users изменилась: они сбросят пользователя в кэше get_user_by_id.
+    Вызывается после изменения, которое к этому моменту уже зафиксировано.
+    """
+    await conn.execute("SELECT pg_notify($1, $2)", USER_CHANGED_CHANNEL, str(uuid))
+
+
+@with_connection
+async def register_new_user(self, conn, username: str, email: str, password_hash: str) -> bool:
+    try:
+        uuid = await conn.fetchval(
+            "INSERT INTO users (username, email, password_hash) VALUES ($1, $2, $3) RETURNING id",
+            username, email, password_hash
+        )
+        await notify_user_changed(conn, uuid)
+
+        return True
+    except Exception as e:
+        logging.error(f"Error in register_new_user err: {e}")
+
+    return False
+
+
+@with_connection
+async def get_user(self, conn, email: str, fields: tuple = USER_AUTH_FIELDS) -> User or None:
+    try:
+        user_data = await conn.fetchrow(select_user(User.columns(fields), 'email', '$1'), email)
+
+        return User.from_record(user_data)
+    except Exception as e:
+        logging.error(f"Error in get_user err: {e}")
+
+
+@with_connection
+async def get_user_by_id(self, conn, uuid: int) -> User or None:
+    try:
+        user_data = await conn.fetchrow(select_user(User.columns(USER_PROFILE_FIELDS), 'id', '$1'), uuid)
+
+        return User.from_record(user_data)
+    except Exception as e:
+        logging.error(f"Error in get_user err: {e}")
+
+
+@with_connection
+async def update_telegram_username(self, conn, uuid: int, telegram_username: str):
+    try:
+        names = await conn.fetch("""
+            WITH old AS (SELECT id, telegram_username FROM users WHERE id = $1 FOR UPDATE),
+            updated AS (
+                UPDATE users u SET telegram_username = $2 FROM old WHERE u.id = old.id
+                RETURNING old.telegram_username AS old_username, u.telegram_username
+            )
+            SELECT v.name, pg_notify($3, v.name)
+            FROM updated, LATERAL (VALUES (updated.old_username), (updated.telegram_username)) v(name)
+            WHERE v.name IS NOT NULL
+        """, uuid, telegram_username, TG_VERIFICATION_CHANNEL)
+        await notify_user_changed(conn, uuid)
+
+        for name in names:
+            self._verification_cache.pop(name[0])
+    except Exception as e:
+        logging.error(f"Error in update_telegram_username err: {e}")
+
+
+@with_connection
+async def update_username(self, conn, uuid: int, username: str):
+    try:
+        await conn.execute("UPDATE users SET username = $1 WHERE id = $2", username, uuid)
+        await notify_user_changed(conn, uuid)
+    except Exception as e:
+        logging.error(f"Error in update_username err: {e}")
@@ -0,0 +1,15 @@
+from functools import wraps
+from typing import Callable
+
+
+def with_connection(func: Callable) -> Callable:
+    """
+    Декоратор для выполнения корутины на соединении из асинхронного пула
+    """
+
+    @wraps(func)
+    async def wrapper(self, *args, **kwargs):
+        async with self.connection() as conn:
+            return await func(self, conn, *args, **kwargs)
+
+    return wrapper
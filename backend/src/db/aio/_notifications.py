@@ -0,0 +1,47 @@
+import logging
+
+from typing import List
+
+from backend.src.db.aio._common import with_connection
+
+
+@with_connection
+async def get_order_chat_id(self, conn, order_id: int) -> int | None:
+    """
+    Чат владельца заказа, если его Telegram подтверждён
+    """
+    try:
+        return await conn.fetchval("""
+            SELECT u.telegram_chat_id
+            FROM orders o
+            JOIN users u ON u.id = o.user_id
+            WHERE o.id = $1 AND u.telegram_verified AND u.telegram_chat_id IS NOT NULL
+        """, order_id)
+    except Exception as e:
+        logging.error(f"Error in get_order_chat_id err: {e}")
+
+
+@with_connection
+async def get_restock_subscribers(self, conn, card_id: int) -> List[tuple]:
+    """
+    Кому сообщить о поступлении карты: авторы открытых заявок с подтверждённым Telegram,
+    чья максимальная цена не ниже минимальной цены на складе
+    :return: список (telegram_chat_id, название карты, минимальная цена)
+    """
+    try:
+        rows = await conn.fetch("""
+            SELECT DISTINCT u.telegram_chat_id, c.name, s.min_price
+            FROM card_requests r
+            JOIN users u ON u.id = r.user_id
+            JOIN cards c ON c.id = r.card_inventory_id
+            JOIN card_inventory_summary s ON s.card_id = c.id
+            WHERE r.card_inventory_id = $1
+              AND r.status = 'open'
+              AND u.telegram_verified AND u.telegram_chat_id IS NOT NULL
+              AND (r.max_price IS NULL OR s.min_price <= r.max_price)
+        """, card_id)
+
+        return [tuple(row) for row in rows]
+    except Exception as e:
+        logging.error(f"Error in get_restock_subscribers err: {e}")
+        return []
@@ -0,0 +1,61 @@
+import json
+import logging
+
+from backend.src.db.aio._common import with_connection
+from backend.src.db._queries import USER_ORDERS_PAGE
+
+
+@with_connection
+async def get_user_orders(self, conn, telegram_chat_id: int, limit: int = 5, before: int = None,
+                          after: int = None) -> tuple:
+    """
+    Заказы пользователя с позициями, новые первыми, с keyset-пагинацией по id заказа
+    :param telegram_chat_id: чат пользователя в Telegram
+    :param limit: размер страницы
+    :param before: id заказа, более старые заказы (следующая страница)
+    :param after: id заказа, более новые заказы (предыдущая страница)
+    :return: (orders, older_key, newer_key); orders - список словарей id, status, total_amount,
+    created_at, items; ключи - значения before/after для соседних страниц или None
+    """
+    params = [telegram_chat_id, limit + 1]
+    if after is not None:
+        keyset, direction = "AND o.id > $3", "ASC"
+        params.append(after)
+    elif before is not None:
+        keyset, direction = "AND o.id < $3", "DESC"
+        params.append(before)
+    else:
+        keyset, direction = "", "DESC"
+
+    try:
+        rows = await conn.fetch(USER_ORDERS_PAGE.format(chat_id='$1', limit='$2', keyset=keyset,
+                                                        direction=direction), *params)
+    except Exception as e:
+        logging.error(f"Error in get_user_orders err: {e}")
+        return [], None, None
+
+    # Лишняя строка показывает, есть ли ещё заказы в направлении чтения
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if after is not None:
+        rows.reverse()
+
+    orders = [{
+        'id': row['id'],
+        'status': row['status'],
+        'total_amount': row['total_amount'],
+        'created_at': row['created_at'],
+        'items': json.loads(row['items']) if isinstance(row['items'], str) else row['items'],
+    } for row in rows]
+
+    if not orders:
+        return orders, None, None
+
+    if after is not None:
+        older_key = orders[-1]['id']
+        newer_key = orders[0]['id'] if has_more else None
+    else:
+        older_key = orders[-1]['id'] if has_more else None
+        newer_key = orders[0]['id'] if before is not None else None
+
+    return orders, older_key, newer_key
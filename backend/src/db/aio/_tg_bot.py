@@ -0,0 +1,69 @@
+import logging
+
+from backend.src.db.aio._common import with_connection
+from backend.src.db._classes import User, USER_TELEGRAM_FIELDS
+from backend.src.db._queries import TG_VERIFICATION_CHANNEL, select_user
+from backend.src.db.aio._base_user import notify_user_changed
+
+
+@with_connection
+async def get_user_by_telegram_username(self, conn, telegram_username: str) -> User | None:
+    try:
+        user = await conn.fetchrow(select_user(User.columns(USER_TELEGRAM_FIELDS), 'telegram_username', '$1'),
+                                   telegram_username)
+
+        return User.from_record(user)
+    except Exception as e:
+        logging.error(f"Ошибка верификации телеграмма пользователя: {e}")
+
+
+@with_connection
+async def _fetch_verified(self, conn, telegram_username: str) -> bool | None:
+    try:
+        verified = await conn.fetchval(select_user('telegram_verified', 'telegram_username', '$1'),
+                                       telegram_username)
+
+        return bool(verified)
+    except Exception as e:
+        logging.error(f"Ошибка верификации телеграмма пользователя: {e}")
+
+
+async def is_verified_tg_user(self, telegram_username: str) -> bool:
+    """
+    Подтверждён ли Telegram-аккаунт. Статус кэшируется по username, пока жива подписка
+    на TG_VERIFICATION_CHANNEL: без неё изменения из веб-приложения не дошли бы до кэша.
+    """
+    cache = self._verification_cache
+
+    if not await self.listen_verification_changes():
+        return await _fetch_verified(self, telegram_username)
+
+    verified = cache.get(telegram_username)
+    if verified is not None:
+        return verified
+
+    generation = cache.generation
+    verified = await _fetch_verified(self, telegram_username)
+    if verified is not None:
+        cache.set(telegram_username, verified, generation)
+
+    return verified
+
+
+@with_connection
+async def verified_tg_user(self, conn, telegram_chat_id, uuid: int):
+    try:
+        telegram_username = await conn.fetchval("""
+            WITH updated AS (
+                UPDATE users SET telegram_verified = TRUE, telegram_chat_id = $1 WHERE id = $2
+                RETURNING telegram_username
+            )
+            SELECT telegram_username, pg_notify($3, telegram_username) FROM updated
+            WHERE telegram_username IS NOT NULL
+        """, telegram_chat_id, uuid, TG_VERIFICATION_CHANNEL)
+        await notify_user_changed(conn, uuid)
+
+        if telegram_username is not None:
+            self._verification_cache.pop(telegram_username)
+    except Exception as e:
+        logging.error(f"Ошибка верификации телеграмма пользователя: {e}")
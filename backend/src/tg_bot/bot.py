@@ -4,12 +4,15 @@ from dotenv import load_dotenv
 import logging
 from aiogram import Bot, Dispatcher, Router, F
 from aiogram.types import Message, ReplyKeyboardMarkup, KeyboardButton, ReplyKeyboardRemove
+from aiogram.types import CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.filters import Command
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.fsm.context import FSMContext
 import asyncio
 
-from backend.src.run import db
+from backend.src.db.aio import AsyncDatabase
+from backend.src.tg_bot.broadcaster import Broadcaster, ORDER_STATUSES
 
 load_dotenv()
 # Токен бота
@@ -18,6 +21,17 @@ BOT_TOKEN = os.getenv("TG_TOKEN")
 # Инициализация роутера
 router = Router()
 
+# Асинхронный доступ к базе: запросы не блокируют обработку других чатов
+db = AsyncDatabase()
+
+# Рассылка уведомлений, создаётся в main() вместе с ботом
+broadcaster: Broadcaster | None = None
+
+
+# Заказов на одной странице "Мои заказы" и позиций, показываемых в заказе
+ORDERS_PAGE_SIZE = 5
+ORDER_ITEMS_SHOWN = 5
+
 
 class Form(StatesGroup):
     waiting_for_confirmation = State()
@@ -32,7 +46,7 @@ async def create_main_keyboard(telegram_username: str) -> ReplyKeyboardMarkup:
     buttons = []
 
     # Проверяем статус подтверждения
-    is_confirmed = db.is_verified_tg_user(telegram_username=telegram_username)
+    is_confirmed = await db.is_verified_tg_user(telegram_username=telegram_username)
 
     # Добавляем кнопку "Подтвердить ТГ" только если не подтверждено
     if not is_confirmed:
@@ -94,14 +108,14 @@ async def confirm_tg(message: Message):
     # Например, отправка кода, проверка данных и т.д.
 
     confirmation_text = None
-    user = db.get_user_by_telegram_username(message.from_user.username)
+    user = await db.get_user_by_telegram_username(message.from_user.username)
 
     if user is None:
         confirmation_text = (
             "❌ Этот Telegram-аккаунт не привязан к аккаунту на сайте"
         )
     else:
-        db.verified_tg_user(telegram_chat_id=user_chat_id, uuid=user.id)
+        await db.verified_tg_user(telegram_chat_id=user_chat_id, uuid=user.id)
         confirmation_text = (
             "✅ Telegram-аккаунт успешно привязан к вашему профилю на сайте"
         )
@@ -110,21 +124,85 @@ async def confirm_tg(message: Message):
     await message.answer(confirmation_text, reply_markup=keyboard)
 
 
+def format_orders(orders: list) -> str:
+    """
+    Текст страницы заказов
+    """
+    if not orders:
+        return (
+            "📦 У вас пока нет заказов.\n\n"
+            "Если вы оформляли заказы на сайте, подтвердите Telegram кнопкой \"✅ Подтвердить ТГ\"."
+        )
+
+    lines = ["📦 Ваши заказы:\n"]
+    for order in orders:
+        created_at = order['created_at'].strftime('%d.%m.%Y') if order['created_at'] else ''
+        status = ORDER_STATUSES.get(order['status'], order['status'])
+        lines.append(f"Заказ #{order['id']:03d} от {created_at} - {status}")
+
+        items = order['items']
+        for item in items[:ORDER_ITEMS_SHOWN]:
+            lines.append(f"  • {item['name']} × {item['quantity']} - {float(item['unit_price']):.2f} ₽")
+        if len(items) > ORDER_ITEMS_SHOWN:
+            lines.append(f"  … и еще {len(items) - ORDER_ITEMS_SHOWN} поз.")
+
+        lines.append(f"  Итого: {float(order['total_amount']):.2f} ₽\n")
+
+    return "\n".join(lines)
+
+
+def create_orders_keyboard(older_key: int | None, newer_key: int | None) -> InlineKeyboardMarkup | None:
+    """
+    Кнопки листания заказов. В callback_data - id крайнего заказа страницы (keyset-курсор)
+    """
+    buttons = []
+    if newer_key is not None:
+        buttons.append(InlineKeyboardButton(text="◀️ Новее", callback_data=f"orders:newer:{newer_key}"))
+    if older_key is not None:
+        buttons.append(InlineKeyboardButton(text="Старше ▶️", callback_data=f"orders:older:{older_key}"))
+
+    return InlineKeyboardMarkup(inline_keyboard=[buttons]) if buttons else None
+
+
 # Обработчик кнопки "📦 Мои заказы"
 @router.message(F.text == "📦 Мои заказы")
 async def my_orders(message: Message):
     """
-    Обработчик кнопки "Мои заказы"
+    Обработчик кнопки "Мои заказы": первая страница заказов пользователя
+    """
+    orders, older_key, newer_key = await db.get_user_orders(telegram_chat_id=message.chat.id,
+                                                            limit=ORDERS_PAGE_SIZE)
+
+    await message.answer(format_orders(orders), reply_markup=create_orders_keyboard(older_key, newer_key))
+
+
+# Обработчик листания заказов
+@router.callback_query(F.data.startswith("orders:"))
+async def orders_page(callback: CallbackQuery):
+    """
+    Обработчик кнопок "Новее" / "Старше" под списком заказов
     """
-    orders_text = (
-        "📦 Ваши заказы:\n\n"
-        "1. Заказ #001 - В обработке\n"
-        "2. Заказ #002 - Доставляется\n"
-        "3. Заказ #003 - Завершен\n\n"
-        "Выберите заказ для деталей."
+    try:
+        _, direction, key = callback.data.split(":")
+        key = int(key)
+    except ValueError:
+        await callback.answer()
+        return
+
+    orders, older_key, newer_key = await db.get_user_orders(
+        telegram_chat_id=callback.message.chat.id,
+        limit=ORDERS_PAGE_SIZE,
+        before=key if direction == "older" else None,
+        after=key if direction == "newer" else None
     )
 
-    await message.answer(orders_text)
+    try:
+        await callback.message.edit_text(format_orders(orders),
+                                         reply_markup=create_orders_keyboard(older_key, newer_key))
+    except TelegramBadRequest:
+        # Повторное нажатие: страница не изменилась
+        pass
+    await callback.answer()
 
 
 # Обработчик кнопки "ℹ️ Информация"
@@ -181,10 +259,17 @@ async def main():
     Основная функция запуска бота
     """
     # Инициализация бота и диспетчера
+    global broadcaster
+
     bot = Bot(token=BOT_TOKEN)
     dp = Dispatcher()
     dp.include_router(router)
 
+    broadcaster = Broadcaster(bot, db)
+    dp.startup.register(broadcaster.start)
+    dp.shutdown.register(broadcaster.stop)
+    dp.shutdown.register(db.close)
+
     # Запуск бота
     await dp.start_polling(bot)
 
@@ -0,0 +1,349 @@
+import os
+import time
+import asyncio
+import logging
+
+from collections import OrderedDict, deque
+from typing import Callable, Dict, NamedTuple
+
+from aiogram import Bot
+from aiogram.exceptions import (TelegramRetryAfter, TelegramNetworkError, TelegramServerError,
+                                TelegramForbiddenError, TelegramBadRequest, TelegramNotFound)
+
+# Лимиты Telegram: около 30 сообщений в секунду на бота и 1 сообщение в секунду в один чат
+GLOBAL_RATE = 25.0
+CHAT_RATE = 1.0
+MAX_RETRIES = 5
+MAX_BACKOFF = 60.0
+# Сколько корзин чатов держать в памяти; давно не использованные вытесняются
+MAX_CHAT_BUCKETS = 10000
+
+ORDER_STATUSES = {
+    'pending': 'В обработке',
+    'paid': 'Оплачен',
+    'shipped': 'Доставляется',
+    'delivered': 'Завершен',
+    'completed': 'Завершен',
+    'cancelled': 'Отменен',
+}
+
+
+class TokenBucket:
+    """
+    Корзина токенов для asyncio: rate токенов в секунду, не больше capacity про запас.
+    Ожидающие получают токены по очереди.
+    """
+
+    def __init__(self, rate: float, capacity: float = None, clock: Callable[[], float] = time.monotonic):
+        """
+        :param rate: токенов в секунду
+        :param capacity: размер корзины (допустимый всплеск), по умолчанию max(1, rate)
+        :param clock: монотонные часы в секундах
+        """
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    @property
+    def idle(self) -> bool:
+        """
+        Корзина полна и никто не ждёт - её можно выбросить без потери лимита
+        """
+        self._refill()
+        return self._tokens >= self.capacity and not self._lock.locked()
+
+    def try_acquire(self) -> float:
+        """
+        Забрать один токен без ожидания
+        :return: 0, если токен получен, иначе через сколько секунд появится следующий
+        """
+        self._refill()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+
+        return (1 - self._tokens) / self.rate
+
+    async def acquire(self):
+        """
+        Дождаться и забрать один токен
+        """
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class Notification(NamedTuple):
+    chat_id: int
+    text: str
+
+
+class Broadcaster:
+    """
+    Очередь уведомлений в Telegram. Сообщения отправляют фоновые задачи-воркеры, поэтому
+    постановка в очередь не блокирует обработку апдейтов. Скорость ограничена общей корзиной
+    токенов и корзиной на каждый чат; на 429 все отправки ждут retry_after, сетевые ошибки
+    и 5xx повторяются с экспоненциальной задержкой.
+    Воркеры не ждут лимита чата: сообщения в чат с пустой корзиной откладываются в очередь этого чата
+    и по одному возвращаются в общую очередь, когда у чата появится токен.
+    Ограничение queue_size действует на все неотправленные сообщения, включая отложенные: всплеск
+    в один чат упирается в него так же, как общая очередь.
+    """
+
+    def __init__(self, bot: Bot, db=None, global_rate: float = None, chat_rate: float = None,
+                 queue_size: int = None, workers: int = None, backoff: float = 1.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        :param bot: бот, через которого отправляются сообщения
+        :param db: AsyncDatabase для событий по заказам и поступлениям
+        :param global_rate: сообщений в секунду на бота (TG_BROADCAST_RATE)
+        :param chat_rate: сообщений в секунду в один чат (TG_BROADCAST_CHAT_RATE)
+        :param queue_size: сколько сообщений может ждать отправки, включая отложенные (TG_BROADCAST_QUEUE_SIZE)
+        :param workers: число воркеров, одновременно ожидающих ответа Telegram
+        :param backoff: первая задержка перед повтором после сетевой ошибки, дальше удваивается
+        :param clock: монотонные часы для корзин токенов и ожидания после 429
+        """
+        self.bot = bot
+        self.db = db
+        self.chat_rate = chat_rate or float(os.getenv('TG_BROADCAST_CHAT_RATE', CHAT_RATE))
+        self.workers = workers or int(os.getenv('TG_BROADCAST_WORKERS', 8))
+        self.backoff = backoff
+
+        self._clock = clock
+        self._global = TokenBucket(global_rate or float(os.getenv('TG_BROADCAST_RATE', GLOBAL_RATE)), clock=clock)
+        self._chats: OrderedDict[int, TokenBucket] = OrderedDict()
+        # Отложенные сообщения чатов, у которых кончились токены. Голова очереди чата уже стоит
+        # (или скоро встанет) в общую очередь, остальные ждут её отправки
+        self._deferred: Dict[int, deque] = {}
+        self._releases = set()
+        self.queue_size = queue_size or int(os.getenv('TG_BROADCAST_QUEUE_SIZE', 50000))
+        # Общая очередь без своего лимита: место считает _pending - сообщения в очереди, отложенные
+        # и отправляемые. _space выставляется, когда место освобождается
+        self._queue = asyncio.Queue()
+        self._pending = 0
+        self._space = asyncio.Event()
+        self._tasks = []
+        self._retry_at = 0.0
+
+        self._sent = 0
+        self._failed = 0
+        self._retried = 0
+        self._dropped = 0
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            bucket = self._chats[chat_id] = TokenBucket(self.chat_rate, capacity=1, clock=self._clock)
+            while len(self._chats) > MAX_CHAT_BUCKETS:
+                oldest_id, oldest = next(iter(self._chats.items()))
+                if not oldest.idle:
+                    break
+                del self._chats[oldest_id]
+        else:
+            self._chats.move_to_end(chat_id)
+
+        return bucket
+
+    def send(self, chat_id: int, text: str) -> bool:
+        """
+        Поставить сообщение в очередь без ожидания
+        :return: False, если очередь переполнена и сообщение отброшено
+        """
+        if self._pending >= self.queue_size:
+            self._dropped += 1
+            logging.warning(f"Notification queue is full, dropping message to {chat_id}")
+            return False
+
+        self._put(Notification(chat_id, text))
+        return True
+
+    async def send_wait(self, chat_id: int, text: str):
+        """
+        Поставить сообщение в очередь, дождавшись места в ней
+        """
+        while self._pending >= self.queue_size:
+            self._space.clear()
+            await self._space.wait()
+
+        self._put(Notification(chat_id, text))
+
+    def _put(self, notification: Notification):
+        self._pending += 1
+        self._queue.put_nowait(notification)
+
+    def _done(self):
+        """
+        Сообщение отправлено или отброшено окончательно - освободить его место
+        """
+        self._pending -= 1
+        self._queue.task_done()
+        self._space.set()
+
+    async def order_status(self, order_id: int, status: str) -> bool:
+        """
+        Событие: изменился статус заказа. Сообщение уходит владельцу заказа, если его Telegram подтверждён.
+        :return: поставлено ли сообщение в очередь
+        """
+        chat_id = await self.db.get_order_chat_id(order_id)
+        if chat_id is None:
+            return False
+
+        return self.send(chat_id, f"📦 Заказ #{order_id:03d}: {ORDER_STATUSES.get(status, status)}")
+
+    async def restock(self, card_id: int) -> int:
+        """
+        Событие: карта появилась на складе. Сообщение уходит авторам открытых заявок на карту,
+        чья максимальная цена не ниже минимальной цены на складе.
+        :return: сколько сообщений поставлено в очередь
+        """
+        queued = 0
+        for chat_id, card_name, min_price in await self.db.get_restock_subscribers(card_id):
+            queued += self.send(chat_id, f"🔔 {card_name} снова в наличии от {float(min_price):.2f} ₽")
+
+        return queued
+
+    async def start(self):
+        """
+        Запустить воркеры
+        """
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self, drain: bool = True, timeout: float = 10.0):
+        """
+        Остановить воркеры
+        :param drain: сначала дождаться отправки уже поставленных сообщений (не дольше timeout)
+        """
+        if drain and self._tasks:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                logging.warning(f"Notification queue not drained, {self._queue.qsize()} messages left")
+
+        tasks = self._tasks + list(self._releases)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> dict:
+        """
+        Счётчики рассылки
+        :return: длина очереди, отложенные до токена чата, отправленные, неудачные, повторы и отброшенные сообщения
+        """
+        return {
+            'queued': self._queue.qsize(),
+            'deferred': sum(len(deferred) for deferred in self._deferred.values()),
+            'sent': self._sent,
+            'failed': self._failed,
+            'retried': self._retried,
+            'dropped': self._dropped,
+        }
+
+    async def _worker(self):
+        while True:
+            notification = await self._queue.get()
+            admitted = True
+            try:
+                admitted = self._admit(notification)
+                if admitted:
+                    await self._deliver(notification)
+            except Exception as e:
+                self._failed += 1
+                logging.error(f"Notification to {notification.chat_id} error: {e}")
+            finally:
+                # Отложенное сообщение остаётся незавершённым и занимает место в очереди,
+                # чтобы stop(drain=True) дождался его отправки
+                if admitted:
+                    self._done()
+
+    def _admit(self, notification: Notification) -> bool:
+        """
+        Взять токен чата для сообщения, не дожидаясь его
+        :return: True - можно отправлять, False - сообщение отложено в очередь чата
+        """
+        chat_id = notification.chat_id
+        deferred = self._deferred.get(chat_id)
+
+        if deferred is not None:
+            if deferred[0] is not notification:
+                # Чат ждёт токена: сообщение встаёт за уже отложенными, порядок в чате сохраняется
+                deferred.append(notification)
+                return False
+
+            # Голова очереди чата, которую вернул _release с уже взятым токеном
+            deferred.popleft()
+            if deferred:
+                self._start_release(chat_id)
+            else:
+                del self._deferred[chat_id]
+            return True
+
+        if not self._chat_bucket(chat_id).try_acquire():
+            return True
+
+        self._deferred[chat_id] = deque([notification])
+        self._start_release(chat_id)
+        return False
+
+    def _start_release(self, chat_id: int):
+        task = asyncio.create_task(self._release(chat_id))
+        self._releases.add(task)
+        task.add_done_callback(self._releases.discard)
+
+    async def _release(self, chat_id: int):
+        """
+        Дождаться токена чата и вернуть голову его очереди в общую очередь
+        """
+        bucket = self._chat_bucket(chat_id)
+        wait = bucket.try_acquire()
+        while wait:
+            await asyncio.sleep(wait)
+            wait = bucket.try_acquire()
+
+        self._queue.put_nowait(self._deferred[chat_id][0])
+        # Сообщение уже учтено в очереди и в _pending при первой постановке
+        self._queue.task_done()
+
+    async def _deliver(self, notification: Notification):
+        for attempt in range(MAX_RETRIES + 1):
+            # После 429 Telegram не принимает сообщения от бота retry_after секунд - ждут все воркеры
+            delay = self._retry_at - self._clock()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await self._global.acquire()
+
+            try:
+                await self.bot.send_message(chat_id=notification.chat_id, text=notification.text)
+                self._sent += 1
+                return
+            except TelegramRetryAfter as e:
+                self._retry_at = max(self._retry_at, self._clock() + e.retry_after)
+            except (TelegramNetworkError, TelegramServerError) as e:
+                logging.warning(f"Notification to {notification.chat_id} failed: {e}")
+                if attempt < MAX_RETRIES:
+                    await asyncio.sleep(min(MAX_BACKOFF, self.backoff * 2 ** attempt))
+            except (TelegramForbiddenError, TelegramBadRequest, TelegramNotFound) as e:
+                # Бот заблокирован или чат не существует - повтор не поможет
+                self._failed += 1
+                logging.info(f"Notification to {notification.chat_id} rejected: {e}")
+                return
+
+            if attempt < MAX_RETRIES:
+                self._retried += 1
+
+        self._failed += 1
+        logging.error(f"Notification to {notification.chat_id} failed after {MAX_RETRIES} retries")
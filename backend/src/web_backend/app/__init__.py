@@ -1,4 +1,6 @@
 import os
+import logging
+import threading
 from dotenv import load_dotenv
 
 from flask import Flask
@@ -6,15 +8,28 @@ from flask_bcrypt import Bcrypt
 from flask_cors import CORS
 
 from backend.src.db import Database
+from backend.src.api.images import ImageCache
+from backend.src.web_backend.app.passwords import PasswordHasher
 from flask_jwt_extended import JWTManager
 from itsdangerous import URLSafeTimedSerializer
 
 
-def create_app():
+def _warm_up_suggestions(db: Database):
+    try:
+        db.refresh_card_names(force=False)
+    except Exception as e:
+        logging.error(f"Card name index warm-up error: {e}")
+
+
+def create_app(db: Database = None):
+    """
+    :param db: база данных приложения; без неё создаётся своя. Закрывает её (close()) владелец
+    """
     load_dotenv()
 
     app = Flask(__name__)
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY')
+    app.config['BCRYPT_LOG_ROUNDS'] = int(os.getenv('BCRYPT_LOG_ROUNDS', 12))
     url = os.getenv('URL')
 
     CORS(app, resources={
@@ -27,18 +42,36 @@ def create_app():
             "origins": ["http://localhost:3000", "https://cardhub.pw"],
             "methods": ["GET", "POST"],
             "allow_headers": ["Content-Type", "Authorization", "X-Requested-With"]
+        },
+        r"/api/cart.*": {
+            "origins": ["http://localhost:3000", "https://cardhub.pw"],
+            "methods": ["GET", "POST", "PUT", "DELETE"],
+            "allow_headers": ["Content-Type", "Authorization"]
         }
     })
 
     from backend.src.web_backend.app.routes import cards
     from backend.src.web_backend.app.routes import base_user
+    from backend.src.web_backend.app.routes import cart
 
-    app.db = Database()
+    app.db = db if db is not None else Database()
+    app.image_cache = ImageCache()
     app.bcrypt = Bcrypt(app)
+    app.password_hasher = PasswordHasher(app.bcrypt, rounds=app.config['BCRYPT_LOG_ROUNDS'])
     app.jwt = JWTManager(app)
     app.serializer = URLSafeTimedSerializer(app.config['SECRET_KEY'])
 
     app.register_blueprint(cards.bp)
     app.register_blueprint(base_user.bp)
+    app.register_blueprint(cart.bp)
+
+    if os.getenv('SUGGEST_WARMUP', '1') == '1':
+        # Индекс подсказок строится в фоне при старте воркера, а не на первом запросе
+        threading.Thread(target=_warm_up_suggestions, args=(app.db,), daemon=True).start()
+
+    if os.getenv('DB_LISTEN', '1') == '1':
+        # Кэши пользователей для JWT и поиска карт и индекс подсказок обновляются по уведомлениям
+        # об изменениях из бота, импорта каталога, склада и других воркеров
+        app.db.listen_changes()
 
     return app
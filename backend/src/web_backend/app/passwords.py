@@ -0,0 +1,73 @@
+import os
+import re
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+from flask_bcrypt import Bcrypt
+
+_BCRYPT_COST = re.compile(r'^\$2[abxy]?\$(\d{2})\$')
+
+
+class PasswordHasherBusy(Exception):
+    """
+    Все места в очереди хэширования заняты, запрос нужно отклонить, а не ждать
+    """
+
+
+class PasswordHasher:
+    """
+    Хэширование и проверка паролей bcrypt в ограниченном пуле потоков.
+    bcrypt отпускает GIL, поэтому хэши считаются параллельно на workers ядрах, а число
+    ожидающих запросов ограничено max_pending: лишние сразу получают PasswordHasherBusy.
+    """
+
+    def __init__(self, bcrypt: Bcrypt, rounds: int = None, workers: int = None, max_pending: int = None,
+                 timeout: float = None):
+        """
+        :param bcrypt: Bcrypt приложения
+        :param rounds: стоимость bcrypt (BCRYPT_LOG_ROUNDS), хэши с другой стоимостью пересчитываются при входе
+        :param workers: число потоков хэширования (PASSWORD_HASH_WORKERS), по умолчанию число ядер
+        :param max_pending: сколько операций может выполняться и ждать одновременно (PASSWORD_HASH_MAX_PENDING)
+        :param timeout: сколько секунд ждать свободное место в очереди (PASSWORD_HASH_QUEUE_TIMEOUT)
+        """
+        self.bcrypt = bcrypt
+        self.rounds = rounds or int(os.getenv('BCRYPT_LOG_ROUNDS', 12))
+        self.workers = workers or int(os.getenv('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+        self.max_pending = max_pending or int(os.getenv('PASSWORD_HASH_MAX_PENDING', self.workers * 4))
+        self.timeout = timeout if timeout is not None else float(os.getenv('PASSWORD_HASH_QUEUE_TIMEOUT', 0.05))
+
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hash')
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+
+    def _run(self, func, *args):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PasswordHasherBusy()
+        try:
+            return self._executor.submit(func, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password: str) -> str:
+        """
+        Хэш пароля с текущей стоимостью
+        :raise PasswordHasherBusy: очередь хэширования заполнена
+        """
+        return self._run(self.bcrypt.generate_password_hash, password, self.rounds).decode('utf-8')
+
+    def check(self, password_hash: str, password: str) -> bool:
+        """
+        Проверка пароля по хэшу
+        :raise PasswordHasherBusy: очередь хэширования заполнена
+        """
+        return self._run(self.bcrypt.check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """
+        Хэш посчитан с другой стоимостью и должен быть пересчитан при следующем входе
+        """
+        match = _BCRYPT_COST.match(password_hash or '')
+        return match is not None and int(match.group(1)) != self.rounds
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
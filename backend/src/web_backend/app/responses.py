@@ -0,0 +1,70 @@
+import gzip
+import json
+import decimal
+from datetime import date
+
+from flask import Response, request
+from werkzeug.http import http_date
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Ответы меньше этого размера не сжимаются: выигрыш меньше накладных расходов
+COMPRESS_MIN_SIZE = 1024
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+
+def _default(value):
+    # Как у jsonify: даты в формате HTTP-date, Decimal (цены из DECIMAL) строкой без потери точности
+    if isinstance(value, date):
+        return http_date(value)
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(payload) -> bytes:
+    """
+    JSON в байтах: orjson, если установлен, иначе стандартный json.
+    Даты в обоих случаях сериализуются через _default, чтобы формат совпадал с jsonify
+    """
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+    return json.dumps(payload, default=_default, ensure_ascii=False, separators=(',', ':')).encode('UTF-8')
+
+
+def compress(body: bytes, accept_encoding) -> tuple:
+    """
+    Сжать тело ответа лучшим из поддерживаемых клиентом способов
+    :param accept_encoding: request.accept_encodings
+    :return: (тело, Content-Encoding или None)
+    """
+    if len(body) < COMPRESS_MIN_SIZE:
+        return body, None
+    if brotli is not None and accept_encoding['br']:
+        return brotli.compress(body, quality=BROTLI_QUALITY), 'br'
+    if accept_encoding['gzip']:
+        return gzip.compress(body, compresslevel=GZIP_LEVEL), 'gzip'
+    return body, None
+
+
+def fast_jsonify(payload, status: int = 200) -> Response:
+    """
+    Замена jsonify для тяжёлых ответов: быстрая сериализация и сжатие gzip/brotli по Accept-Encoding
+    """
+    body, encoding = compress(dumps(payload), request.accept_encodings)
+
+    response = Response(body, status=status, mimetype='application/json')
+    response.vary.add('Accept-Encoding')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+
+    return response
@@ -4,13 +4,23 @@ import logging
 
 from flask import Blueprint, jsonify, request, current_app
 from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity, create_refresh_token
-from flask_bcrypt import Bcrypt
 
 from backend.src.db import Database
+from backend.src.db._classes import USER_PROFILE_FIELDS, USER_UPDATE_FIELDS
+from backend.src.web_backend.app.passwords import PasswordHasher, PasswordHasherBusy
 
 
 bp = Blueprint('base_user', __name__)
 
+# Через сколько секунд клиенту повторить запрос, отклонённый из-за очереди хэширования
+BUSY_RETRY_AFTER = 1
+
+
+def _busy_response():
+    response = jsonify({'message': 'Сервер перегружен, повторите попытку позже'})
+    response.headers['Retry-After'] = str(BUSY_RETRY_AFTER)
+    return response, 503
+
 
 @bp.route('/api/auth/register', methods=['POST'])
 def register_new_user():
@@ -18,7 +28,7 @@ def register_new_user():
         data = request.get_json()
 
         db: Database = current_app.db
-        bcrypt: Bcrypt = current_app.bcrypt
+        hasher: PasswordHasher = current_app.password_hasher
 
         username = data.get('username')
         email = data.get('email').lower()
@@ -27,10 +37,12 @@ def register_new_user():
         if db.get_user(email) is not None:
             return jsonify({'error': 'Данный email уже зарегистрирован'}), 400
 
-        password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
+        password_hash = hasher.hash(password)
         db.register_new_user(username=username, email=email, password_hash=password_hash)
 
         return jsonify({'message': 'Пользователь успешно создан'}), 201
+    except PasswordHasherBusy:
+        return _busy_response()
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -39,7 +51,7 @@ def register_new_user():
 def login():
     try:
         db: Database = current_app.db
-        bcrypt: Bcrypt = current_app.bcrypt
+        hasher: PasswordHasher = current_app.password_hasher
 
         data = request.get_json()
         email = data.get('email').lower()
@@ -53,15 +65,24 @@ def login():
         if user is None:
             return jsonify({'message': 'Пользователь не найден'}), 404
 
-        if not bcrypt.check_password_hash(user.password_hash, password):
+        if not hasher.check(user.password_hash, password):
             return jsonify({'message': 'Неверный пароль'}), 401
 
+        if hasher.needs_rehash(user.password_hash):
+            # Стоимость bcrypt сменилась - пароль известен только сейчас, пересчитываем хэш
+            try:
+                db.update_password_hash(uuid=user.id, password_hash=hasher.hash(password))
+            except PasswordHasherBusy:
+                pass
+
         #if not user.email_verified:
         #    return jsonify({'message': 'Пожалуйста, подтвердите свой адрес электронной почты перед входом в систему.'}), 403
 
         access_token = create_access_token(identity=str(user.id))
         refresh_token = create_refresh_token(identity=str(user.id))
         return jsonify(access_token=access_token, refresh_token=refresh_token), 200
+    except PasswordHasherBusy:
+        return _busy_response()
     except Exception as err:
         logging.error(f"Ошибка: {err}\n")
         return jsonify({'message': 'Внутренняя ошибка сервера'}), 500
@@ -79,9 +100,12 @@ def get_user():
             return jsonify({'message': 'JWT Error: ' + str(jwt_err)}), 401
 
         db: Database = current_app.db
-        user = db.get_user_by_id(uuid=int(current_user_id)).data
-        print(user)
-        return jsonify(user=user), 200
+        user = db.get_user_by_id(uuid=int(current_user_id))
+
+        if user is None:
+            return jsonify({'message': 'Пользователь не найден'}), 404
+
+        return jsonify(user=user.to_dict(USER_PROFILE_FIELDS)), 200
     except Exception as err:
         logging.error(f"Ошибка: {err}\n")
         return jsonify({'message': 'Внутренняя ошибка сервера'}), 500
@@ -98,19 +122,23 @@ def update_user_profile():
         except Exception as jwt_err:
             return jsonify({'message': 'JWT Error: ' + str(jwt_err)}), 401
 
-        data = request.get_json()
-        username = data.get('username')
-        telegram_username = data.get('telegram_username')
+        data = request.get_json() or {}
+        fields = {field: data[field] for field in USER_UPDATE_FIELDS if data.get(field) is not None}
+
+        if not fields:
+            return jsonify({'message': 'Нет полей для изменения'}), 400
 
         db: Database = current_app.db
+        user, conflicts = db.update_user(uuid=int(current_user_id), **fields)
 
-        if telegram_username is not None:
-            db.update_telegram_username(uuid=current_user_id, telegram_username=telegram_username)
+        if conflicts:
+            return jsonify({'message': 'Значения уже заняты',
+                            'errors': {field: 'Уже занято' for field in conflicts}}), 409
 
-        if username is not None:
-            db.update_username(uuid=current_user_id, username=username)
+        if user is None:
+            return jsonify({'message': 'Пользователь не найден'}), 404
 
-        return jsonify({'message': 'Изменения сохранены'}), 200
+        return jsonify({'message': 'Изменения сохранены', 'user': user.to_dict(USER_PROFILE_FIELDS)}), 200
 
     except Exception as err:
         logging.error(f"Ошибка: {err}\n")
@@ -1,23 +1,165 @@
 import os
 import sys
+import json
+import base64
+import logging
 
-from flask import Blueprint, jsonify, request, current_app
+import requests
+from flask import Blueprint, jsonify, request, current_app, send_file
 
 
 from backend.src.db import Database
+from backend.src.db._cards import SEARCH_COUNT_MODES, DEFAULT_SIMILARITY_THRESHOLD, IMAGE_SIZES
+from backend.src.db._cards import SEARCH_COLUMNS, INVENTORY_FIELDS, search_projection
+from backend.src.web_backend.app.responses import fast_jsonify
+from backend.src.api.images import ImageCache
 
 
 bp = Blueprint('cards', __name__)
 
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+SEARCH_MODES = ('substring', 'ranked')
+# Поля карты в ответе поиска, если fields не задан
+DEFAULT_SEARCH_FIELDS = tuple(field for field in SEARCH_COLUMNS if field not in ('created_at', 'updated_at'))
+DEFAULT_SUGGEST_LIMIT = 10
+MAX_SUGGEST_LIMIT = 25
+# Адрес картинки у Scryfall меняется вместе с её содержимым, поэтому браузер может долго её не перепроверять
+IMAGE_MAX_AGE = 30 * 24 * 3600
+
+
+def encode_cursor(key: tuple) -> str:
+    """
+    Непрозрачный курсор страницы из ключа (name, set_name, id)
+    """
+    return base64.urlsafe_b64encode(json.dumps(key).encode('UTF-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token: str) -> tuple:
+    """
+    Ключ (name, set_name, id) из курсора страницы
+    :raise ValueError: курсор повреждён
+    """
+    try:
+        key = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+    if not (isinstance(key, list) and len(key) == 3 and isinstance(key[0], str) and isinstance(key[1], str)
+            and isinstance(key[2], int)):
+        raise ValueError("Invalid cursor")
+
+    return tuple(key)
+
+
+def parse_fields(value: str) -> tuple:
+    """
+    Поля ответа поиска из параметра fields=id,name,...
+    :raise ValueError: неизвестное поле
+    """
+    if not value:
+        return DEFAULT_SEARCH_FIELDS
+
+    return search_projection([field.strip() for field in value.split(',') if field.strip()])
+
+
+def rows_to_cards(fields: tuple, rows: list) -> list:
+    """
+    Строки поиска в объекты с именованными полями
+    """
+    return [dict(zip(fields, row)) for row in rows]
+
 
 @bp.route('/api/cards/search/<string:card_name>', methods=['GET'])
 def search_cards(card_name):
     try:
+        limit = request.args.get('limit', DEFAULT_SEARCH_LIMIT, type=int)
+        count = request.args.get('count', 'exact')
+        mode = request.args.get('mode', 'substring')
+
+        if not 1 <= limit <= MAX_SEARCH_LIMIT:
+            return jsonify({'error': f'limit должен быть от 1 до {MAX_SEARCH_LIMIT}'}), 400
+        if mode not in SEARCH_MODES:
+            return jsonify({'error': f'mode должен быть одним из: {", ".join(SEARCH_MODES)}'}), 400
+
+        try:
+            fields = parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
         db: Database = current_app.db
-        cards = db.search_card(card_name=card_name)
-        return jsonify(cards)
+
+        if mode == 'ranked':
+            # Нечёткий поиск отдаёт только top-N лучших совпадений, без страниц
+            threshold = request.args.get('threshold', DEFAULT_SIMILARITY_THRESHOLD, type=float)
+            if not 0 < threshold <= 1:
+                return jsonify({'error': 'threshold должен быть в диапазоне (0, 1]'}), 400
+
+            total, cards = db.search_card_ranked(card_name=card_name, limit=limit, threshold=threshold, fields=fields)
+            return fast_jsonify({'total': total, 'cards': rows_to_cards(fields + ('score',), cards),
+                                 'next_cursor': None})
+
+        if count not in SEARCH_COUNT_MODES:
+            return jsonify({'error': f'count должен быть одним из: {", ".join(SEARCH_COUNT_MODES)}'}), 400
+
+        try:
+            after = decode_cursor(request.args['cursor']) if request.args.get('cursor') else None
+        except ValueError:
+            return jsonify({'error': 'Некорректный cursor'}), 400
+
+        # Наличие на складе требует JOIN со сводкой - только если его запросили
+        search = db.search_cards_with_inventory if any(field in INVENTORY_FIELDS for field in fields) \
+            else db.search_card
+        total, cards, next_key = search(card_name=card_name, limit=limit, after=after, count=count, fields=fields)
+
+        return fast_jsonify({
+            'total': total,
+            'cards': rows_to_cards(fields, cards),
+            'next_cursor': encode_cursor(next_key) if next_key is not None else None
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/api/cards/suggest', methods=['GET'])
+def suggest_cards():
+    try:
+        prefix = request.args.get('q', '')
+        limit = request.args.get('limit', DEFAULT_SUGGEST_LIMIT, type=int)
+
+        if not 1 <= limit <= MAX_SUGGEST_LIMIT:
+            return jsonify({'error': f'limit должен быть от 1 до {MAX_SUGGEST_LIMIT}'}), 400
+
+        db: Database = current_app.db
+        return jsonify({'suggestions': db.suggest_card_names(prefix=prefix, limit=limit)})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+@bp.route('/api/cards/<int:card_id>/image/<string:size>', methods=['GET'])
+def card_image(card_id, size):
+    if size not in IMAGE_SIZES:
+        return jsonify({'error': f'size должен быть одним из: {", ".join(IMAGE_SIZES)}'}), 400
+
+    db: Database = current_app.db
+    url = db.get_card_image_url(card_id=card_id, size=size)
+    if url is None:
+        return jsonify({'error': 'Картинка не найдена'}), 404
+
+    image_cache: ImageCache = current_app.image_cache
+    try:
+        image = image_cache.get(url)
+    except ValueError as e:
+        # Адрес картинки в каталоге указывает на хост, с которого проксировать нельзя
+        logging.warning(f"Card {card_id} image not proxied: {e}")
+        return jsonify({'error': 'Картинка не найдена'}), 404
+    except requests.RequestException as e:
+        return jsonify({'error': f'Источник картинки недоступен: {e}'}), 502
 
+    # Отдаётся уже открытый файл: картинку может вытеснить другой воркер, пока идёт ответ
+    etag = image.etag.replace('W/', '').strip('"') if image.etag else None
+    response = send_file(image.file, mimetype=image.content_type, conditional=True, etag=etag,
+                         max_age=IMAGE_MAX_AGE)
+    response.content_length = os.fstat(image.file.fileno()).st_size
+    response.cache_control.public = True
+    return response
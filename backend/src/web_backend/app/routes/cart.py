@@ -0,0 +1,139 @@
+import logging
+
+from flask import Blueprint, jsonify, request, current_app
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+
+from backend.src.db import Database
+from backend.src.web_backend.app.responses import fast_jsonify
+
+
+bp = Blueprint('cart', __name__)
+
+# Сколько экземпляров одной позиции склада можно положить в корзину, как в CartContext
+MAX_ITEM_QUANTITY = 4
+
+
+def _current_user_id():
+    """
+    id пользователя из JWT
+    :return: (id, None) или (None, ответ 401)
+    """
+    try:
+        verify_jwt_in_request()
+        return int(get_jwt_identity()), None
+    except Exception as jwt_err:
+        return None, (jsonify({'message': 'JWT Error: ' + str(jwt_err)}), 401)
+
+
+def _parse_quantity(data: dict, default: int = None):
+    """
+    Количество из тела запроса
+    :raise ValueError: не целое или вне 1..MAX_ITEM_QUANTITY
+    """
+    quantity = data.get('quantity', default)
+    if isinstance(quantity, bool) or not isinstance(quantity, int) or not 1 <= quantity <= MAX_ITEM_QUANTITY:
+        raise ValueError(f'quantity должен быть целым числом от 1 до {MAX_ITEM_QUANTITY}')
+    return quantity
+
+
+@bp.route('/api/cart', methods=['GET'])
+def get_cart():
+    try:
+        user_id, error = _current_user_id()
+        if error:
+            return error
+
+        db: Database = current_app.db
+        items, total = db.get_cart(user_id=user_id)
+
+        return fast_jsonify({'items': [item.to_dict() for item in items], 'total': total})
+    except Exception as err:
+        logging.error(f"Ошибка: {err}\n")
+        return jsonify({'message': 'Внутренняя ошибка сервера'}), 500
+
+
+@bp.route('/api/cart', methods=['DELETE'])
+def clear_cart():
+    try:
+        user_id, error = _current_user_id()
+        if error:
+            return error
+
+        db: Database = current_app.db
+        db.clear_cart(user_id=user_id)
+
+        return '', 204
+    except Exception as err:
+        logging.error(f"Ошибка: {err}\n")
+        return jsonify({'message': 'Внутренняя ошибка сервера'}), 500
+
+
+@bp.route('/api/cart/items', methods=['POST'])
+def add_cart_item():
+    try:
+        user_id, error = _current_user_id()
+        if error:
+            return error
+
+        data = request.get_json() or {}
+        card_inventory_id = data.get('card_inventory_id')
+        if isinstance(card_inventory_id, bool) or not isinstance(card_inventory_id, int):
+            return jsonify({'message': 'card_inventory_id должен быть целым числом'}), 400
+        try:
+            quantity = _parse_quantity(data, default=1)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+
+        db: Database = current_app.db
+        quantity = db.add_cart_item(user_id=user_id, card_inventory_id=card_inventory_id, quantity=quantity,
+                                    max_quantity=MAX_ITEM_QUANTITY)
+
+        if quantity is None:
+            return jsonify({'message': 'Позиция не найдена'}), 404
+
+        return jsonify({'card_inventory_id': card_inventory_id, 'quantity': quantity}), 200
+    except Exception as err:
+        logging.error(f"Ошибка: {err}\n")
+        return jsonify({'message': 'Внутренняя ошибка сервера'}), 500
+
+
+@bp.route('/api/cart/items/<int:card_inventory_id>', methods=['PUT'])
+def update_cart_item(card_inventory_id):
+    try:
+        user_id, error = _current_user_id()
+        if error:
+            return error
+
+        try:
+            quantity = _parse_quantity(request.get_json() or {})
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+
+        db: Database = current_app.db
+        quantity = db.set_cart_item_quantity(user_id=user_id, card_inventory_id=card_inventory_id,
+                                             quantity=quantity)
+
+        if quantity is None:
+            return jsonify({'message': 'Позиция не найдена'}), 404
+
+        return jsonify({'card_inventory_id': card_inventory_id, 'quantity': quantity}), 200
+    except Exception as err:
+        logging.error(f"Ошибка: {err}\n")
+        return jsonify({'message': 'Внутренняя ошибка сервера'}), 500
+
+
+@bp.route('/api/cart/items/<int:card_inventory_id>', methods=['DELETE'])
+def remove_cart_item(card_inventory_id):
+    try:
+        user_id, error = _current_user_id()
+        if error:
+            return error
+
+        db: Database = current_app.db
+        if not db.remove_cart_item(user_id=user_id, card_inventory_id=card_inventory_id):
+            return jsonify({'message': 'Позиции нет в корзине'}), 404
+
+        return '', 204
+    except Exception as err:
+        logging.error(f"Ошибка: {err}\n")
+        return jsonify({'message': 'Внутренняя ошибка сервера'}), 500
@@ -9,6 +9,8 @@ import psycopg2
 from psycopg2.extensions import connection as pg_connection
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault('SUGGEST_WARMUP', '0')
+os.environ.setdefault('DB_LISTEN', '0')
 
 from backend.src.db import Database
 from backend.src.web_backend.app import create_app
@@ -17,14 +19,12 @@ from backend.src.web_backend.app import create_app
 @pytest.fixture
 def app():
     """Создает тестовое Flask приложение"""
-    app = create_app()
+    # Мокаем базу данных для тестов
+    app = create_app(db=MagicMock(spec=Database))
     app.config['TESTING'] = True
     app.config['JWT_SECRET_KEY'] = 'test-secret-key'
     app.config['SECRET_KEY'] = 'test-secret-key'
 
-    # Мокаем базу данных для тестов
-    app.db = MagicMock(spec=Database)
-
     return app
 
 
@@ -0,0 +1,153 @@
+import os
+import threading
+
+import pytest
+import requests
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from backend.src.api.images import ImageCache
+
+
+class _ImageHandler(BaseHTTPRequestHandler):
+    """Подмена CDN картинок: отдаёт картинку с ETag и отвечает 304 на совпавший If-None-Match"""
+    images = {'/a.jpg': b'a' * 100, '/b.jpg': b'b' * 100, '/c.jpg': b'c' * 100}
+    requests_log = []
+
+    def do_GET(self):
+        self.requests_log.append((self.path, self.headers.get('If-None-Match')))
+        if self.path not in self.images:
+            self.send_error(404)
+            return
+        etag = f'"{self.path}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = self.images[self.path]
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/jpeg')
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def upstream():
+    server = HTTPServer(('127.0.0.1', 0), _ImageHandler)
+    _ImageHandler.requests_log = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}'
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def image_cache(tmp_path):
+    return ImageCache(path=str(tmp_path), max_bytes=250, ttl=3600, allowed_hosts=None)
+
+
+class TestImageCache:
+    def test_miss_then_hit(self, image_cache, upstream):
+        """Тест загрузки при промахе и ответа из кэша без запроса"""
+        first = image_cache.get(upstream + '/a.jpg')
+        second = image_cache.get(upstream + '/a.jpg')
+
+        with first.file, second.file:
+            assert first.file.read() == second.file.read() == b'a' * 100
+        assert first.content_type == second.content_type == 'image/jpeg'
+        assert first.etag == '"/a.jpg"'
+        assert len(_ImageHandler.requests_log) == 1
+        assert image_cache.stats()['hits'] == 1
+
+    def test_revalidate_not_modified(self, image_cache, upstream):
+        """Тест условного запроса для устаревшей записи"""
+        image_cache.get(upstream + '/a.jpg')
+        image_cache.ttl = 0
+
+        image = image_cache.get(upstream + '/a.jpg')
+
+        with image.file:
+            assert image.file.read() == b'a' * 100
+        assert _ImageHandler.requests_log[-1] == ('/a.jpg', '"/a.jpg"')
+        assert image_cache.stats()['revalidations'] == 1
+
+    def test_lru_eviction(self, image_cache, upstream):
+        """Тест вытеснения давно не запрошенных картинок при превышении размера"""
+        for name in ('a', 'b', 'a', 'c'):
+            image_cache.get(upstream + f'/{name}.jpg').file.close()
+
+        stats = image_cache.stats()
+        assert stats['entries'] == 2
+        assert stats['bytes'] == 200
+        assert stats['evictions'] == 1
+
+        # a запрошена позже b и осталась в кэше
+        image_cache.get(upstream + '/a.jpg').file.close()
+        assert [path for path, _ in _ImageHandler.requests_log] == ['/a.jpg', '/b.jpg', '/c.jpg']
+
+    def test_shared_directory_eviction(self, image_cache, upstream, tmp_path):
+        """Тест: процессы с общим каталогом вытесняют по его реальному размеру"""
+        other = ImageCache(path=str(tmp_path), max_bytes=250, ttl=3600, allowed_hosts=None)
+
+        opened = image_cache.get(upstream + '/a.jpg')
+        other.get(upstream + '/b.jpg').file.close()
+        other.get(upstream + '/c.jpg').file.close()
+
+        assert other.stats()['bytes'] == 200
+        assert other.stats()['evictions'] == 1
+        # Картинку, вытесненную другим процессом, можно дочитать из уже открытого файла
+        with opened.file:
+            assert opened.file.read() == b'a' * 100
+
+        image_cache.get(upstream + '/a.jpg').file.close()
+        assert image_cache.stats()['bytes'] == 200
+        assert image_cache.stats()['evictions'] == 1
+
+    def test_scan_only_over_limit(self, image_cache, upstream, monkeypatch):
+        """Тест: пока размер в пределах max_bytes, каталог не пересчитывается"""
+        scans = []
+        scan = image_cache._scan
+        monkeypatch.setattr(image_cache, '_scan', lambda: scans.append(1) or scan())
+
+        image_cache.get(upstream + '/a.jpg').file.close()
+        image_cache.get(upstream + '/b.jpg').file.close()
+        assert scans == []
+        assert image_cache.stats()['bytes'] == 200
+
+        image_cache.get(upstream + '/c.jpg').file.close()
+        assert scans == [1]
+        assert image_cache.stats()['bytes'] == 200
+
+    def test_index_survives_restart(self, image_cache, upstream, tmp_path):
+        """Тест восстановления индекса кэша с диска"""
+        image_cache.get(upstream + '/a.jpg').file.close()
+
+        restarted = ImageCache(path=str(tmp_path), max_bytes=250, allowed_hosts=None)
+
+        assert restarted.stats()['bytes'] == 100
+
+    def test_upstream_error(self, image_cache, upstream):
+        """Тест ошибки источника при промахе"""
+        with pytest.raises(requests.HTTPError):
+            image_cache.get(upstream + '/missing.jpg')
+
+    def test_host_not_allowed(self, tmp_path):
+        """Тест запрета загрузки с посторонних хостов"""
+        cache = ImageCache(path=str(tmp_path))
+
+        with pytest.raises(ValueError):
+            cache.get('http://example.com/a.jpg')
+
+    def test_prefetch(self, image_cache, upstream):
+        """Тест прогрева кэша"""
+        stats = image_cache.prefetch([upstream + '/a.jpg', upstream + '/missing.jpg', ''], workers=2)
+        assert stats == {'cached': 0, 'fetched': 1, 'failed': 1}
+
+        stats = image_cache.prefetch([upstream + '/a.jpg'])
+        assert stats == {'cached': 1, 'fetched': 0, 'failed': 0}
+        assert len(_ImageHandler.requests_log) == 2
@@ -0,0 +1,229 @@
+import os
+import json
+import threading
+
+import pytest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest.mock import MagicMock, patch
+
+from backend.src.api.scryfall import Scryfall, RateLimiter, ResponseCache
+
+
+def make_response(status_code=200, body=None, headers=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.json.return_value = body
+    response.headers = headers or {}
+    return response
+
+
+@pytest.fixture
+def scryfall(tmp_path):
+    client = Scryfall(cache_dir=str(tmp_path), cache_ttl=3600, rate=0)
+    client.session = MagicMock()
+    return client
+
+
+class TestScryfall:
+    def test_search_card_encodes_query(self, scryfall):
+        """Тест кодирования запроса в URL"""
+        scryfall.session.get.return_value = make_response(body={'data': []})
+
+        scryfall.search_card("Lightning Bolt & co")
+
+        url = scryfall.session.get.call_args[0][0]
+        assert url == "https://api.scryfall.com/cards/search?q=Lightning+Bolt+%26+co"
+
+    def test_search_card_not_found(self, scryfall):
+        """Тест пустого результата при ответе не 200"""
+        scryfall.session.get.return_value = make_response(status_code=404)
+
+        assert scryfall.search_card("nothing") == []
+
+    def test_fresh_cache_skips_request(self, scryfall):
+        """Тест ответа из свежего кэша без запроса"""
+        scryfall.session.get.return_value = make_response(body={'data': [{'name': 'Bolt'}]})
+
+        first = scryfall.search_card("bolt")
+        second = scryfall.search_card("bolt")
+
+        assert first == second == {'data': [{'name': 'Bolt'}]}
+        assert scryfall.session.get.call_count == 1
+
+    def test_stale_cache_revalidates(self, scryfall):
+        """Тест условного запроса по ETag и ответа 304"""
+        scryfall.cache.ttl = 0
+        scryfall.session.get.side_effect = [
+            make_response(body={'data': [1]}, headers={'ETag': '"abc"', 'Last-Modified': 'Mon, 01 Jan 2024'}),
+            make_response(status_code=304)
+        ]
+
+        scryfall.search_card("bolt")
+        result = scryfall.search_card("bolt")
+
+        assert result == {'data': [1]}
+        headers = scryfall.session.get.call_args[1]['headers']
+        assert headers == {'If-None-Match': '"abc"', 'If-Modified-Since': 'Mon, 01 Jan 2024'}
+
+    def test_iter_search_follows_next_page(self, scryfall):
+        """Тест обхода страниц выдачи по next_page"""
+        scryfall.session.get.side_effect = [
+            make_response(body={'data': [1, 2], 'has_more': True,
+                                'next_page': 'https://api.scryfall.com/cards/search?q=bolt&page=2'}),
+            make_response(body={'data': [3], 'has_more': False})
+        ]
+
+        assert list(scryfall.iter_search("bolt")) == [1, 2, 3]
+        assert scryfall.session.get.call_args[0][0].endswith('page=2')
+
+    def test_no_cache(self):
+        """Тест клиента без дискового кэша"""
+        client = Scryfall(cache_dir='', rate=0)
+
+        assert client.cache is None
+
+
+class TestRateLimiter:
+    @patch('backend.src.api.scryfall.time.sleep')
+    def test_wait_spaces_requests(self, mock_sleep):
+        """Тест паузы между запросами"""
+        limiter = RateLimiter(rate=10)
+
+        limiter.wait()
+        limiter.wait()
+
+        assert mock_sleep.call_count == 1
+        assert 0 < mock_sleep.call_args[0][0] <= 0.1
+
+    @patch('backend.src.api.scryfall.time.sleep')
+    def test_unlimited(self, mock_sleep):
+        """Тест отключённого ограничения"""
+        limiter = RateLimiter(rate=0)
+
+        limiter.wait()
+        limiter.wait()
+
+        mock_sleep.assert_not_called()
+
+
+class TestResponseCache:
+    def test_set_get(self, tmp_path):
+        """Тест записи и чтения ответа"""
+        cache = ResponseCache(str(tmp_path))
+
+        cache.set("https://x/a", {'a': 1}, etag='"e"')
+
+        entry = cache.get("https://x/a")
+        assert entry['body'] == {'a': 1}
+        assert entry['etag'] == '"e"'
+        assert cache.is_fresh(entry)
+        assert cache.get("https://x/b") is None
+
+
+class _BulkDataHandler(BaseHTTPRequestHandler):
+    """Подмена Scryfall: манифест bulk-data и файл выгрузки с поддержкой Range"""
+    payload = b'[\n' + b',\n'.join(b'{"name": "Card %d"}' % i for i in range(1000)) + b'\n]\n'
+    updated_at = '2024-01-01T10:00:00.000+00:00'
+    requests_log = []
+
+    def do_GET(self):
+        self.requests_log.append((self.path, self.headers.get('Range')))
+        if self.path == '/bulk-data/default-cards':
+            body = json.dumps({
+                'updated_at': self.updated_at,
+                'download_uri': f'http://127.0.0.1:{self.server.server_port}/file.json',
+                'size': len(self.payload)
+            }).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+        elif self.path == '/file.json':
+            offset = 0
+            if self.headers.get('Range'):
+                offset = int(self.headers['Range'].split('=')[1].rstrip('-'))
+            body = self.payload[offset:]
+            self.send_response(206 if offset else 200)
+        else:
+            self.send_error(404)
+            return
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def bulk_server():
+    server = HTTPServer(('127.0.0.1', 0), _BulkDataHandler)
+    _BulkDataHandler.requests_log = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class TestBulkData:
+    def make_client(self, server, tmp_path):
+        return Scryfall(url=f'http://127.0.0.1:{server.server_port}/', cache_dir=str(tmp_path / 'cache'), rate=0)
+
+    def test_download_and_import(self, bulk_server, tmp_path):
+        """Тест загрузки выгрузки и передачи файла в импорт"""
+        path = str(tmp_path / 'default-cards.json')
+        db = MagicMock()
+
+        result = self.make_client(bulk_server, tmp_path).parse_defaulte_database(db=db, path=path)
+
+        assert result['downloaded'] is True
+        with open(path, 'rb') as file:
+            assert file.read() == _BulkDataHandler.payload
+        db.sync_cards_from_file.assert_called_once_with(file_path=path)
+        assert not os.path.exists(path + '.part')
+
+    def test_skip_when_not_updated(self, bulk_server, tmp_path):
+        """Тест пропуска загрузки, если updated_at не изменился"""
+        path = str(tmp_path / 'default-cards.json')
+        client = self.make_client(bulk_server, tmp_path)
+        client.parse_defaulte_database(path=path)
+        db = MagicMock()
+
+        result = client.parse_defaulte_database(db=db, path=path)
+
+        assert result['downloaded'] is False
+        db.sync_cards_from_file.assert_not_called()
+        assert [p for p, _ in _BulkDataHandler.requests_log].count('/file.json') == 1
+
+    def test_resume_partial_download(self, bulk_server, tmp_path):
+        """Тест докачки недокачанного файла через Range"""
+        path = str(tmp_path / 'default-cards.json')
+        client = self.make_client(bulk_server, tmp_path)
+        download_uri = f'http://127.0.0.1:{bulk_server.server_port}/file.json'
+        with open(path + '.meta.json', 'w') as file:
+            json.dump({'updated_at': _BulkDataHandler.updated_at, 'download_uri': download_uri,
+                       'complete': False}, file)
+        with open(path + '.part', 'wb') as file:
+            file.write(_BulkDataHandler.payload[:100])
+
+        client.parse_defaulte_database(path=path)
+
+        with open(path, 'rb') as file:
+            assert file.read() == _BulkDataHandler.payload
+        assert ('/file.json', 'bytes=100-') in _BulkDataHandler.requests_log
+
+    def test_size_mismatch(self, bulk_server, tmp_path):
+        """Тест отбраковки файла, размер которого не совпал с манифестом"""
+        path = str(tmp_path / 'default-cards.json')
+        client = self.make_client(bulk_server, tmp_path)
+        download_uri = f'http://127.0.0.1:{bulk_server.server_port}/file.json'
+        with open(path + '.meta.json', 'w') as file:
+            json.dump({'download_uri': download_uri}, file)
+        with open(path + '.part', 'wb') as file:
+            file.write(b'x' * 200)
+
+        with patch.object(_BulkDataHandler, 'payload', _BulkDataHandler.payload[:150]):
+            with pytest.raises(ValueError):
+                client.parse_defaulte_database(path=path)
+
+        assert not os.path.exists(path)
+        assert not os.path.exists(path + '.part')
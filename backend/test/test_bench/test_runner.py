@@ -0,0 +1,93 @@
+import pytest
+
+from backend.bench._data import write_cards_file, search_queries
+from backend.bench._runner import measure, compare, throughput
+from backend.src.db._cards import iter_json_array, transform_card_data
+
+
+def make_result(**results):
+    return {'meta': {'scale': {'cards': 10}}, 'results': results}
+
+
+class TestMeasure:
+    def test_measure(self):
+        """Тест сбора статистики по замерам без учёта прогрева"""
+        calls = []
+
+        stats = measure(calls.append, [(i,) for i in range(10)], warmup=3)
+
+        assert calls == [0, 1, 2] + list(range(10))
+        assert stats['count'] == 10
+        assert stats['min_ms'] <= stats['p50_ms'] <= stats['p95_ms'] <= stats['max_ms']
+        assert stats['ops_per_second'] > 0
+
+
+    def test_throughput(self):
+        """Тест пропускной способности с подсчётом кодов ответа"""
+        response = type('Response', (), {'status_code': 200})()
+
+        stats = throughput(lambda i: response, [(i,) for i in range(20)], concurrency=4)
+
+        assert stats['count'] == 20
+        assert stats['statuses'] == {'200': 20}
+        assert stats['ops_per_second'] > 0
+
+
+class TestCompare:
+    def test_latency_regression(self):
+        """Тест обнаружения роста задержки сверх порога"""
+        baseline = make_result(search={'p50_ms': 10.0, 'p95_ms': 20.0})
+        current = make_result(search={'p50_ms': 13.0, 'p95_ms': 21.0})
+
+        rows = {row['metric']: row for row in compare(baseline, current, threshold=0.2)}
+
+        assert rows['p50_ms']['regression'] is True
+        assert rows['p50_ms']['change'] == pytest.approx(0.3)
+        assert rows['p95_ms']['regression'] is False
+
+    def test_throughput_regression(self):
+        """Тест: для пропускной способности хуже - меньше"""
+        baseline = make_result(load={'rows_per_second': 1000.0})
+
+        assert compare(baseline, make_result(load={'rows_per_second': 700.0}))[0]['regression'] is True
+        assert compare(baseline, make_result(load={'rows_per_second': 2000.0}))[0]['regression'] is False
+
+    def test_ops_per_second_only_for_throughput(self):
+        """Тест: у замеров задержки ops_per_second не сравнивается отдельно"""
+        baseline = make_result(search={'p50_ms': 10.0, 'ops_per_second': 100.0},
+                               burst={'ops_per_second': 100.0})
+        current = make_result(search={'p50_ms': 10.0, 'ops_per_second': 50.0},
+                              burst={'ops_per_second': 50.0})
+
+        rows = compare(baseline, current)
+
+        assert [(row['name'], row['metric']) for row in rows] == [('search', 'p50_ms'), ('burst', 'ops_per_second')]
+        assert rows[1]['regression'] is True
+
+    def test_new_benchmark_skipped(self):
+        """Тест: замеры, которых нет в базовом прогоне, не сравниваются"""
+        assert compare(make_result(), make_result(search={'p50_ms': 1.0})) == []
+
+
+class TestData:
+    def test_cards_file(self, tmp_path):
+        """Тест синтетической выгрузки в формате Scryfall"""
+        path = tmp_path / 'cards.json'
+
+        names = write_cards_file(str(path), 50, seed=1)
+
+        with open(path, encoding='UTF-8') as file:
+            cards = list(iter_json_array(file))
+        assert len(cards) == 50
+        assert len({(card['set'], card['collector_number']) for card in cards}) == 50
+        row = transform_card_data(None, cards[0])
+        assert row['name'] in names
+        assert row['image_url_normal'].startswith('https://cards.scryfall.io/normal/')
+
+    def test_cards_file_reproducible(self, tmp_path):
+        """Тест воспроизводимости данных при одном зерне"""
+        write_cards_file(str(tmp_path / 'a.json'), 20, seed=7)
+        write_cards_file(str(tmp_path / 'b.json'), 20, seed=7)
+
+        assert (tmp_path / 'a.json').read_text() == (tmp_path / 'b.json').read_text()
+        assert search_queries(['Grim Titan'], 5, seed=1) == search_queries(['Grim Titan'], 5, seed=1)
@@ -0,0 +1,221 @@
+import pytest
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from backend.src.db.aio import AsyncDatabase
+from backend.src.db._classes import User, USER_TELEGRAM_FIELDS, USER_PROFILE_FIELDS
+from backend.src.db._queries import TG_VERIFICATION_CHANNEL, USER_CHANGED_CHANNEL
+
+
+@pytest.fixture
+def mock_async_conn():
+    """Мок для соединения asyncpg"""
+    conn = MagicMock()
+    conn.fetchrow = AsyncMock(return_value=None)
+    conn.fetchval = AsyncMock(return_value=None)
+    conn.execute = AsyncMock()
+    return conn
+
+
+@pytest.fixture
+def async_db(mock_async_conn):
+    db = AsyncDatabase()
+
+    @asynccontextmanager
+    async def connection():
+        yield mock_async_conn
+
+    db.connection = connection
+    db.listen_verification_changes = AsyncMock(return_value=True)
+    return db
+
+
+class TestAsyncDatabase:
+    @pytest.mark.asyncio
+    async def test_pool_created_once(self):
+        """Тест ленивого создания пула при первом запросе"""
+        pool = MagicMock()
+        pool.acquire.return_value.__aenter__ = AsyncMock(return_value='conn')
+        pool.acquire.return_value.__aexit__ = AsyncMock(return_value=False)
+        pool.close = AsyncMock()
+
+        with patch('asyncpg.create_pool', AsyncMock(return_value=pool)) as create_pool:
+            async with AsyncDatabase(maxconn=5, timeout=2) as db:
+                async with db.connection() as conn:
+                    assert conn == 'conn'
+                async with db.connection():
+                    pass
+
+            create_pool.assert_awaited_once()
+            assert create_pool.call_args.kwargs['max_size'] == 5
+            pool.acquire.assert_called_with(timeout=2)
+            pool.close.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_get_user_by_telegram_username(self, async_db, mock_async_conn, sample_user_data):
+        """Тест получения пользователя по Telegram username"""
+        sample_user_data['telegram_username'] = "@testuser"
+        # asyncpg.Record отдаёт имена и значения столбцов как словарь
+        mock_async_conn.fetchrow.return_value = {name: sample_user_data[name] for name in USER_TELEGRAM_FIELDS}
+
+        user = await async_db.get_user_by_telegram_username("@testuser")
+
+        assert isinstance(user, User)
+        assert user.telegram_username == "@testuser"
+        assert user.password_hash is None
+        mock_async_conn.fetchrow.assert_awaited_once_with(
+            f"SELECT {', '.join(USER_TELEGRAM_FIELDS)} FROM users WHERE telegram_username = $1", "@testuser"
+        )
+
+    @pytest.mark.asyncio
+    async def test_get_user_by_telegram_username_not_found(self, async_db):
+        """Тест получения несуществующего пользователя по Telegram"""
+        assert await async_db.get_user_by_telegram_username("@notfound") is None
+
+    @pytest.mark.asyncio
+    async def test_is_verified_tg_user(self, async_db, mock_async_conn):
+        """Тест проверки верифицированного Telegram"""
+        mock_async_conn.fetchval.return_value = True
+        assert await async_db.is_verified_tg_user("@testuser") is True
+
+        mock_async_conn.fetchval.return_value = None
+        assert await async_db.is_verified_tg_user("@notfound") is False
+
+    @pytest.mark.asyncio
+    async def test_is_verified_tg_user_cached(self, async_db, mock_async_conn):
+        """Тест кэширования статуса подтверждения"""
+        mock_async_conn.fetchval.return_value = False
+
+        assert await async_db.is_verified_tg_user("@testuser") is False
+        assert await async_db.is_verified_tg_user("@testuser") is False
+
+        mock_async_conn.fetchval.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_is_verified_tg_user_without_listener(self, async_db, mock_async_conn):
+        """Тест запроса в обход кэша, когда подписка на изменения недоступна"""
+        async_db.listen_verification_changes.return_value = False
+        mock_async_conn.fetchval.return_value = True
+
+        await async_db.is_verified_tg_user("@testuser")
+        await async_db.is_verified_tg_user("@testuser")
+
+        assert mock_async_conn.fetchval.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_is_verified_tg_user_error_not_cached(self, async_db, mock_async_conn):
+        """Тест: ошибка запроса не попадает в кэш"""
+        mock_async_conn.fetchval.side_effect = [Exception("timeout"), True]
+
+        assert await async_db.is_verified_tg_user("@testuser") is None
+        assert await async_db.is_verified_tg_user("@testuser") is True
+
+    @pytest.mark.asyncio
+    async def test_verified_tg_user(self, async_db, mock_async_conn):
+        """Тест подтверждения Telegram со сбросом кэша"""
+        mock_async_conn.fetchval.return_value = False
+        await async_db.is_verified_tg_user("@testuser")
+
+        mock_async_conn.fetchval.return_value = "@testuser"
+        await async_db.verified_tg_user(telegram_chat_id=12345, uuid=1)
+
+        query, *params = mock_async_conn.fetchval.call_args[0]
+        assert "UPDATE users SET telegram_verified = TRUE, telegram_chat_id = $1 WHERE id = $2" in query
+        assert params == [12345, 1, TG_VERIFICATION_CHANNEL]
+        mock_async_conn.execute.assert_awaited_with("SELECT pg_notify($1, $2)", USER_CHANGED_CHANNEL, "1")
+
+        mock_async_conn.fetchval.return_value = True
+        assert await async_db.is_verified_tg_user("@testuser") is True
+
+    @pytest.mark.asyncio
+    async def test_update_telegram_username_invalidates(self, async_db, mock_async_conn):
+        """Тест сброса кэша для старого и нового username"""
+        async_db._verification_cache.set("@old", True)
+        async_db._verification_cache.set("@new", False)
+        mock_async_conn.fetch = AsyncMock(return_value=[("@old", ''), ("@new", '')])
+
+        await async_db.update_telegram_username(uuid=1, telegram_username="@new")
+
+        assert len(async_db._verification_cache) == 0
+
+    def test_verification_notification(self, async_db):
+        """Тест сброса кэша по уведомлению из другого процесса"""
+        async_db._verification_cache.set("@testuser", True)
+
+        async_db._on_verification_changed(None, 1, TG_VERIFICATION_CHANNEL, "@testuser")
+
+        assert async_db._verification_cache.get("@testuser") is None
+
+    @pytest.mark.asyncio
+    async def test_register_new_user(self, async_db, mock_async_conn):
+        """Тест регистрации пользователя с уведомлением веб-процессов"""
+        mock_async_conn.fetchval.return_value = 7
+
+        assert await async_db.register_new_user("user", "user@example.com", "hash") is True
+
+        assert "RETURNING id" in mock_async_conn.fetchval.call_args[0][0]
+        mock_async_conn.execute.assert_awaited_once_with("SELECT pg_notify($1, $2)", USER_CHANGED_CHANNEL, "7")
+
+    @pytest.mark.asyncio
+    async def test_register_new_user_failure(self, async_db, mock_async_conn):
+        """Тест ошибки регистрации пользователя"""
+        mock_async_conn.fetchval.side_effect = Exception("duplicate key")
+
+        assert await async_db.register_new_user("user", "user@example.com", "hash") is False
+
+    @pytest.mark.asyncio
+    async def test_update_username(self, async_db, mock_async_conn):
+        """Тест изменения username с уведомлением веб-процессов"""
+        await async_db.update_username(uuid=1, username="newusername")
+
+        assert mock_async_conn.execute.await_args_list[0][0] == (
+            "UPDATE users SET username = $1 WHERE id = $2", "newusername", 1)
+        mock_async_conn.execute.assert_awaited_with("SELECT pg_notify($1, $2)", USER_CHANGED_CHANNEL, "1")
+
+    @pytest.mark.asyncio
+    async def test_get_user_by_id(self, async_db, mock_async_conn, sample_user_data):
+        """Тест получения пользователя по id"""
+        # asyncpg.Record отдаёт keys() и values(), как dict
+        mock_async_conn.fetchrow.return_value = {name: sample_user_data[name] for name in USER_PROFILE_FIELDS}
+
+        user = await async_db.get_user_by_id(1)
+
+        assert user.id == sample_user_data['id']
+        assert user.username == sample_user_data['username']
+        mock_async_conn.fetchrow.assert_awaited_once_with(
+            f"SELECT {User.columns(USER_PROFILE_FIELDS)} FROM users WHERE id = $1", 1)
+
+    @pytest.mark.asyncio
+    async def test_get_user_orders_first_page(self, async_db, mock_async_conn):
+        """Тест первой страницы заказов с позициями одним запросом"""
+        mock_async_conn.fetch = AsyncMock(return_value=[
+            {'id': order_id, 'status': 'pending', 'total_amount': 10, 'created_at': None,
+             'items': '[{"name": "Sol Ring", "quantity": 1, "unit_price": 10}]'}
+            for order_id in (9, 8, 7)
+        ])
+
+        orders, older_key, newer_key = await async_db.get_user_orders(telegram_chat_id=12345, limit=2)
+
+        assert [o['id'] for o in orders] == [9, 8]
+        assert orders[0]['items'][0]['name'] == 'Sol Ring'
+        assert (older_key, newer_key) == (8, None)
+        query, *params = mock_async_conn.fetch.call_args[0]
+        assert "json_agg" in query and "ORDER BY o.id DESC" in query
+        assert params == [12345, 3]
+        mock_async_conn.fetch.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_get_user_orders_newer_page(self, async_db, mock_async_conn):
+        """Тест возврата к более новым заказам"""
+        mock_async_conn.fetch = AsyncMock(return_value=[
+            {'id': order_id, 'status': 'pending', 'total_amount': 10, 'created_at': None, 'items': []}
+            for order_id in (5, 6)
+        ])
+
+        orders, older_key, newer_key = await async_db.get_user_orders(telegram_chat_id=12345, limit=2, after=4)
+
+        assert [o['id'] for o in orders] == [6, 5]
+        assert (older_key, newer_key) == (5, None)
+        query, *params = mock_async_conn.fetch.call_args[0]
+        assert "o.id > $3" in query and "ORDER BY o.id ASC" in query
+        assert params == [12345, 3, 4]
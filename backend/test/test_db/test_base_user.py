@@ -1,103 +1,145 @@
 import pytest
 from unittest.mock import Mock, patch, MagicMock
 from backend.src.db._base_user import register_new_user, get_user, get_user_by_id
-from backend.src.db._base_user import update_telegram_username, update_username
-from backend.src.db._classes import User
+from backend.src.db._base_user import update_telegram_username, update_username, update_user
+from backend.src.db._classes import User, USER_PROFILE_FIELDS
+from backend.src.db._queries import TG_VERIFICATION_CHANNEL, USER_CHANGED_CHANNEL
 
 
 class TestBaseUser:
     def test_register_new_user_success(self, mock_cursor):
         """Тест успешной регистрации пользователя"""
-        mock_self = Mock()
-        mock_self.cursor.return_value.__enter__.return_value = mock_cursor
+        mock_self = MagicMock()
+        mock_cursor.fetchone.return_value = (7,)
 
-        result = register_new_user(mock_self, mock_cursor,
-                                   username="testuser",
-                                   email="test@example.com",
-                                   password_hash="hashed123")
+        result = register_new_user.__wrapped__(mock_self, mock_cursor,
+                                               username="testuser",
+                                               email="test@example.com",
+                                               password_hash="hashed123")
 
         assert result is True
-        mock_cursor.execute.assert_called_once()
-        args = mock_cursor.execute.call_args[0]
-        assert args[0] == "INSERT INTO users (username, email, password_hash) VALUES (%s, %s, %s)"
+        args = mock_cursor.execute.call_args_list[0][0]
+        assert args[0] == "INSERT INTO users (username, email, password_hash) VALUES (%s, %s, %s) RETURNING id"
         assert args[1] == ("testuser", "test@example.com", "hashed123")
+        mock_cursor.execute.assert_called_with("SELECT pg_notify(%s, %s)", (USER_CHANGED_CHANNEL, "7"))
+        mock_self.invalidate_user.assert_called_once_with(7)
 
     def test_register_new_user_failure(self, mock_cursor):
         """Тест ошибки при регистрации"""
-        mock_self = Mock()
-        mock_self.cursor.return_value.__enter__.return_value = mock_cursor
+        mock_self = MagicMock()
         mock_cursor.execute.side_effect = Exception("DB Error")
 
-        result = register_new_user(mock_self, mock_cursor,
-                                   username="testuser",
-                                   email="test@example.com",
-                                   password_hash="hashed123")
+        result = register_new_user.__wrapped__(mock_self, mock_cursor,
+                                               username="testuser",
+                                               email="test@example.com",
+                                               password_hash="hashed123")
 
         assert result is False
         mock_self._conn.rollback.assert_called_once()
 
     def test_get_user_found(self, mock_cursor, sample_user_data):
         """Тест получения существующего пользователя"""
-        mock_self = Mock()
-        mock_self.cursor.return_value.__enter__.return_value = mock_cursor
-        mock_cursor.fetchone.return_value = tuple(sample_user_data.values())
+        mock_self = MagicMock()
+        mock_cursor.description = [('id',), ('email',), ('password_hash',)]
+        mock_cursor.fetchone.return_value = (1, 'test@example.com', 'hashed_password')
 
-        user = get_user(mock_self, mock_cursor, email="test@example.com")
+        user = get_user.__wrapped__(mock_self, mock_cursor, email="test@example.com")
 
         assert isinstance(user, User)
         assert user.id == sample_user_data['id']
         assert user.email == sample_user_data['email']
-        assert user.username == sample_user_data['username']
+        assert user.password_hash == sample_user_data['password_hash']
+        assert user.username is None
         mock_cursor.execute.assert_called_with(
-            "SELECT * FROM users WHERE email = %s",
+            "SELECT id, email, password_hash FROM users WHERE email = %s",
             ("test@example.com",)
         )
 
     def test_get_user_not_found(self, mock_cursor):
         """Тест получения несуществующего пользователя"""
-        mock_self = Mock()
-        mock_self.cursor.return_value.__enter__.return_value = mock_cursor
+        mock_self = MagicMock()
         mock_cursor.fetchone.return_value = None
 
-        user = get_user(mock_self, mock_cursor, email="notfound@example.com")
+        user = get_user.__wrapped__(mock_self, mock_cursor, email="notfound@example.com")
 
         assert user is None
 
     def test_get_user_by_id(self, mock_cursor, sample_user_data):
         """Тест получения пользователя по ID"""
-        mock_self = Mock()
-        mock_self.cursor.return_value.__enter__.return_value = mock_cursor
-        mock_cursor.fetchone.return_value = tuple(sample_user_data.values())
+        mock_self = MagicMock()
+        profile = {name: sample_user_data[name] for name in USER_PROFILE_FIELDS}
+        mock_cursor.description = [(name,) for name in profile]
+        mock_cursor.fetchone.return_value = tuple(profile.values())
 
-        user = get_user_by_id(mock_self, mock_cursor, uuid=1)
+        user = get_user_by_id.__wrapped__(mock_self, mock_cursor, uuid=1)
 
         assert isinstance(user, User)
         assert user.id == 1
-        mock_cursor.execute.assert_called_with(
-            "SELECT * FROM users WHERE id = %s",
-            (1,)
-        )
+        assert user.to_dict(USER_PROFILE_FIELDS) == profile
+        query, params = mock_cursor.execute.call_args[0]
+        assert query == f"SELECT {', '.join(USER_PROFILE_FIELDS)} FROM users WHERE id = %s"
+        assert "password_hash" not in query
+        assert params == (1,)
 
     def test_update_telegram_username(self, mock_cursor):
         """Тест обновления Telegram username"""
-        mock_self = Mock()
-        mock_self.cursor.return_value.__enter__.return_value = mock_cursor
+        mock_self = MagicMock()
 
-        update_telegram_username(mock_self, mock_cursor, uuid=1, telegram_username="@testuser")
+        update_telegram_username.__wrapped__(mock_self, mock_cursor, uuid=1, telegram_username="@testuser")
 
-        mock_cursor.execute.assert_called_with(
-            "UPDATE users SET telegram_username = %s WHERE id = %s",
-            ("@testuser", 1)
-        )
+        query, params = mock_cursor.execute.call_args_list[0][0]
+        assert "UPDATE users u SET telegram_username = %s" in query
+        assert "pg_notify" in query
+        assert params == (1, "@testuser", TG_VERIFICATION_CHANNEL)
+        mock_cursor.execute.assert_called_with("SELECT pg_notify(%s, %s)", (USER_CHANGED_CHANNEL, "1"))
 
     def test_update_username(self, mock_cursor):
         """Тест обновления username"""
-        mock_self = Mock()
-        mock_self.cursor.return_value.__enter__.return_value = mock_cursor
+        mock_self = MagicMock()
 
-        update_username(mock_self, mock_cursor, uuid=1, username="newusername")
+        update_username.__wrapped__(mock_self, mock_cursor, uuid=1, username="newusername")
 
-        mock_cursor.execute.assert_called_with(
+        assert mock_cursor.execute.call_args_list[0][0] == (
             "UPDATE users SET username = %s WHERE id = %s",
             ("newusername", 1)
-        )
\ No newline at end of file
+        )
+        mock_cursor.execute.assert_called_with("SELECT pg_notify(%s, %s)", (USER_CHANGED_CHANNEL, "1"))
+
+    def test_update_user(self, mock_cursor, sample_user_data):
+        """Тест изменения нескольких полей одним UPDATE ... RETURNING"""
+        mock_self = MagicMock()
+        profile = [sample_user_data[name] for name in USER_PROFILE_FIELDS]
+        mock_cursor.fetchone.return_value = ([], *profile, '', None, None)
+
+        user, conflicts = update_user.__wrapped__(mock_self, mock_cursor, uuid=1, username="newusername",
+                                                  telegram_username="@new")
+
+        assert conflicts == []
+        assert user.username == sample_user_data['username']
+        mock_cursor.execute.assert_called_once()
+        query, params = mock_cursor.execute.call_args[0]
+        assert "username = %(username)s, telegram_username = %(telegram_username)s" in query
+        assert "RETURNING" in query and "password_hash" not in query
+        assert params['id'] == 1
+        assert params['user_channel'] == USER_CHANGED_CHANNEL
+        assert params['tg_channel'] == TG_VERIFICATION_CHANNEL
+
+    def test_update_user_conflicts(self, mock_cursor):
+        """Тест: занятое значение возвращается по полю, строка не меняется"""
+        mock_self = MagicMock()
+        mock_cursor.fetchone.return_value = (['username'],) + (None,) * (len(USER_PROFILE_FIELDS) + 3)
+
+        user, conflicts = update_user.__wrapped__(mock_self, mock_cursor, uuid=1, username="taken")
+
+        assert user is None
+        assert conflicts == ['username']
+
+    def test_update_user_unknown_field(self, mock_cursor):
+        """Тест: поля вне USER_UPDATE_FIELDS менять нельзя"""
+        mock_self = MagicMock()
+
+        with pytest.raises(ValueError):
+            update_user.__wrapped__(mock_self, mock_cursor, uuid=1, role="admin")
+        with pytest.raises(ValueError):
+            update_user.__wrapped__(mock_self, mock_cursor, uuid=1)
+        mock_cursor.execute.assert_not_called()
@@ -0,0 +1,221 @@
+import pytest
+from unittest.mock import MagicMock, patch
+
+from backend.src.db import Database
+from backend.src.db._cache import LRUCache, cached, invalidates, evicts
+from backend.src.db._classes import USER_PROFILE_FIELDS
+
+
+class TestLRUCache:
+    def test_get_set(self):
+        """Тест чтения и записи"""
+        cache = LRUCache(maxsize=2, ttl=60)
+        cache.set('a', 1)
+
+        assert cache.get('a') == 1
+        assert cache.get('b', 'default') == 'default'
+        assert cache.stats()['hits'] == 1
+        assert cache.stats()['misses'] == 1
+
+    def test_lru_eviction(self):
+        """Тест вытеснения давно не использованной записи"""
+        cache = LRUCache(maxsize=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        assert cache.get('b') is None
+        assert cache.get('a') == 1
+        assert cache.stats()['evictions'] == 1
+
+    def test_ttl_expiration(self):
+        """Тест истечения времени жизни записи"""
+        cache = LRUCache(maxsize=2, ttl=10)
+
+        with patch('backend.src.db._cache.time.monotonic', return_value=100.0):
+            cache.set('a', 1)
+        with patch('backend.src.db._cache.time.monotonic', return_value=111.0):
+            assert cache.get('a') is None
+
+        assert cache.stats()['expirations'] == 1
+        assert len(cache) == 0
+
+    def test_stale_generation_not_stored(self):
+        """Тест: значение, посчитанное до инвалидации, в кэш не попадает"""
+        cache = LRUCache()
+        generation = cache.generation
+        cache.clear()
+        cache.set('a', 1, generation)
+
+        assert cache.get('a') is None
+
+
+class TestCacheDecorators:
+    class Owner:
+        def __init__(self):
+            self._cache = LRUCache()
+            self.calls = 0
+
+        @cached('_cache', key=lambda name: name.lower())
+        def load(self, name):
+            self.calls += 1
+            return name.upper()
+
+        @invalidates('_cache')
+        def change(self):
+            pass
+
+        @evicts('_cache', 'load', key=lambda name: name.lower())
+        def rename(self, name):
+            pass
+
+    def test_cached_and_invalidated(self):
+        """Тест кэширования результата метода и сброса кэша"""
+        owner = self.Owner()
+
+        assert owner.load('Bolt') == 'BOLT'
+        assert owner.load('bolt') == 'BOLT'
+        assert owner.calls == 1
+
+        owner.change()
+        owner.load('bolt')
+        assert owner.calls == 2
+
+    def test_evicts_single_entry(self):
+        """Тест удаления одной записи кэша"""
+        owner = self.Owner()
+        owner.load('bolt')
+        owner.load('shock')
+
+        owner.rename('Bolt')
+        owner.load('bolt')
+        owner.load('shock')
+
+        assert owner.calls == 3
+
+
+class TestDatabaseSearchCache:
+    def test_search_card_cached_by_normalized_query(self):
+        """Тест кэша поиска карт в Database"""
+        db = Database()
+        db._pool = MagicMock()
+
+        with patch('backend.src.db._cards._search', return_value=(1, [('card',)], None)) as mock_search:
+            db.search_card(card_name='Lightning  Bolt', limit=20)
+            db.search_card(card_name=' lightning bolt', limit=20)
+            db.search_card(card_name='lightning bolt', limit=40)
+
+        assert mock_search.call_count == 2
+        assert db.cache_stats()['search']['hits'] == 1
+
+    def test_catalog_import_invalidates_search_cache(self):
+        """Тест сброса кэша поиска после импорта каталога"""
+        db = Database()
+        db._search_cache.set('key', 'value')
+
+        with patch('backend.src.db._cards._iter_card_batches', return_value=iter([])), \
+                patch.object(Database, 'cursor'):
+            db.add_cards_from_file('cards.json')
+
+        assert db._search_cache.get('key') is None
+
+
+class TestDatabaseImageUrlCache:
+    def test_get_card_image_url_cached(self, mock_cursor):
+        """Тест кэша адресов картинок: повторный запрос не идёт в базу, импорт каталога сбрасывает кэш"""
+        db = Database()
+        mock_cursor.description = [('image_url_normal',)]
+        mock_cursor.fetchone.return_value = ('https://cards.scryfall.io/normal/a.jpg',)
+
+        with patch.object(Database, 'cursor') as mock_cursor_cm:
+            mock_cursor_cm.return_value.__enter__.return_value = mock_cursor
+            db.get_card_image_url(1, 'normal')
+            url = db.get_card_image_url(1, 'normal')
+
+        assert url == 'https://cards.scryfall.io/normal/a.jpg'
+        assert mock_cursor.execute.call_count == 1
+        assert db.cache_stats()['image_urls']['hits'] == 1
+
+        db._on_catalog_changed('inventory')
+        assert len(db._image_url_cache) == 1
+        db._on_catalog_changed('cards')
+        assert len(db._image_url_cache) == 0
+
+
+class TestDatabaseUserCache:
+    def test_get_user_by_id_cached(self, mock_cursor, sample_user_data):
+        """Тест кэша пользователей по id: id из JWT строкой и числом - один ключ"""
+        db = Database()
+        mock_cursor.description = [(name,) for name in USER_PROFILE_FIELDS]
+        mock_cursor.fetchone.return_value = tuple(sample_user_data[name] for name in USER_PROFILE_FIELDS)
+
+        with patch.object(Database, 'cursor') as mock_cursor_cm:
+            mock_cursor_cm.return_value.__enter__.return_value = mock_cursor
+            db.get_user_by_id(uuid='1')
+            user = db.get_user_by_id(uuid=1)
+
+        assert user.id == 1
+        assert mock_cursor.execute.call_count == 1
+        assert db.cache_stats()['users']['hits'] == 1
+
+    def test_missing_user_not_cached(self, mock_cursor):
+        """Тест: отсутствующий пользователь и ошибка запроса не кэшируются"""
+        db = Database()
+
+        with patch.object(Database, 'cursor') as mock_cursor_cm:
+            mock_cursor_cm.return_value.__enter__.return_value = mock_cursor
+            assert db.get_user_by_id(uuid=1) is None
+            assert db.get_user_by_id(uuid=1) is None
+
+        assert mock_cursor.execute.call_count == 2
+
+    def test_update_evicts_user(self, mock_cursor):
+        """Тест сброса пользователя после изменения username"""
+        db = Database()
+        db._user_cache.set(('get_user_by_id', 1), 'user')
+        db._user_cache.set(('get_user_by_id', 2), 'other')
+
+        with patch.object(Database, 'cursor') as mock_cursor_cm:
+            mock_cursor_cm.return_value.__enter__.return_value = mock_cursor
+            db.update_username(uuid='1', username='new')
+
+        assert db._user_cache.get(('get_user_by_id', 1)) is None
+        assert db._user_cache.get(('get_user_by_id', 2)) == 'other'
+
+    def test_user_changed_notification(self):
+        """Тест сброса пользователя по уведомлению из другого процесса"""
+        db = Database()
+        db._user_cache.set(('get_user_by_id', 1), 'user')
+        db._user_cache.set(('get_user_by_id', 2), 'other')
+
+        db._on_user_changed('1')
+        assert db._user_cache.get(('get_user_by_id', 1)) is None
+        assert db._user_cache.get(('get_user_by_id', 2)) == 'other'
+
+        db._on_user_changed('garbage')
+        assert len(db._user_cache) == 0
+
+
+class TestDatabaseCatalogChanged:
+    def test_cards_changed_marks_name_index_stale(self):
+        """Тест: импорт каталога в другом процессе помечает индекс подсказок устаревшим"""
+        db = Database()
+        db._name_index.build(['Lightning Bolt'])
+
+        db._on_catalog_changed('cards')
+
+        assert db._name_index.needs_refresh()
+        assert db._name_index.complete('light') == ['Lightning Bolt']
+
+    def test_catalog_changed_clears_search_cache(self):
+        """Тест: изменение каталога или склада в другом процессе сбрасывает кэш поиска"""
+        db = Database()
+        db._name_index.build(['Lightning Bolt'])
+
+        for payload in ('cards', 'inventory'):
+            db._search_cache.set(('search_card', 'bolt'), ['card'])
+            db._on_catalog_changed(payload)
+            assert len(db._search_cache) == 0
+
+        assert db._name_index.needs_refresh()
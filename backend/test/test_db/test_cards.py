@@ -1,8 +1,11 @@
 import pytest
+import gzip
 import json
-from unittest.mock import Mock, patch, mock_open
+from unittest.mock import Mock, MagicMock, patch, mock_open
 from backend.src.db._cards import add_cards_from_file, transform_card_data, search_card
-from backend.src.db._cards import search_cards_with_inventory
+from backend.src.db._cards import search_cards_with_inventory, sync_cards_from_file, card_content_hash
+from backend.src.db._cards import _iter_card_batches, search_card_ranked, get_card_image_url, search_projection
+from backend.src.db._queries import CATALOG_CHANGED_CHANNEL
 
 
 class TestCards:
@@ -64,53 +67,257 @@ class TestCards:
 
         assert result['color'] == 'Colorless'
 
-    @patch('builtins.open', new_callable=mock_open, read_data='[{"name": "Test Card"}]')
-    @patch('backend.src.db._cards.tqdm')
-    def test_add_cards_from_file(self, mock_tqdm, mock_file, mock_cursor):
-        """Тест добавления карт из файла"""
-        mock_self = Mock()
+    def test_add_cards_from_file(self, mock_cursor, tmp_path):
+        """Тест добавления карт из файла через COPY"""
+        mock_self = MagicMock()
         mock_self.cursor.return_value.__enter__.return_value = mock_cursor
-        mock_self.transform_card_data.return_value = {
-            'color': 'Blue',
-            'set_code': 'TEST',
-            'set_name': 'Test Set',
-            'collector_number': '1',
-            'name': 'Test Card',
-            'card_type': 'Creature',
-            'image_url_small': '',
-            'image_url_normal': '',
-            'image_url_large': ''
-        }
+        mock_self.transform_card_data.side_effect = lambda card: transform_card_data(mock_self, card)
+        file_path = tmp_path / 'cards.json'
+        file_path.write_text(json.dumps([{'name': 'Card 1'}, {'name': 'Card\t2'}, {'name': 'Card 3'}]))
+
+        stats = add_cards_from_file(mock_self, str(file_path), batch_size=2)
+
+        assert stats['rows'] == 3
+        assert mock_cursor.copy_expert.call_count == 2
+        sql, buffer = mock_cursor.copy_expert.call_args_list[0][0]
+        assert sql.startswith("COPY cards (color, set_code")
+        assert buffer.getvalue().splitlines()[1].split('\t')[4] == 'Card\\t2'
+
+    def test_add_cards_from_gzip_file(self, mock_cursor, tmp_path):
+        """Тест импорта из сжатого файла"""
+        mock_self = MagicMock()
+        mock_self.cursor.return_value.__enter__.return_value = mock_cursor
+        mock_self.transform_card_data.side_effect = lambda card: transform_card_data(mock_self, card)
+        file_path = tmp_path / 'cards.json.gz'
+        with gzip.open(file_path, 'wt', encoding='UTF-8') as file:
+            json.dump([{'name': 'Card 1'}], file)
+
+        stats = add_cards_from_file(mock_self, str(file_path))
+
+        assert stats['rows'] == 1
+        mock_cursor.copy_expert.assert_called_once()
+
+    def test_add_cards_from_file_copy_fallback(self, mock_cursor, tmp_path):
+        """Тест построчной вставки, если COPY пачки не прошёл"""
+        mock_self = MagicMock()
+        mock_self.cursor.return_value.__enter__.return_value = mock_cursor
+        mock_self.transform_card_data.side_effect = lambda card: transform_card_data(mock_self, card)
+        mock_cursor.copy_expert.side_effect = Exception("value too long")
+        mock_cursor.rowcount = 1
+        file_path = tmp_path / 'cards.json'
+        file_path.write_text(json.dumps([{'name': 'Card 1'}, {'name': 'Card 2'}]))
+
+        stats = add_cards_from_file(mock_self, str(file_path))
+
+        assert stats['rows'] == 2
+        inserts = [c for c in mock_cursor.execute.call_args_list if 'INSERT INTO cards' in c[0][0]]
+        assert len(inserts) == 2
+        mock_cursor.execute.assert_any_call("ROLLBACK TO SAVEPOINT cards_batch")
+
+    def test_add_cards_from_file_existing_printings(self, mock_cursor, tmp_path, caplog):
+        """Тест повторного импорта: уже загруженные печати пропускаются без ошибок"""
+        mock_self = MagicMock()
+        mock_self.cursor.return_value.__enter__.return_value = mock_cursor
+        mock_self.transform_card_data.side_effect = lambda card: transform_card_data(mock_self, card)
+        mock_cursor.copy_expert.side_effect = Exception("duplicate key value violates unique constraint")
+        mock_cursor.rowcount = 0
+        file_path = tmp_path / 'cards.json'
+        file_path.write_text(json.dumps([{'name': 'Card 1'}, {'name': 'Card 2'}]))
+
+        stats = add_cards_from_file(mock_self, str(file_path))
+
+        assert stats['rows'] == 0
+        inserts = [c[0][0] for c in mock_cursor.execute.call_args_list if 'INSERT INTO cards' in c[0][0]]
+        assert all('ON CONFLICT (set_code, collector_number) DO NOTHING' in sql for sql in inserts)
+        assert not [record for record in caplog.records if record.levelname == 'ERROR']
+        assert not [c for c in mock_cursor.execute.call_args_list if c[0][0] == "SELECT pg_notify(%s, %s)"]
+
+    def test_sync_cards_from_file(self, mock_cursor, tmp_path):
+        """Тест инкрементальной синхронизации каталога"""
+        mock_self = MagicMock()
+        mock_self.cursor.return_value.__enter__.return_value = mock_cursor
+        mock_self.transform_card_data.side_effect = lambda card: transform_card_data(mock_self, card)
+        mock_cursor.fetchone.return_value = (1, 1)
+        file_path = tmp_path / 'cards.json'
+        file_path.write_text(json.dumps([
+            {'set': 'mh3', 'collector_number': '1', 'name': 'Old'},
+            {'set': 'mh3', 'collector_number': '1', 'name': 'New'},
+            {'set': 'mh3', 'collector_number': '2', 'name': 'Card 2'},
+            {'set': 'mh3', 'collector_number': '3', 'name': 'Card 3'},
+        ]))
+
+        stats = sync_cards_from_file(mock_self, str(file_path))
+
+        assert stats['rows'] == 4
+        assert stats['added'] == 1
+        assert stats['updated'] == 1
+        assert stats['unchanged'] == 1
+        assert stats['duplicates'] == 1
+        staged = mock_cursor.copy_expert.call_args[0][1].getvalue().splitlines()
+        assert len(staged) == 3
+        assert 'New' in staged[0]
+        upsert = [c[0][0] for c in mock_cursor.execute.call_args_list if 'ON CONFLICT' in c[0][0]][0]
+        assert 'ON CONFLICT (set_code, collector_number)' in upsert
+        assert 'IS DISTINCT FROM EXCLUDED.content_hash' in upsert
+        mock_cursor.execute.assert_called_with("SELECT pg_notify(%s, %s)", (CATALOG_CHANGED_CHANNEL, 'cards'))
 
-        add_cards_from_file(mock_self, mock_cursor, 'test.json')
+    def test_card_content_hash(self):
+        """Тест хэша содержимого карты"""
+        row = ('Blue', 'MH3', 'Modern Horizons 3', '134', 'Counterspell', 'Instant', '', '', '')
 
-        mock_cursor.execute.assert_called()
+        assert card_content_hash(row) == card_content_hash(list(row))
+        assert card_content_hash(row) != card_content_hash(row[:-1] + ('http://test.com/large.jpg',))
+
+    @pytest.mark.parametrize('indent', [None, 2])
+    def test_parallel_batches_match_serial(self, tmp_path, indent):
+        """Тест совпадения результата параллельного и последовательного преобразования"""
+        mock_self = MagicMock()
+        mock_self.transform_card_data.side_effect = lambda card: transform_card_data(mock_self, card)
+        cards = [{'set': 'mh3', 'collector_number': str(i), 'name': f'Card {i}', 'color_identity': ['U'] * (i % 3)}
+                 for i in range(25)]
+        file_path = tmp_path / 'cards.json'
+        if indent is None:
+            # Формат выгрузок Scryfall: по карте на строку
+            file_path.write_text('[\n' + ',\n'.join(json.dumps(card) for card in cards) + '\n]\n')
+        else:
+            file_path.write_text(json.dumps(cards, indent=indent))
+
+        serial = list(_iter_card_batches(mock_self, str(file_path), 4, workers=1))
+        parallel = list(_iter_card_batches(mock_self, str(file_path), 4, workers=2))
+
+        assert parallel == serial
+        assert sum(len(batch) for batch in parallel) == 25
 
     def test_search_card(self, mock_cursor):
         """Тест поиска карт"""
-        mock_self = Mock()
+        mock_self = MagicMock()
         mock_self.cursor.return_value.__enter__.return_value = mock_cursor
         mock_cursor.fetchall.return_value = [('card1',), ('card2',)]
 
-        count, cards = search_card(mock_self, mock_cursor, "test")
+        count, cards, next_key = search_card(mock_self, "test")
 
         assert count == 2
         assert len(cards) == 2
-        mock_cursor.execute.assert_called_with(
-            "SELECT * FROM cards WHERE name ILIKE %s;",
-            ("%test%",)
-        )
+        assert next_key is None
+        query, params = mock_cursor.execute.call_args[0]
+        assert "FROM cards c WHERE c.name ILIKE %s" in query
+        assert "SELECT *" not in query
+        assert params == ["%test%"]
+
+    def test_search_card_page(self, mock_cursor):
+        """Тест keyset-пагинации поиска"""
+        mock_self = MagicMock()
+        mock_self.cursor.return_value.__enter__.return_value = mock_cursor
+        rows = [(i, 'Blue', 'MH3', None, str(i), f'Card {i}') for i in range(3)]
+        mock_cursor.fetchall.return_value = rows
+        mock_cursor.fetchone.return_value = (42,)
+
+        count, cards, next_key = search_card(mock_self, "card", limit=2, after=('Card', '', 0))
+
+        assert count == 42
+        assert cards == rows[:2]
+        assert next_key == ('Card 1', '', 1)
+        query, params = mock_cursor.execute.call_args_list[0][0]
+        assert "(c.name, COALESCE(c.set_name, ''), c.id) > (%s, %s, %s)" in query
+        assert query.endswith("LIMIT %s")
+        assert params == ["%card%", 'Card', '', 0, 3]
+        assert mock_cursor.execute.call_args_list[1][0][0].startswith("SELECT COUNT(*)")
+
+    def test_search_card_single_page_skips_count(self, mock_cursor):
+        """Тест: если все совпадения поместились на страницу, COUNT не выполняется"""
+        mock_self = MagicMock()
+        mock_self.cursor.return_value.__enter__.return_value = mock_cursor
+        mock_cursor.fetchall.return_value = [('card1',)]
+
+        count, cards, next_key = search_card(mock_self, "test", limit=20)
+
+        assert count == 1
+        assert mock_cursor.execute.call_count == 1
+
+    def test_search_card_estimated_count(self, mock_cursor):
+        """Тест оценки числа совпадений по плану запроса"""
+        mock_self = MagicMock()
+        mock_self.cursor.return_value.__enter__.return_value = mock_cursor
+        mock_cursor.fetchall.return_value = [(i, '', '', '', '', f'Card {i}') for i in range(2)]
+        mock_cursor.fetchone.return_value = ([{'Plan': {'Plan Rows': 1234}}],)
+
+        count, _, _ = search_card(mock_self, "card", limit=1, count='estimate')
+
+        assert count == 1234
+        assert mock_cursor.execute.call_args[0][0].startswith("EXPLAIN (FORMAT JSON)")
 
     def test_search_cards_with_inventory(self, mock_cursor):
         """Тест поиска карт с инвентарем"""
-        mock_self = Mock()
+        mock_self = MagicMock()
         mock_self.cursor.return_value.__enter__.return_value = mock_cursor
         mock_cursor.fetchall.return_value = [('card1',), ('card2',)]
 
-        count, cards = search_cards_with_inventory(mock_self, mock_cursor, "test")
+        count, cards, next_key = search_cards_with_inventory(mock_self, "test")
 
         assert count == 2
         assert len(cards) == 2
-        # Проверяем, что запрос содержит LEFT JOIN
+        # Наличие читается из готовой сводки, без агрегации по складу
         call_args = mock_cursor.execute.call_args[0][0]
-        assert "LEFT JOIN card_inventory" in call_args
\ No newline at end of file
+        assert "LEFT JOIN card_inventory_summary s" in call_args
+        assert "GROUP BY" not in call_args
+
+    def test_search_card_projection(self, mock_cursor):
+        """Тест выборки только запрошенных полей"""
+        mock_self = MagicMock()
+        mock_self.cursor.return_value.__enter__.return_value = mock_cursor
+        mock_cursor.fetchall.return_value = [('Card 0', 0, 'Set'), ('Card 1', 1, 'Set')]
+
+        count, cards, next_key = search_card(mock_self, "card", limit=1, count='none', fields=('name',))
+
+        assert next_key == ('Card 0', 'Set', 0)
+        query = mock_cursor.execute.call_args[0][0]
+        assert query.startswith("SELECT c.name AS name, c.id AS id, c.set_name AS set_name FROM cards c")
+        assert "image_url" not in query
+
+    def test_search_projection(self):
+        """Тест добавления полей ключа пагинации и проверки имён полей"""
+        assert search_projection(['name', 'name', 'min_price']) == ('name', 'min_price', 'id', 'set_name')
+        with pytest.raises(ValueError):
+            search_projection(['password'])
+        with pytest.raises(ValueError):
+            search_card(MagicMock(), "card", fields=('id', 'min_price'))
+
+    def test_search_card_ranked(self, mock_cursor):
+        """Тест нечёткого поиска с ранжированием по сходству"""
+        mock_self = MagicMock()
+        mock_self.cursor.return_value.__enter__.return_value = mock_cursor
+        mock_cursor.fetchall.return_value = [(1, 'Red', 'lea', 'Alpha', '161', 'Lightning Bolt', 0.7)]
+
+        count, cards = search_card_ranked(mock_self, " lightnig  bolt", limit=5, threshold=0.4)
+
+        assert count == 1
+        threshold_call, search_call = mock_cursor.execute.call_args_list
+        assert threshold_call[0][1] == ('0.4',)
+        query, params = search_call[0]
+        assert "WHERE c.name %% %s" in query
+        assert "ORDER BY c.name <-> %s" in query
+        assert params == ('lightnig bolt', 'lightnig bolt', 'lightnig bolt', 5)
+
+    def test_get_card_image_url(self, mock_cursor):
+        """Тест адреса картинки карты"""
+        mock_self = MagicMock()
+        mock_self.cursor.return_value.__enter__.return_value = mock_cursor
+        mock_cursor.description = [('image_url_normal',)]
+        mock_cursor.fetchone.return_value = ('https://cards.scryfall.io/normal/1.jpg',)
+
+        assert get_card_image_url(mock_self, 1, 'normal') == 'https://cards.scryfall.io/normal/1.jpg'
+        query, params = mock_cursor.execute.call_args[0]
+        assert "SELECT image_url_normal FROM cards" in query
+        assert params == (1,)
+
+    def test_get_card_image_url_missing(self, mock_cursor):
+        """Тест карты без картинки"""
+        mock_self = MagicMock()
+        mock_self.cursor.return_value.__enter__.return_value = mock_cursor
+
+        assert get_card_image_url(mock_self, 1, 'small') is None
+        mock_cursor.description = [('image_url_small',)]
+        mock_cursor.fetchone.return_value = ('',)
+        assert get_card_image_url(mock_self, 1, 'small') is None
+        with pytest.raises(ValueError):
+            get_card_image_url(mock_self, 1, 'huge')
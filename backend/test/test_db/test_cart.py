@@ -0,0 +1,83 @@
+from decimal import Decimal
+from unittest.mock import MagicMock
+
+import psycopg2
+
+from backend.src.db._cart import get_cart, add_cart_item, set_cart_item_quantity, remove_cart_item
+from backend.src.db._classes import CartItem
+
+
+class TestCart:
+    def test_get_cart(self, mock_cursor):
+        """Тест корзины одним запросом с ценами, наличием и суммой"""
+        mock_self = MagicMock()
+        mock_self.cursor.return_value.__enter__.return_value = mock_cursor
+        mock_cursor.description = [('card_inventory_id',), ('name',), ('price',), ('quantity',), ('available',),
+                                   ('line_total',)]
+        mock_cursor.fetchall.return_value = [(1, 'Lightning Bolt', Decimal('10.00'), 2, 5, Decimal('20.00')),
+                                             (2, 'Counterspell', Decimal('3.50'), 1, 0, Decimal('3.50'))]
+
+        items, total = get_cart(mock_self, user_id=7)
+
+        assert all(isinstance(item, CartItem) for item in items)
+        assert [item.name for item in items] == ['Lightning Bolt', 'Counterspell']
+        assert items[1].available == 0
+        assert total == Decimal('23.50')
+        mock_cursor.execute.assert_called_once()
+        query, params = mock_cursor.execute.call_args[0]
+        assert "JOIN card_inventory ci" in query and "JOIN cards c" in query
+        assert params == (7,)
+
+    def test_get_cart_empty(self, mock_cursor):
+        """Тест пустой корзины"""
+        mock_self = MagicMock()
+        mock_self.cursor.return_value.__enter__.return_value = mock_cursor
+
+        assert get_cart(mock_self, user_id=7) == ([], 0)
+
+    def test_add_cart_item_upsert(self, mock_cursor):
+        """Тест добавления одним upsert с увеличением количества"""
+        mock_self = MagicMock()
+        mock_self.cursor.return_value.__enter__.return_value = mock_cursor
+        mock_cursor.fetchone.return_value = (3,)
+
+        assert add_cart_item(mock_self, user_id=7, card_inventory_id=1, quantity=2, max_quantity=4) == 3
+
+        mock_cursor.execute.assert_called_once()
+        query, params = mock_cursor.execute.call_args[0]
+        assert "ON CONFLICT (user_id, card_inventory_id)" in query
+        assert "cart_items.quantity + EXCLUDED.quantity" in query
+        assert params == {'user_id': 7, 'card_inventory_id': 1, 'quantity': 2, 'max_quantity': 4}
+
+    def test_add_cart_item_unknown_inventory(self, mock_cursor):
+        """Тест несуществующей позиции склада"""
+        mock_self = MagicMock()
+        mock_self.cursor.return_value.__enter__.return_value = mock_cursor
+        mock_cursor.execute.side_effect = psycopg2.errors.ForeignKeyViolation()
+
+        assert add_cart_item(mock_self, user_id=7, card_inventory_id=999) is None
+        mock_self._conn.rollback.assert_called_once()
+
+    def test_set_cart_item_quantity(self, mock_cursor):
+        """Тест изменения количества одним upsert"""
+        mock_self = MagicMock()
+        mock_self.cursor.return_value.__enter__.return_value = mock_cursor
+        mock_cursor.fetchone.return_value = (4,)
+
+        assert set_cart_item_quantity(mock_self, user_id=7, card_inventory_id=1, quantity=4) == 4
+
+        mock_cursor.execute.assert_called_once()
+        query, params = mock_cursor.execute.call_args[0]
+        assert "DO UPDATE SET quantity = EXCLUDED.quantity" in query
+        assert params == (7, 1, 4)
+
+    def test_remove_cart_item(self, mock_cursor):
+        """Тест удаления позиции"""
+        mock_self = MagicMock()
+        mock_self.cursor.return_value.__enter__.return_value = mock_cursor
+        mock_cursor.rowcount = 1
+
+        assert remove_cart_item(mock_self, user_id=7, card_inventory_id=1) is True
+
+        mock_cursor.rowcount = 0
+        assert remove_cart_item(mock_self, user_id=7, card_inventory_id=1) is False
@@ -0,0 +1,70 @@
+import pytest
+from unittest.mock import MagicMock
+
+from backend.src.db._classes import User, Card, USER_PROFILE_FIELDS
+
+
+class TestRowModels:
+    def test_fetchone_by_column_names(self):
+        """Тест: значения раскладываются по именам столбцов, а не по позиции"""
+        cursor = MagicMock()
+        cursor.description = [('username',), ('id',)]
+        cursor.fetchone.return_value = ('testuser', 1)
+
+        user = User.fetchone(cursor)
+
+        assert user.id == 1
+        assert user.username == 'testuser'
+        assert user.password_hash is None
+        assert not hasattr(user, '__dict__')
+
+    def test_fetchone_empty(self):
+        """Тест пустого результата"""
+        cursor = MagicMock()
+        cursor.fetchone.return_value = None
+
+        assert User.fetchone(cursor) is None
+
+    def test_fetchall(self):
+        """Тест нескольких строк"""
+        cursor = MagicMock()
+        cursor.description = [('id',), ('name',)]
+        cursor.fetchall.return_value = [(1, 'Lightning Bolt'), (2, 'Counterspell')]
+
+        cards = Card.fetchall(cursor)
+
+        assert [card.name for card in cards] == ['Lightning Bolt', 'Counterspell']
+        assert cards[0] == Card(id=1, name='Lightning Bolt')
+
+    def test_from_record(self):
+        """Тест строки asyncpg"""
+        user = User.from_record({'id': 1, 'telegram_username': '@testuser'})
+
+        assert user.telegram_username == '@testuser'
+        assert User.from_record(None) is None
+
+    def test_columns(self):
+        """Тест списка столбцов для SELECT"""
+        assert User.columns(('id', 'email')) == 'id, email'
+        assert 'password_hash' not in User.columns(USER_PROFILE_FIELDS)
+        assert Card.columns().startswith('id, color')
+
+        with pytest.raises(ValueError):
+            User.columns(('id', 'password'))
+
+    def test_to_dict(self, sample_user_data):
+        """Тест профиля для ответа API"""
+        user = User(**sample_user_data)
+        profile = user.to_dict(USER_PROFILE_FIELDS)
+
+        assert list(profile) == list(USER_PROFILE_FIELDS)
+        assert profile['username'] == 'testuser'
+        assert 'password_hash' not in profile
+
+    def test_unknown_attribute(self):
+        """Тест: несуществующий столбец - ошибка, а не None"""
+        with pytest.raises(AttributeError):
+            User().password
+
+        with pytest.raises(AttributeError):
+            User(password='secret')
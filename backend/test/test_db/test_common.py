@@ -1,6 +1,9 @@
 import pytest
 from unittest.mock import Mock, patch
-from backend.src.db._common import with_cursor
+import io
+import json
+
+from backend.src.db._common import with_cursor, iter_json_array
 
 
 def test_with_cursor_decorator():
@@ -17,4 +20,23 @@ def test_with_cursor_decorator():
 
     result = test_func(mock_self, "test1", "test2")
     assert result == "success"
-    mock_self.cursor.assert_called_once()
\ No newline at end of file
+    mock_self.cursor.assert_called_once()
+
+
+def test_iter_json_array_small_chunks():
+    """Тест потокового разбора массива при чтении маленькими кусками"""
+    items = [{'name': 'Card "1"', 'n': 12345}, [1, 2], 'text', 3.5, None, True]
+    file = io.StringIO(json.dumps(items, indent=2))
+
+    assert list(iter_json_array(file, chunk_size=3)) == items
+
+
+def test_iter_json_array_empty():
+    """Тест разбора пустого массива"""
+    assert list(iter_json_array(io.StringIO(' [ ] '))) == []
+
+
+def test_iter_json_array_truncated():
+    """Тест ошибки на оборванном файле"""
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.StringIO('[{"name": "Card"}, {"na'), chunk_size=4))
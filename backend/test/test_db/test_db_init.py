@@ -76,6 +76,24 @@ class TestDatabaseInit:
             mock_conn.rollback.assert_called_once()
             mock_conn.close.assert_called_once()
 
+    def test_context_manager_keeps_pool_open(self):
+        """Тест: выход из контекста освобождает соединение, но не закрывает пул"""
+        mock_conn = MagicMock()
+        mock_conn.closed = False
+        db = Database()
+        db._pool = MagicMock()
+        db._conn = mock_conn
+
+        with db:
+            pass
+
+        mock_conn.commit.assert_called_once()
+        db._pool.putconn.assert_called_once_with(mock_conn, discard=True)
+        db._pool.closeall.assert_not_called()
+
+        db.close()
+        db._pool.closeall.assert_called_once()
+
     def test_cursor_context_manager(self, mock_conn):
         """Тест контекстного менеджера курсора"""
         mock_cursor = MagicMock()
@@ -90,6 +108,28 @@ class TestDatabaseInit:
         mock_conn.commit.assert_called_once()
         mock_cursor.close.assert_called_once()
 
+    @patch('psycopg2.connect')
+    def test_cursor_checks_out_per_call(self, mock_connect):
+        """Тест выдачи соединения из пула на время вызова"""
+        mock_conn = MagicMock()
+        mock_conn.closed = 0
+        mock_conn.autocommit = False
+        mock_conn.get_transaction_status.return_value = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+        mock_connect.return_value = mock_conn
+
+        db = Database()
+
+        with db.cursor():
+            assert db._conn is mock_conn
+            assert db.pool_stats()['in_use'] == 1
+            with db.cursor():
+                pass
+
+        assert db._conn is None
+        assert db.pool_stats()['idle'] == 1
+        mock_conn.commit.assert_called_once()
+        mock_connect.assert_called_once()
+
     @patch('psycopg2.connect')
     def test_create_tables(self, mock_connect, mock_cursor):
         """Тест создания таблиц"""
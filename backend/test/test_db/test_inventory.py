@@ -0,0 +1,36 @@
+import pytest
+from unittest.mock import MagicMock
+
+from backend.src.db._inventory import rebuild_inventory_summary, get_top_stocked_card_images
+from backend.src.db._queries import CATALOG_CHANGED_CHANNEL
+
+
+class TestInventory:
+    def test_rebuild_inventory_summary(self, mock_cursor):
+        """Тест полного пересчёта сводки по складу"""
+        mock_self = MagicMock()
+        mock_self.cursor.return_value.__enter__.return_value = mock_cursor
+        mock_cursor.rowcount = 3
+
+        result = rebuild_inventory_summary(mock_self)
+
+        assert result == 3
+        queries = [c[0][0] for c in mock_cursor.execute.call_args_list]
+        assert queries[0] == "LOCK TABLE card_inventory IN SHARE MODE"
+        assert queries[1] == "TRUNCATE card_inventory_summary"
+        assert "INSERT INTO card_inventory_summary" in queries[2]
+        assert "GROUP BY ci.card_id" in queries[2]
+        mock_cursor.execute.assert_called_with("SELECT pg_notify(%s, %s)", (CATALOG_CHANGED_CHANNEL, 'inventory'))
+
+    def test_get_top_stocked_card_images(self, mock_cursor):
+        """Тест выбора картинок самых ходовых карт для прогрева кэша"""
+        mock_self = MagicMock()
+        mock_self.cursor.return_value.__enter__.return_value = mock_cursor
+        mock_cursor.fetchall.return_value = [(1, 'https://cards.scryfall.io/normal/1.jpg')]
+
+        result = get_top_stocked_card_images(mock_self, limit=10, size='normal')
+
+        assert result == [(1, 'https://cards.scryfall.io/normal/1.jpg')]
+        query, params = mock_cursor.execute.call_args[0]
+        assert "ORDER BY s.total_quantity DESC" in query
+        assert params == (10,)
@@ -0,0 +1,49 @@
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from backend.src.db._listener import NotificationListener
+
+
+def make_conn(listener, notifies):
+    """Соединение, которое отдаёт уведомления за один poll() и останавливает слушателя"""
+    conn = MagicMock()
+    conn.notifies = []
+
+    def poll():
+        conn.notifies.extend(notifies)
+        listener.stop()
+
+    conn.poll.side_effect = poll
+    return conn
+
+
+class TestNotificationListener:
+    def test_dispatches_notifications(self):
+        """Тест подписки на каналы и вызова обработчиков по каналу"""
+        received = []
+        subscribed = MagicMock()
+        listener = NotificationListener(connect=None, handlers={'user_changed': received.append},
+                                        on_subscribe=subscribed)
+        conn = make_conn(listener, [SimpleNamespace(channel='user_changed', payload='1'),
+                                    SimpleNamespace(channel='user_changed', payload='2')])
+        listener._connect = lambda: conn
+
+        with patch('backend.src.db._listener.select.select', return_value=([conn], [], [])):
+            listener._listen()
+
+        cursor = conn.cursor.return_value.__enter__.return_value
+        cursor.execute.assert_called_once_with("LISTEN user_changed")
+        assert conn.autocommit is True
+        assert received == ['1', '2']
+        subscribed.assert_called_once()
+        conn.close.assert_called_once()
+
+    def test_connection_error_deactivates(self):
+        """Тест: ошибка соединения не роняет поток, подписка помечается неактивной"""
+        listener = NotificationListener(connect=MagicMock(side_effect=Exception("refused")), handlers={})
+        listener.active = True
+
+        with patch.object(listener._stop, 'wait', side_effect=lambda timeout: listener._stop.set()):
+            listener._run()
+
+        assert listener.active is False
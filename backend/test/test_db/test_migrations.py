@@ -0,0 +1,145 @@
+import pytest
+from unittest.mock import MagicMock
+
+from backend.src.db._migrations import (MIGRATIONS, HOT_QUERIES, migrate, check_query_plans, _seq_scans,
+                                        _drop_invalid_index)
+from backend.src.db._base_user import get_user, get_user_by_id
+from backend.src.db._tg_bot import get_user_by_telegram_username
+from backend.src.db._cart import get_cart
+from backend.src.db._requests import match_card_requests
+
+
+def make_db(cursor):
+    db = MagicMock()
+    db.cursor.return_value.__enter__.return_value = cursor
+    db._pool.connection.return_value.__enter__.return_value.cursor.return_value.__enter__.return_value = cursor
+    db._pool.connection.return_value.__enter__.return_value.closed = 0
+    return db
+
+
+def executed(cursor):
+    return [c[0][0] for c in cursor.execute.call_args_list]
+
+
+class TestMigrations:
+    def test_migrations_ordered_and_idempotent(self):
+        """Тест нумерации миграций и повторяемости их операторов"""
+        versions = [m.version for m in MIGRATIONS]
+        assert versions == sorted(set(versions))
+
+        for migration in MIGRATIONS:
+            for statement in migration.statements:
+                if 'CONCURRENTLY' in statement:
+                    assert not migration.transactional
+                    assert 'IF NOT EXISTS' in statement or 'IF EXISTS' in statement
+
+    def test_hot_path_indexes(self):
+        """Тест индексов на колонках, по которым фильтруют запросы"""
+        statements = '\n'.join(s for m in MIGRATIONS for s in m.statements)
+
+        assert 'ON card_inventory (card_id)' in statements
+        assert 'ON users (telegram_username)' in statements
+        assert 'ON order_items (order_id)' in statements
+
+    def test_unique_key_dedupes_cards_first(self):
+        """Тест: дубли карт схлопываются до построения уникального индекса"""
+        migration = next(m for m in MIGRATIONS if m.name == 'cards_set_code_collector_number_key')
+        statements = list(migration.statements)
+
+        index = next(i for i, s in enumerate(statements) if 'CREATE UNIQUE INDEX' in s)
+        assert any(s.startswith("UPDATE card_inventory") for s in statements[:index])
+        assert any(s.startswith("UPDATE card_requests") for s in statements[:index])
+        assert statements[index - 1].startswith("DELETE FROM cards")
+
+    def test_summary_triggers_backfill(self):
+        """Тест: сводка склада заполняется в той же транзакции, что и создание триггеров"""
+        migration = next(m for m in MIGRATIONS if m.name == 'card_inventory_summary_triggers')
+
+        assert migration.transactional
+        assert migration.statements[-1].startswith("INSERT INTO card_inventory_summary")
+        assert "GROUP BY ci.card_id" in migration.statements[-1]
+
+    def test_migrate_applies_pending(self, mock_cursor):
+        """Тест применения только невыполненных миграций"""
+        mock_cursor.fetchall.return_value = [(1,), (2,)]
+        db = make_db(mock_cursor)
+
+        applied = migrate(db)
+
+        assert applied == [m.version for m in MIGRATIONS if m.version > 2]
+        conn = db._pool.connection.return_value.__enter__.return_value
+        assert conn.autocommit is False
+        queries = executed(mock_cursor)
+        assert queries[0].startswith("SELECT pg_advisory_lock")
+        assert queries[-1].startswith("SELECT pg_advisory_unlock")
+        assert not any("ALTER TABLE cards ADD COLUMN" in q for q in queries)
+        assert "BEGIN" in queries and "COMMIT" in queries
+
+    def test_migrate_target(self, mock_cursor):
+        """Тест применения миграций до указанной версии"""
+        db = make_db(mock_cursor)
+
+        assert migrate(db, target=2) == [1, 2]
+
+    def test_migrate_error_rolls_back(self, mock_cursor):
+        """Тест отката транзакционной миграции при ошибке"""
+        def execute(query, params=None):
+            if query.startswith("ALTER TABLE"):
+                raise Exception("lock timeout")
+
+        mock_cursor.execute.side_effect = execute
+        db = make_db(mock_cursor)
+
+        with pytest.raises(Exception, match="lock timeout"):
+            migrate(db)
+
+        queries = executed(mock_cursor)
+        assert "ROLLBACK" in queries
+        assert queries[-1].startswith("SELECT pg_advisory_unlock")
+
+    def test_drop_invalid_index(self, mock_cursor):
+        """Тест удаления невалидного индекса, оставленного прерванной миграцией"""
+        mock_cursor.fetchone.return_value = (1,)
+
+        _drop_invalid_index(mock_cursor, "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_test ON cards (name)")
+
+        assert executed(mock_cursor)[-1] == "DROP INDEX CONCURRENTLY IF EXISTS idx_test"
+
+    def test_seq_scans(self):
+        """Тест поиска полных сканирований в плане"""
+        plan = {
+            'Node Type': 'Nested Loop',
+            'Plans': [
+                {'Node Type': 'Seq Scan', 'Relation Name': 'cards'},
+                {'Node Type': 'Index Scan', 'Relation Name': 'users', 'Index Cond': '(id = 1)'},
+                {'Node Type': 'Index Scan', 'Relation Name': 'orders', 'Filter': '(user_id = 1)'},
+            ]
+        }
+
+        assert _seq_scans(plan) == ['cards', 'orders']
+
+    def test_check_query_plans(self, mock_cursor):
+        """Тест проверки планов горячих запросов"""
+        mock_cursor.fetchone.return_value = ([{'Plan': {'Node Type': 'Seq Scan', 'Relation Name': 'users'}}],)
+        db = make_db(mock_cursor)
+
+        report = check_query_plans(db)
+
+        assert [r['query'] for r in report] == [name for name, _, _ in HOT_QUERIES]
+        assert all(r['seq_scans'] == ['users'] for r in report)
+        assert executed(mock_cursor).count("ROLLBACK TO SAVEPOINT plan_check") == len(HOT_QUERIES)
+
+    def test_hot_queries_match_production(self, mock_cursor):
+        """Тест: планы проверяются для тех же запросов, что выполняют методы Database"""
+        mock_cursor.fetchone.return_value = None
+        mock_cursor.fetchall.return_value = []
+        get_user.__wrapped__(MagicMock(), mock_cursor, email='user@example.com')
+        get_user_by_id.__wrapped__(MagicMock(), mock_cursor, uuid=1)
+        get_user_by_telegram_username.__wrapped__(MagicMock(), mock_cursor, 'user')
+        get_cart.__wrapped__(MagicMock(), mock_cursor, user_id=1)
+        match_card_requests.__wrapped__(MagicMock(), mock_cursor)
+
+        hot = {name: query for name, query, _ in HOT_QUERIES}
+        assert executed(mock_cursor) == [hot['base_user.get_user'], hot['base_user.get_user_by_id'],
+                                         hot['tg_bot.get_user_by_telegram_username'], hot['cart.get_cart'],
+                                         hot['requests.match_card_requests']]
@@ -0,0 +1,149 @@
+import threading
+
+import pytest
+from unittest.mock import MagicMock, patch
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_INTRANS, TRANSACTION_STATUS_UNKNOWN
+from psycopg2.pool import PoolError
+
+from backend.src.db._pool import ConnectionPool
+
+
+def make_conn():
+    conn = MagicMock()
+    conn.closed = 0
+    conn.autocommit = False
+    conn.get_transaction_status.return_value = TRANSACTION_STATUS_IDLE
+    return conn
+
+
+class TestConnectionPool:
+    def test_lazy_connect_and_reuse(self):
+        """Тест ленивого создания и повторного использования соединения"""
+        connect = MagicMock(side_effect=make_conn)
+        pool = ConnectionPool(connect, maxconn=2)
+
+        assert connect.call_count == 0
+
+        conn = pool.getconn()
+        pool.putconn(conn)
+        assert pool.getconn() is conn
+        assert connect.call_count == 1
+
+    def test_exhausted_pool_times_out(self):
+        """Тест ожидания при исчерпании пула"""
+        pool = ConnectionPool(MagicMock(side_effect=make_conn), maxconn=1)
+        pool.getconn()
+
+        with pytest.raises(PoolError):
+            pool.getconn(timeout=0.01)
+
+        assert pool.stats()['timeouts'] == 1
+
+    def test_waiter_gets_returned_connection(self):
+        """Тест передачи освобождённого соединения ожидающему потоку"""
+        pool = ConnectionPool(MagicMock(side_effect=make_conn), maxconn=1)
+        conn = pool.getconn()
+        result = {}
+
+        waiter = threading.Thread(target=lambda: result.setdefault('conn', pool.getconn(timeout=5)))
+        waiter.start()
+        pool.putconn(conn)
+        waiter.join(5)
+
+        assert result['conn'] is conn
+
+    def test_broken_connection_replaced_on_checkout(self):
+        """Тест замены закрытого соединения при выдаче"""
+        connect = MagicMock(side_effect=make_conn)
+        pool = ConnectionPool(connect, maxconn=1)
+        conn = pool.getconn()
+        pool.putconn(conn)
+        conn.closed = 1
+
+        new_conn = pool.getconn()
+
+        assert new_conn is not conn
+        assert connect.call_count == 2
+        assert pool.stats()['size'] == 1
+
+    def test_idle_connection_pinged(self):
+        """Тест проверки простаивающего соединения запросом SELECT 1"""
+        pool = ConnectionPool(MagicMock(side_effect=make_conn), maxconn=1, check_interval=0)
+        conn = pool.getconn()
+        pool.putconn(conn)
+
+        pool.getconn()
+
+        conn.cursor.return_value.__enter__.return_value.execute.assert_called_with("SELECT 1")
+
+    def test_putconn_rolls_back_open_transaction(self):
+        """Тест отката незавершённой транзакции при возврате"""
+        pool = ConnectionPool(MagicMock(side_effect=make_conn), maxconn=1)
+        conn = pool.getconn()
+        conn.get_transaction_status.return_value = TRANSACTION_STATUS_INTRANS
+
+        pool.putconn(conn)
+
+        conn.rollback.assert_called_once()
+        assert pool.stats()['idle'] == 1
+
+    def test_putconn_discards_unknown_status(self):
+        """Тест закрытия соединения с потерянным состоянием"""
+        pool = ConnectionPool(MagicMock(side_effect=make_conn), maxconn=1)
+        conn = pool.getconn()
+        conn.get_transaction_status.return_value = TRANSACTION_STATUS_UNKNOWN
+
+        pool.putconn(conn)
+
+        conn.close.assert_called_once()
+        assert pool.stats()['size'] == 0
+
+    def test_connect_error_releases_slot(self):
+        """Тест освобождения места в пуле при ошибке подключения"""
+        pool = ConnectionPool(MagicMock(side_effect=Exception("down")), maxconn=1)
+
+        with pytest.raises(Exception):
+            pool.getconn()
+
+        assert pool.stats()['size'] == 0
+
+    def test_reset_after_fork(self):
+        """Тест сброса пула в дочернем процессе без закрытия соединений родителя"""
+        connect = MagicMock(side_effect=make_conn)
+        pool = ConnectionPool(connect, maxconn=1)
+        parent_conn = pool.getconn()
+
+        with patch('backend.src.db._pool.os.getpid', return_value=-1):
+            child_conn = pool.getconn(timeout=0.01)
+            pool.putconn(parent_conn)
+
+        assert child_conn is not parent_conn
+        parent_conn.close.assert_not_called()
+        assert pool.stats()['in_use'] == 1
+
+    def test_stats(self):
+        """Тест статистики пула"""
+        pool = ConnectionPool(MagicMock(side_effect=make_conn), maxconn=3)
+        conn = pool.getconn()
+        pool.getconn()
+        pool.putconn(conn)
+
+        stats = pool.stats()
+
+        assert stats['size'] == 2
+        assert stats['in_use'] == 1
+        assert stats['idle'] == 1
+        assert stats['waiting'] == 0
+        assert stats['checkouts'] == 2
+
+    def test_closeall(self):
+        """Тест закрытия пула"""
+        pool = ConnectionPool(MagicMock(side_effect=make_conn), maxconn=1)
+        conn = pool.getconn()
+        pool.putconn(conn)
+
+        pool.closeall()
+
+        conn.close.assert_called_once()
+        with pytest.raises(PoolError):
+            pool.getconn()
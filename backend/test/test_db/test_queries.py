@@ -1,5 +1,6 @@
 import pytest
-from backend.src.db._queries import TABLE_CREATE
+from backend.src.db._queries import TABLE_CREATE, INVENTORY_SUMMARY_TRIGGERS, INVENTORY_ARRIVALS_TRIGGERS
+from backend.src.db._queries import CATALOG_CHANGED_CHANNEL
 
 
 class TestQueries:
@@ -9,11 +10,13 @@ class TestQueries:
             'cards',
             'users',
             'card_inventory',
+            'card_inventory_summary',
             'orders',
             'order_items',
             'cart_items',
             'card_requests',
-            'password_resets'
+            'password_resets',
+            'inventory_arrivals'
         ]
 
         for table in expected_tables:
@@ -48,4 +51,23 @@ class TestQueries:
         ]
 
         for column in required_columns:
-            assert column in query or any(col in query for col in column.split())
\ No newline at end of file
+            assert column in query or any(col in query for col in column.split())
+
+    def test_inventory_summary_triggers(self):
+        """Тест триггеров, поддерживающих сводку по складу"""
+        upgrade = '\n'.join(INVENTORY_SUMMARY_TRIGGERS)
+
+        for event in ('INSERT', 'UPDATE', 'DELETE', 'TRUNCATE'):
+            assert f"AFTER {event} ON card_inventory" in upgrade
+        assert "FOR EACH ROW" not in upgrade
+        assert "pg_advisory_xact_lock" in upgrade
+        assert f"pg_notify('{CATALOG_CHANGED_CHANNEL}', 'inventory')" in upgrade
+
+    def test_inventory_arrivals_triggers(self):
+        """Тест триггера, ставящего поступления на склад в очередь сопоставления заявок"""
+        upgrade = '\n'.join(INVENTORY_ARRIVALS_TRIGGERS)
+
+        assert "AFTER INSERT ON card_inventory" in upgrade
+        assert "FOR EACH STATEMENT" in upgrade
+        assert "FOR EACH ROW" not in upgrade
+        assert "INSERT INTO inventory_arrivals" in upgrade
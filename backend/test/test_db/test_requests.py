@@ -0,0 +1,45 @@
+import pytest
+from unittest.mock import MagicMock
+
+from backend.src.db._queries import CARD_REQUEST_MATCHED_CHANNEL
+from backend.src.db._requests import match_card_requests, match_all_card_requests
+
+
+class TestCardRequests:
+    def test_match_card_requests(self, mock_cursor):
+        """Тест сопоставления пачки поступлений с открытыми заявками"""
+        mock_self = MagicMock()
+        mock_self.cursor.return_value.__enter__.return_value = mock_cursor
+        mock_cursor.fetchall.return_value = [(1, 10, 5, 9.5)]
+
+        result = match_card_requests(mock_self, batch_size=100)
+
+        assert result == [(1, 10, 5, 9.5)]
+        query, params = mock_cursor.execute.call_args[0]
+        assert params == (100, CARD_REQUEST_MATCHED_CHANNEL)
+        assert "DELETE FROM inventory_arrivals" in query
+        assert "SKIP LOCKED" in query
+        assert "SET status = 'in_progress'" in query
+        assert "r.status = 'open'" in query
+        assert "pg_notify" in query
+
+    def test_match_all_card_requests(self, mock_cursor):
+        """Тест разбора очереди пачками до опустошения"""
+        mock_self = MagicMock()
+        mock_self.cursor.return_value.__enter__.return_value = mock_cursor
+        mock_cursor.fetchone.side_effect = [(1,), (1,), None]
+        mock_self.match_card_requests.side_effect = [[(1, 10, 5, 9.5)], []]
+
+        result = match_all_card_requests(mock_self, batch_size=50)
+
+        assert result == 1
+        assert mock_self.match_card_requests.call_count == 2
+        mock_self.match_card_requests.assert_called_with(batch_size=50)
+
+    def test_match_all_card_requests_empty_queue(self, mock_cursor):
+        """Тест пустой очереди поступлений"""
+        mock_self = MagicMock()
+        mock_self.cursor.return_value.__enter__.return_value = mock_cursor
+
+        assert match_all_card_requests(mock_self) == 0
+        mock_self.match_card_requests.assert_not_called()
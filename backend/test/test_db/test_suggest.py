@@ -0,0 +1,69 @@
+import pytest
+from unittest.mock import MagicMock, patch
+
+from backend.src.db import Database
+from backend.src.db._suggest import NameIndex
+
+
+class TestNameIndex:
+    def test_complete_prefix(self):
+        """Тест подсказок по началу названия"""
+        index = NameIndex()
+        index.build(['Lightning Bolt', 'Lightning Helix', 'Llanowar Elves', 'Sol Ring', 'Lightning Bolt'])
+
+        assert index.complete('light', 10) == ['Lightning Bolt', 'Lightning Helix']
+        assert index.complete('LIGHTNING  H', 10) == ['Lightning Helix']
+        assert index.complete('l', 2) == ['Lightning Bolt', 'Lightning Helix']
+        assert index.complete('', 10) == []
+        assert len(index) == 4
+
+    def test_complete_word_prefix(self):
+        """Тест подсказок по началу слова внутри названия"""
+        index = NameIndex()
+        index.build(['Lightning Bolt', 'Bolt of Keranos', 'Chain Lightning'])
+
+        assert index.complete('bolt', 10) == ['Bolt of Keranos', 'Lightning Bolt']
+        assert index.complete('lightning', 10) == ['Lightning Bolt', 'Chain Lightning']
+
+    def test_clear_marks_stale(self):
+        """Тест: после clear() индекс устарел, но продолжает отвечать"""
+        index = NameIndex()
+        index.build(['Sol Ring'])
+        assert not index.needs_refresh()
+
+        index.clear()
+
+        assert index.needs_refresh()
+        assert index.complete('sol', 10) == ['Sol Ring']
+
+    def test_build_with_outdated_generation_stays_stale(self):
+        """Тест: индекс, построенный по данным до инвалидации, остаётся устаревшим"""
+        index = NameIndex()
+        generation = index.generation
+        index.clear()
+        index.build(['Sol Ring'], generation)
+
+        assert index.needs_refresh()
+
+
+class TestDatabaseSuggest:
+    def test_suggest_builds_index_once(self):
+        """Тест: индекс строится при первом запросе, дальше база не используется"""
+        db = Database()
+
+        with patch.object(Database, 'load_card_names', return_value=['Sol Ring', 'Solemn Simulacrum']) as mock_load:
+            assert db.suggest_card_names('sol', 5) == ['Sol Ring', 'Solemn Simulacrum']
+            assert db.suggest_card_names('sole', 5) == ['Solemn Simulacrum']
+
+        mock_load.assert_called_once()
+
+    def test_catalog_import_marks_index_stale(self):
+        """Тест: импорт каталога помечает индекс устаревшим"""
+        db = Database()
+        db._name_index.build(['Sol Ring'])
+
+        with patch('backend.src.db._cards._iter_card_batches', return_value=iter([])), \
+                patch.object(Database, 'cursor'):
+            db.add_cards_from_file('cards.json')
+
+        assert db._name_index.needs_refresh()
@@ -1,65 +1,61 @@
 import pytest
-from unittest.mock import Mock, patch
+from unittest.mock import MagicMock, patch
 from backend.src.db._tg_bot import get_user_by_telegram_username, is_verified_tg_user, verified_tg_user
-from backend.src.db._classes import User
+from backend.src.db._classes import User, USER_TELEGRAM_FIELDS
+from backend.src.db._queries import USER_CHANGED_CHANNEL
 
 
 class TestTgBot:
     def test_get_user_by_telegram_username_found(self, mock_cursor, sample_user_data):
         """Тест получения пользователя по Telegram username"""
-        mock_self = Mock()
-        mock_self.cursor.return_value.__enter__.return_value = mock_cursor
-        mock_cursor.fetchone.return_value = tuple(sample_user_data.values())
+        mock_self = MagicMock()
+        mock_cursor.description = [(name,) for name in USER_TELEGRAM_FIELDS]
+        mock_cursor.fetchone.return_value = (1, None, "@testuser", False)
 
-        user = get_user_by_telegram_username(mock_self, mock_cursor, "@testuser")
+        user = get_user_by_telegram_username.__wrapped__(mock_self, mock_cursor, "@testuser")
 
         assert isinstance(user, User)
         assert user.telegram_username == "@testuser"
         mock_cursor.execute.assert_called_with(
-            "SELECT * FROM users WHERE telegram_username = %s",
+            f"SELECT {', '.join(USER_TELEGRAM_FIELDS)} FROM users WHERE telegram_username = %s",
             ("@testuser",)
         )
 
     def test_get_user_by_telegram_username_not_found(self, mock_cursor):
         """Тест получения несуществующего пользователя по Telegram"""
-        mock_self = Mock()
-        mock_self.cursor.return_value.__enter__.return_value = mock_cursor
+        mock_self = MagicMock()
         mock_cursor.fetchone.return_value = None
 
-        user = get_user_by_telegram_username(mock_self, mock_cursor, "@notfound")
+        user = get_user_by_telegram_username.__wrapped__(mock_self, mock_cursor, "@notfound")
 
         assert user is None
 
     def test_is_verified_tg_user_true(self, mock_cursor, sample_user_data):
         """Тест проверки верифицированного Telegram"""
-        mock_self = Mock()
-        mock_self.cursor.return_value.__enter__.return_value = mock_cursor
-        sample_user_data['telegram_verified'] = True
-        mock_cursor.fetchone.return_value = tuple(sample_user_data.values())
+        mock_self = MagicMock()
+        mock_cursor.fetchone.return_value = (True,)
 
-        result = is_verified_tg_user(mock_self, mock_cursor, "@testuser")
+        result = is_verified_tg_user.__wrapped__(mock_self, mock_cursor, "@testuser")
 
         assert result is True
 
     def test_is_verified_tg_user_false(self, mock_cursor, sample_user_data):
         """Тест проверки неверифицированного Telegram"""
-        mock_self = Mock()
-        mock_self.cursor.return_value.__enter__.return_value = mock_cursor
-        sample_user_data['telegram_verified'] = False
-        mock_cursor.fetchone.return_value = tuple(sample_user_data.values())
+        mock_self = MagicMock()
+        mock_cursor.fetchone.return_value = (False,)
 
-        result = is_verified_tg_user(mock_self, mock_cursor, "@testuser")
+        result = is_verified_tg_user.__wrapped__(mock_self, mock_cursor, "@testuser")
 
         assert result is False
 
     def test_verified_tg_user(self, mock_cursor):
         """Тест верификации Telegram пользователя"""
-        mock_self = Mock()
-        mock_self.cursor.return_value.__enter__.return_value = mock_cursor
+        mock_self = MagicMock()
 
-        verified_tg_user(mock_self, mock_cursor, telegram_chat_id=12345, uuid=1)
+        verified_tg_user.__wrapped__(mock_self, mock_cursor, telegram_chat_id=12345, uuid=1)
 
-        mock_cursor.execute.assert_called_with(
+        assert mock_cursor.execute.call_args_list[0][0] == (
             "UPDATE users SET telegram_verified = TRUE, telegram_chat_id = %s WHERE id = %s",
             (12345, 1)
-        )
\ No newline at end of file
+        )
+        mock_cursor.execute.assert_called_with("SELECT pg_notify(%s, %s)", (USER_CHANGED_CHANNEL, "1"))
\ No newline at end of file
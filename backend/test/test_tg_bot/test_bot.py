@@ -1,7 +1,9 @@
 import pytest
 from unittest.mock import Mock, AsyncMock, patch
-from aiogram.types import Message, User as TgUser, Chat
+from datetime import datetime
+from aiogram.types import Message, CallbackQuery, User as TgUser, Chat
 from backend.src.tg_bot.bot import router, create_main_keyboard, Form
+from backend.src.db.aio import AsyncDatabase
 
 
 @pytest.fixture
@@ -21,7 +23,7 @@ def mock_message():
 @pytest.mark.asyncio
 async def test_cmd_start(mock_message):
     """Тест команды /start"""
-    with patch('backend.src.tg_bot.bot.db') as mock_db:
+    with patch('backend.src.tg_bot.bot.db', spec=AsyncDatabase) as mock_db:
         mock_db.is_verified_tg_user.return_value = False
 
         from backend.src.tg_bot.bot import cmd_start
@@ -36,7 +38,7 @@ async def test_cmd_start(mock_message):
 @pytest.mark.asyncio
 async def test_confirm_tg_success(mock_message):
     """Тест успешного подтверждения Telegram"""
-    with patch('backend.src.tg_bot.bot.db') as mock_db:
+    with patch('backend.src.tg_bot.bot.db', spec=AsyncDatabase) as mock_db:
         mock_user = Mock()
         mock_user.id = 1
         mock_db.get_user_by_telegram_username.return_value = mock_user
@@ -53,7 +55,7 @@ async def test_confirm_tg_success(mock_message):
 @pytest.mark.asyncio
 async def test_confirm_tg_user_not_found(mock_message):
     """Тест подтверждения Telegram для непривязанного аккаунта"""
-    with patch('backend.src.tg_bot.bot.db') as mock_db:
+    with patch('backend.src.tg_bot.bot.db', spec=AsyncDatabase) as mock_db:
         mock_db.get_user_by_telegram_username.return_value = None
 
         from backend.src.tg_bot.bot import confirm_tg
@@ -67,11 +69,61 @@ async def test_confirm_tg_user_not_found(mock_message):
 @pytest.mark.asyncio
 async def test_my_orders(mock_message):
     """Тест кнопки Мои заказы"""
-    from backend.src.tg_bot.bot import my_orders
-    await my_orders(mock_message)
+    orders = [{
+        'id': 7,
+        'status': 'pending',
+        'total_amount': 30,
+        'created_at': datetime(2024, 1, 2),
+        'items': [{'name': 'Sol Ring', 'quantity': 2, 'unit_price': 15.0}]
+    }]
+    with patch('backend.src.tg_bot.bot.db', spec=AsyncDatabase) as mock_db:
+        mock_db.get_user_orders.return_value = (orders, 7, None)
+
+        from backend.src.tg_bot.bot import my_orders
+        await my_orders(mock_message)
+
+        mock_db.get_user_orders.assert_awaited_once_with(telegram_chat_id=12345, limit=5)
+        mock_message.answer.assert_called_once()
+        text = mock_message.answer.call_args[0][0]
+        assert 'Ваши заказы' in text
+        assert 'Заказ #007 от 02.01.2024 - В обработке' in text
+        assert 'Sol Ring × 2' in text
+        keyboard = mock_message.answer.call_args[1]['reply_markup']
+        assert [b.callback_data for b in keyboard.inline_keyboard[0]] == ['orders:older:7']
 
-    mock_message.answer.assert_called_once()
-    assert 'Ваши заказы' in mock_message.answer.call_args[0][0]
+
+@pytest.mark.asyncio
+async def test_my_orders_empty(mock_message):
+    """Тест кнопки Мои заказы без заказов"""
+    with patch('backend.src.tg_bot.bot.db', spec=AsyncDatabase) as mock_db:
+        mock_db.get_user_orders.return_value = ([], None, None)
+
+        from backend.src.tg_bot.bot import my_orders
+        await my_orders(mock_message)
+
+        assert 'нет заказов' in mock_message.answer.call_args[0][0]
+        assert mock_message.answer.call_args[1]['reply_markup'] is None
+
+
+@pytest.mark.asyncio
+async def test_orders_page(mock_message):
+    """Тест листания заказов"""
+    callback = AsyncMock(spec=CallbackQuery)
+    callback.data = "orders:older:7"
+    callback.message = mock_message
+    callback.answer = AsyncMock()
+    mock_message.edit_text = AsyncMock()
+
+    with patch('backend.src.tg_bot.bot.db', spec=AsyncDatabase) as mock_db:
+        mock_db.get_user_orders.return_value = ([], None, 6)
+
+        from backend.src.tg_bot.bot import orders_page
+        await orders_page(callback)
+
+        mock_db.get_user_orders.assert_awaited_once_with(telegram_chat_id=12345, limit=5, before=7, after=None)
+        keyboard = mock_message.edit_text.call_args[1]['reply_markup']
+        assert [b.callback_data for b in keyboard.inline_keyboard[0]] == ['orders:newer:6']
+        callback.answer.assert_awaited_once()
 
 
 @pytest.mark.asyncio
@@ -97,7 +149,7 @@ async def test_help_command(mock_message):
 @pytest.mark.asyncio
 async def test_other_messages(mock_message):
     """Тест обработки других сообщений"""
-    with patch('backend.src.tg_bot.bot.db') as mock_db:
+    with patch('backend.src.tg_bot.bot.db', spec=AsyncDatabase) as mock_db:
         mock_db.is_verified_tg_user.return_value = False
 
         from backend.src.tg_bot.bot import other_messages
@@ -110,7 +162,7 @@ async def test_other_messages(mock_message):
 @pytest.mark.asyncio
 async def test_create_main_keyboard_unverified():
     """Тест создания клавиатуры для неверифицированного пользователя"""
-    with patch('backend.src.tg_bot.bot.db') as mock_db:
+    with patch('backend.src.tg_bot.bot.db', spec=AsyncDatabase) as mock_db:
         mock_db.is_verified_tg_user.return_value = False
 
         keyboard = await create_main_keyboard("testuser")
@@ -124,7 +176,7 @@ async def test_create_main_keyboard_unverified():
 @pytest.mark.asyncio
 async def test_create_main_keyboard_verified():
     """Тест создания клавиатуры для верифицированного пользователя"""
-    with patch('backend.src.tg_bot.bot.db') as mock_db:
+    with patch('backend.src.tg_bot.bot.db', spec=AsyncDatabase) as mock_db:
         mock_db.is_verified_tg_user.return_value = True
 
         keyboard = await create_main_keyboard("testuser")
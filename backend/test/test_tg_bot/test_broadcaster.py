@@ -0,0 +1,260 @@
+import time
+import asyncio
+import pytest
+import pytest_asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from aiohttp import web
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+
+from backend.src.tg_bot.broadcaster import Broadcaster, TokenBucket
+
+
+class FakeBotAPI:
+    """Локальный сервер Bot API: записывает sendMessage и отвечает заданными ошибками"""
+
+    def __init__(self, errors: dict = None):
+        """
+        :param errors: chat_id -> список ответов (код, описание, параметры) до первого успешного
+        """
+        self.errors = errors or {}
+        self.sent = []
+        self.calls = 0
+
+    async def send_message(self, request):
+        data = dict(await request.post())
+        chat_id = int(data['chat_id'])
+        self.calls += 1
+
+        errors = self.errors.get(chat_id)
+        if errors:
+            code, description, parameters = errors.pop(0)
+            return web.json_response({'ok': False, 'error_code': code, 'description': description,
+                                      'parameters': parameters}, status=code)
+
+        self.sent.append((chat_id, data['text'], time.monotonic()))
+        return web.json_response({'ok': True, 'result': {
+            'message_id': len(self.sent), 'date': 0, 'chat': {'id': chat_id, 'type': 'private'}, 'text': data['text']
+        }})
+
+
+class RecordingClock:
+    """time.monotonic, запоминающий последнее показание"""
+
+    def __init__(self):
+        self.now = None
+
+    def __call__(self) -> float:
+        self.now = time.monotonic()
+        return self.now
+
+
+@pytest_asyncio.fixture
+async def fake_api():
+    api = FakeBotAPI()
+    app = web.Application()
+    app.router.add_post('/bot{token}/sendMessage', api.send_message)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    session = AiohttpSession(api=TelegramAPIServer.from_base(f'http://127.0.0.1:{port}'))
+    api.bot = Bot(token='123456:TEST', session=session)
+
+    yield api
+
+    await session.close()
+    await runner.cleanup()
+
+
+class TestTokenBucket:
+    @pytest.mark.asyncio
+    async def test_rate(self):
+        """Тест ограничения скорости корзиной токенов"""
+        bucket = TokenBucket(rate=50, capacity=1)
+
+        started = time.monotonic()
+        for _ in range(5):
+            await bucket.acquire()
+
+        assert time.monotonic() - started >= 4 / 50 * 0.9
+
+
+class TestBroadcaster:
+    @pytest.mark.asyncio
+    async def test_delivers_with_chat_rate(self, fake_api):
+        """Тест доставки через фейковый Bot API с лимитом на чат: проверяются моменты выдачи токенов чата"""
+        clock = RecordingClock()
+        broadcaster = Broadcaster(fake_api.bot, global_rate=1000, chat_rate=20, workers=4, clock=clock)
+        grants = []
+        try_acquire = TokenBucket.try_acquire
+
+        def recording_try_acquire(bucket):
+            wait = try_acquire(bucket)
+            if not wait:
+                # try_acquire синхронный: последнее показание часов - то, по которому выдан токен
+                grants.append((bucket, clock.now))
+            return wait
+
+        with patch.object(TokenBucket, 'try_acquire', recording_try_acquire):
+            await broadcaster.start()
+            for chat_id in range(1, 6):
+                broadcaster.send(chat_id, 'first')
+                broadcaster.send(chat_id, 'second')
+            await broadcaster.stop()
+
+        assert broadcaster.stats()['sent'] == 10
+        assert sorted((chat, text) for chat, text, _ in fake_api.sent) == \
+            sorted((chat_id, text) for chat_id in range(1, 6) for text in ('first', 'second'))
+        for chat_id in range(1, 6):
+            times = [granted_at for bucket, granted_at in grants if bucket is broadcaster._chats[chat_id]]
+            assert len(times) == 2
+            assert times[1] - times[0] >= 1 / 20 - 1e-9
+
+    @pytest.mark.asyncio
+    async def test_busy_chat_does_not_block_others(self):
+        """Тест: всплеск в один чат откладывается, воркер сразу отправляет в другие чаты"""
+        bot = MagicMock()
+        bot.send_message = AsyncMock()
+        broadcaster = Broadcaster(bot, global_rate=1000, chat_rate=20, workers=1)
+        await broadcaster.start()
+
+        for text in ('1', '2', '3'):
+            broadcaster.send(1, text)
+        broadcaster.send(2, 'other')
+        await asyncio.sleep(0.01)
+
+        assert [c.kwargs['chat_id'] for c in bot.send_message.await_args_list] == [1, 2]
+        assert broadcaster.stats()['deferred'] == 2
+
+        await broadcaster.stop()
+        assert [c.kwargs['text'] for c in bot.send_message.await_args_list if c.kwargs['chat_id'] == 1] == \
+            ['1', '2', '3']
+        assert broadcaster.stats()['deferred'] == 0
+
+    @pytest.mark.asyncio
+    async def test_retry_after_429(self, fake_api):
+        """Тест повтора после 429 с ожиданием retry_after"""
+        fake_api.errors[1] = [(429, 'Too Many Requests: retry after 1', {'retry_after': 1})]
+        broadcaster = Broadcaster(fake_api.bot, global_rate=1000, chat_rate=1000, workers=2)
+        await broadcaster.start()
+
+        started = time.monotonic()
+        broadcaster.send(1, 'hello')
+        await broadcaster.stop()
+
+        assert [(chat, text) for chat, text, _ in fake_api.sent] == [(1, 'hello')]
+        assert fake_api.sent[0][2] - started >= 1
+        assert broadcaster.stats()['retried'] == 1
+
+    @pytest.mark.asyncio
+    async def test_server_error_backoff(self, fake_api):
+        """Тест повтора с задержкой после ошибки сервера"""
+        fake_api.errors[1] = [(500, 'Internal Server Error', {}), (502, 'Bad Gateway', {})]
+        broadcaster = Broadcaster(fake_api.bot, global_rate=1000, chat_rate=1000, workers=1, backoff=0.01)
+        await broadcaster.start()
+
+        broadcaster.send(1, 'hello')
+        await broadcaster.stop()
+
+        assert len(fake_api.sent) == 1
+        assert broadcaster.stats()['retried'] == 2
+
+    @pytest.mark.asyncio
+    async def test_forbidden_not_retried(self, fake_api):
+        """Тест: заблокировавший бота пользователь не получает повторов"""
+        fake_api.errors[1] = [(403, 'Forbidden: bot was blocked by the user', {})]
+        broadcaster = Broadcaster(fake_api.bot, global_rate=1000, chat_rate=1000, workers=1)
+        await broadcaster.start()
+
+        broadcaster.send(1, 'hello')
+        await broadcaster.stop()
+
+        assert fake_api.calls == 1
+        assert broadcaster.stats()['failed'] == 1
+
+    @pytest.mark.asyncio
+    async def test_queue_full(self):
+        """Тест отбрасывания сообщений при переполнении очереди"""
+        broadcaster = Broadcaster(MagicMock(), queue_size=2)
+
+        assert broadcaster.send(1, 'a') and broadcaster.send(2, 'b')
+        assert broadcaster.send(3, 'c') is False
+        assert broadcaster.stats()['dropped'] == 1
+
+    @pytest.mark.asyncio
+    async def test_deferred_count_against_queue_size(self):
+        """Тест: сообщения, отложенные до токена чата, занимают место в очереди"""
+        bot = MagicMock()
+        bot.send_message = AsyncMock()
+        broadcaster = Broadcaster(bot, global_rate=1000, chat_rate=1, queue_size=3, workers=1)
+        await broadcaster.start()
+
+        for text in ('1', '2', '3'):
+            assert broadcaster.send(1, text)
+        await asyncio.sleep(0.01)
+        assert broadcaster.stats()['deferred'] == 2
+
+        assert broadcaster.send(1, '4')
+        assert broadcaster.send(2, 'other') is False
+        assert broadcaster.stats()['dropped'] == 1
+
+        await broadcaster.stop(drain=False)
+
+    @pytest.mark.asyncio
+    async def test_send_wait_waits_for_space(self):
+        """Тест: send_wait ждёт, пока отправка освободит место"""
+        bot = MagicMock()
+        bot.send_message = AsyncMock()
+        broadcaster = Broadcaster(bot, global_rate=1000, chat_rate=1000, queue_size=1, workers=1)
+
+        assert broadcaster.send(1, 'a')
+        waiting = asyncio.create_task(broadcaster.send_wait(2, 'b'))
+        await asyncio.sleep(0.01)
+        assert not waiting.done()
+
+        await broadcaster.start()
+        await asyncio.wait_for(waiting, 1)
+        await broadcaster.stop()
+        assert [c.kwargs['chat_id'] for c in bot.send_message.await_args_list] == [1, 2]
+
+    @pytest.mark.asyncio
+    async def test_large_queue_does_not_block(self):
+        """Тест: десятки тысяч уведомлений ставятся в очередь без ожидания отправки"""
+        bot = MagicMock()
+        bot.send_message = AsyncMock()
+        broadcaster = Broadcaster(bot, global_rate=10 ** 6, chat_rate=10 ** 6, workers=16)
+        await broadcaster.start()
+
+        started = time.monotonic()
+        for chat_id in range(20000):
+            assert broadcaster.send(chat_id, 'restock')
+        assert time.monotonic() - started < 1
+
+        await broadcaster.stop(timeout=30)
+        assert bot.send_message.await_count == 20000
+
+    @pytest.mark.asyncio
+    async def test_order_status_event(self):
+        """Тест события изменения статуса заказа"""
+        db = MagicMock()
+        db.get_order_chat_id = AsyncMock(return_value=555)
+        broadcaster = Broadcaster(MagicMock(), db)
+
+        assert await broadcaster.order_status(7, 'shipped') is True
+        assert broadcaster._queue.get_nowait() == (555, '📦 Заказ #007: Доставляется')
+
+    @pytest.mark.asyncio
+    async def test_restock_event(self):
+        """Тест события поступления карты"""
+        db = MagicMock()
+        db.get_restock_subscribers = AsyncMock(return_value=[(1, 'Sol Ring', 10), (2, 'Sol Ring', 10)])
+        broadcaster = Broadcaster(MagicMock(), db)
+
+        assert await broadcaster.restock(5) == 2
+        assert broadcaster._queue.get_nowait().text == '🔔 Sol Ring снова в наличии от 10.00 ₽'
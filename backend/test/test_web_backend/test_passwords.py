@@ -0,0 +1,56 @@
+import threading
+
+import pytest
+from unittest.mock import MagicMock
+
+from backend.src.web_backend.app.passwords import PasswordHasher, PasswordHasherBusy
+
+
+@pytest.fixture
+def bcrypt():
+    bcrypt = MagicMock()
+    bcrypt.generate_password_hash.return_value = b'$2b$10$hash'
+    bcrypt.check_password_hash.return_value = True
+    return bcrypt
+
+
+class TestPasswordHasher:
+    def test_hash_and_check(self, bcrypt):
+        """Тест хэширования с заданной стоимостью и проверки пароля"""
+        hasher = PasswordHasher(bcrypt, rounds=10, workers=2)
+
+        assert hasher.hash('secret') == '$2b$10$hash'
+        bcrypt.generate_password_hash.assert_called_once_with('secret', 10)
+        assert hasher.check('$2b$10$hash', 'secret') is True
+
+    def test_needs_rehash(self, bcrypt):
+        """Тест определения хэшей с устаревшей стоимостью"""
+        hasher = PasswordHasher(bcrypt, rounds=12, workers=1)
+
+        assert hasher.needs_rehash('$2b$10$' + 'a' * 53) is True
+        assert hasher.needs_rehash('$2b$12$' + 'a' * 53) is False
+        assert hasher.needs_rehash('not-a-bcrypt-hash') is False
+
+    def test_busy(self, bcrypt):
+        """Тест отказа без ожидания, когда все места в очереди заняты"""
+        started, release = threading.Event(), threading.Event()
+
+        def slow_check(*args):
+            started.set()
+            release.wait(5)
+            return True
+
+        bcrypt.check_password_hash.side_effect = slow_check
+        hasher = PasswordHasher(bcrypt, workers=1, max_pending=1, timeout=0.01)
+        thread = threading.Thread(target=hasher.check, args=('hash', 'secret'))
+        thread.start()
+        started.wait(5)
+
+        try:
+            with pytest.raises(PasswordHasherBusy):
+                hasher.check('hash', 'secret')
+        finally:
+            release.set()
+            thread.join()
+
+        assert hasher.check('hash', 'secret') is True
@@ -0,0 +1,48 @@
+import json
+import decimal
+from datetime import date, datetime
+
+import pytest
+from flask import Flask, jsonify
+
+from backend.src.web_backend.app import responses
+
+
+@pytest.fixture
+def app():
+    return Flask(__name__)
+
+
+class TestDumps:
+    def test_stdlib_fallback_matches_jsonify(self, app, monkeypatch):
+        """Тест сериализации дат и Decimal без orjson в том же формате, что у jsonify"""
+        monkeypatch.setattr(responses, 'orjson', None)
+        payload = {
+            'added_at': datetime(2025, 3, 1, 12, 30, 5),
+            'day': date(2025, 3, 1),
+            'price': decimal.Decimal('10.50'),
+        }
+
+        with app.app_context():
+            expected = jsonify(payload).get_json()
+
+        assert json.loads(responses.dumps(payload)) == expected
+        assert expected['added_at'] == 'Sat, 01 Mar 2025 12:30:05 GMT'
+
+    def test_unknown_type(self, monkeypatch):
+        """Тест ошибки на несериализуемом типе"""
+        monkeypatch.setattr(responses, 'orjson', None)
+
+        with pytest.raises(TypeError):
+            responses.dumps({'value': object()})
+
+    def test_orjson_matches_jsonify(self, app):
+        """Тест совпадения формата дат при сериализации через orjson"""
+        if responses.orjson is None:
+            pytest.skip('orjson не установлен')
+        payload = {'added_at': datetime(2025, 3, 1, 12, 30, 5), 'price': decimal.Decimal('1.5')}
+
+        with app.app_context():
+            expected = jsonify(payload).get_json()
+
+        assert json.loads(responses.dumps(payload)) == expected
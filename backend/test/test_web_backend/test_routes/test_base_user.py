@@ -27,7 +27,7 @@ class TestBaseUserRoutes:
         """Тест регистрации с существующим email"""
         with app.app_context():
             from backend.src.db._classes import User
-            app.db.get_user.return_value = User(tuple(sample_user_data.values()))
+            app.db.get_user.return_value = User(**sample_user_data)
 
             response = client.post('/api/auth/register',
                                    json={
@@ -43,10 +43,11 @@ class TestBaseUserRoutes:
         """Тест успешного логина"""
         with app.app_context():
             from backend.src.db._classes import User
-            app.bcrypt = Mock()
-            app.bcrypt.check_password_hash.return_value = True
+            app.password_hasher = Mock()
+            app.password_hasher.check.return_value = True
+            app.password_hasher.needs_rehash.return_value = False
 
-            user = User(tuple(sample_user_data.values()))
+            user = User(**sample_user_data)
             app.db.get_user.return_value = user
 
             response = client.post('/api/auth/login',
@@ -77,10 +78,10 @@ class TestBaseUserRoutes:
         """Тест логина с неверным паролем"""
         with app.app_context():
             from backend.src.db._classes import User
-            app.bcrypt = Mock()
-            app.bcrypt.check_password_hash.return_value = False
+            app.password_hasher = Mock()
+            app.password_hasher.check.return_value = False
 
-            user = User(tuple(sample_user_data.values()))
+            user = User(**sample_user_data)
             app.db.get_user.return_value = user
 
             response = client.post('/api/auth/login',
@@ -92,6 +93,36 @@ class TestBaseUserRoutes:
             assert response.status_code == 401
             assert response.json['message'] == 'Неверный пароль'
 
+    def test_login_rehash(self, client, app, sample_user_data):
+        """Тест пересчёта хэша при смене стоимости bcrypt"""
+        with app.app_context():
+            from backend.src.db._classes import User
+            app.password_hasher = Mock()
+            app.password_hasher.check.return_value = True
+            app.password_hasher.needs_rehash.return_value = True
+            app.password_hasher.hash.return_value = 'new_hash'
+            app.db.get_user.return_value = User(**sample_user_data)
+
+            response = client.post('/api/auth/login', json={'email': 'test@example.com', 'password': 'password123'})
+
+            assert response.status_code == 200
+            app.password_hasher.hash.assert_called_once_with('password123')
+            app.db.update_password_hash.assert_called_once_with(uuid=1, password_hash='new_hash')
+
+    def test_login_busy(self, client, app, sample_user_data):
+        """Тест быстрого отказа 503, когда очередь хэширования заполнена"""
+        with app.app_context():
+            from backend.src.db._classes import User
+            from backend.src.web_backend.app.passwords import PasswordHasherBusy
+            app.password_hasher = Mock()
+            app.password_hasher.check.side_effect = PasswordHasherBusy()
+            app.db.get_user.return_value = User(**sample_user_data)
+
+            response = client.post('/api/auth/login', json={'email': 'test@example.com', 'password': 'password123'})
+
+            assert response.status_code == 503
+            assert response.headers['Retry-After'] == '1'
+
     def test_get_user_success(self, client, app, sample_user_data):
         """Тест получения данных пользователя"""
         with app.app_context():
@@ -99,21 +130,39 @@ class TestBaseUserRoutes:
             from flask_jwt_extended import create_access_token
 
             access_token = create_access_token(identity='1')
-            user = User(tuple(sample_user_data.values()))
+            user = User(**sample_user_data)
             app.db.get_user_by_id.return_value = user
 
             response = client.get('/api/auth/user',
                                   headers={'Authorization': f'Bearer {access_token}'})
 
             assert response.status_code == 200
-            assert 'user' in response.json
+            assert response.json['user']['username'] == 'testuser'
+            assert 'password_hash' not in response.json['user']
+            assert 'email_verification_token' not in response.json['user']
 
-    def test_update_user_profile(self, client, app):
-        """Тест обновления профиля пользователя"""
+    def test_get_user_not_found(self, client, app):
+        """Тест пользователя, удалённого после выдачи токена"""
         with app.app_context():
             from flask_jwt_extended import create_access_token
 
             access_token = create_access_token(identity='1')
+            app.db.get_user_by_id.return_value = None
+
+            response = client.get('/api/auth/user',
+                                  headers={'Authorization': f'Bearer {access_token}'})
+
+            assert response.status_code == 404
+
+    def test_update_user_profile(self, client, app, sample_user_data):
+        """Тест обновления профиля пользователя одним запросом"""
+        with app.app_context():
+            from backend.src.db._classes import User
+            from flask_jwt_extended import create_access_token
+
+            access_token = create_access_token(identity='1')
+            sample_user_data.update(username='newusername', telegram_username='@newtelegram')
+            app.db.update_user.return_value = (User(**sample_user_data), [])
 
             response = client.post('/api/auth/user_update_profile',
                                    headers={'Authorization': f'Bearer {access_token}'},
@@ -124,5 +173,36 @@ class TestBaseUserRoutes:
 
             assert response.status_code == 200
             assert response.json['message'] == 'Изменения сохранены'
-            app.db.update_username.assert_called_once_with(uuid='1', username='newusername')
-            app.db.update_telegram_username.assert_called_once_with(uuid='1', telegram_username='@newtelegram')
\ No newline at end of file
+            assert response.json['user']['username'] == 'newusername'
+            assert 'password_hash' not in response.json['user']
+            app.db.update_user.assert_called_once_with(uuid=1, username='newusername',
+                                                       telegram_username='@newtelegram')
+
+    def test_update_user_profile_conflict(self, client, app):
+        """Тест занятого username"""
+        with app.app_context():
+            from flask_jwt_extended import create_access_token
+
+            access_token = create_access_token(identity='1')
+            app.db.update_user.return_value = (None, ['username'])
+
+            response = client.post('/api/auth/user_update_profile',
+                                   headers={'Authorization': f'Bearer {access_token}'},
+                                   json={'username': 'taken'})
+
+            assert response.status_code == 409
+            assert response.json['errors'] == {'username': 'Уже занято'}
+
+    def test_update_user_profile_no_fields(self, client, app):
+        """Тест запроса без изменяемых полей"""
+        with app.app_context():
+            from flask_jwt_extended import create_access_token
+
+            access_token = create_access_token(identity='1')
+
+            response = client.post('/api/auth/user_update_profile',
+                                   headers={'Authorization': f'Bearer {access_token}'},
+                                   json={'role': 'admin'})
+
+            assert response.status_code == 400
+            app.db.update_user.assert_not_called()
\ No newline at end of file
@@ -1,31 +1,132 @@
+import gzip
+import json
 import pytest
-from unittest.mock import Mock, patch
+import requests
+
+from decimal import Decimal
+from unittest.mock import Mock, MagicMock, patch
+
+from backend.src.web_backend.app.routes.cards import encode_cursor, decode_cursor, DEFAULT_SEARCH_FIELDS
+from backend.src.api.images import CachedImage
 
 
 class TestCardsRoutes:
     def test_search_cards_success(self, client, app, sample_card_data):
         """Тест успешного поиска карт"""
         with app.app_context():
-            app.db.search_card.return_value = (1, [sample_card_data])
+            row = tuple(sample_card_data[field] for field in DEFAULT_SEARCH_FIELDS)
+            app.db.search_card.return_value = (1, [row], None)
 
             response = client.get('/api/cards/search/Test%20Card')
 
             assert response.status_code == 200
             data = response.json
-            assert len(data) == 2  # (count, cards)
-            assert data[1][0]['name'] == 'Test Card'
+            assert data['total'] == 1
+            assert data['cards'][0]['name'] == 'Test Card'
+            assert 'created_at' not in data['cards'][0]
+            assert data['next_cursor'] is None
+            app.db.search_card.assert_called_once_with(card_name='Test Card', limit=20, after=None, count='exact',
+                                                       fields=DEFAULT_SEARCH_FIELDS)
 
     def test_search_cards_empty(self, client, app):
         """Тест поиска без результатов"""
         with app.app_context():
-            app.db.search_card.return_value = (0, [])
+            app.db.search_card.return_value = (0, [], None)
 
             response = client.get('/api/cards/search/NonExistent')
 
             assert response.status_code == 200
             data = response.json
-            assert data[0] == 0
-            assert data[1] == []
+            assert data['total'] == 0
+            assert data['cards'] == []
+
+    def test_search_cards_next_page(self, client, app, sample_card_data):
+        """Тест перехода на следующую страницу по курсору"""
+        with app.app_context():
+            app.db.search_card.return_value = (None, [(7, 'Test Card', 'Set')], ('Test Card', 'Set', 7))
+
+            response = client.get('/api/cards/search/Test?limit=1&count=none&fields=id,name&cursor='
+                                  + encode_cursor(('Test Card', '', 1)))
+
+            assert response.status_code == 200
+            assert response.json['cards'] == [{'id': 7, 'name': 'Test Card', 'set_name': 'Set'}]
+            assert decode_cursor(response.json['next_cursor']) == ('Test Card', 'Set', 7)
+            app.db.search_card.assert_called_once_with(card_name='Test', limit=1, after=('Test Card', '', 1),
+                                                       count='none', fields=('id', 'name', 'set_name'))
+
+    @pytest.mark.parametrize('query', ['limit=0', 'limit=1000', 'count=maybe', 'cursor=broken', 'fields=id,password'])
+    def test_search_cards_bad_params(self, client, app, query):
+        """Тест проверки параметров пагинации"""
+        with app.app_context():
+            response = client.get(f'/api/cards/search/Test?{query}')
+
+            assert response.status_code == 400
+            app.db.search_card.assert_not_called()
+
+    def test_search_cards_ranked(self, client, app, sample_card_data):
+        """Тест нечёткого поиска через mode=ranked"""
+        with app.app_context():
+            app.db.search_card_ranked.return_value = (1, [(1, 'Test Card', '', 0.5)])
+
+            response = client.get('/api/cards/search/Tset%20Crad?mode=ranked&limit=5&threshold=0.2&fields=id,name')
+
+            assert response.status_code == 200
+            assert response.json['cards'][0] == {'id': 1, 'name': 'Test Card', 'set_name': '', 'score': 0.5}
+            assert response.json['next_cursor'] is None
+            app.db.search_card_ranked.assert_called_once_with(card_name='Tset Crad', limit=5, threshold=0.2,
+                                                              fields=('id', 'name', 'set_name'))
+            app.db.search_card.assert_not_called()
+
+    @pytest.mark.parametrize('query', ['mode=fuzzy', 'mode=ranked&threshold=0', 'mode=ranked&threshold=2'])
+    def test_search_cards_ranked_bad_params(self, client, app, query):
+        """Тест проверки параметров нечёткого поиска"""
+        with app.app_context():
+            response = client.get(f'/api/cards/search/Test?{query}')
+
+            assert response.status_code == 400
+
+    def test_search_cards_inventory_fields(self, client, app):
+        """Тест: поля наличия переключают поиск на сводку по складу"""
+        with app.app_context():
+            app.db.search_cards_with_inventory.return_value = (1, [(1, 'Test Card', 'Set', 4, Decimal('9.50'))], None)
+
+            response = client.get('/api/cards/search/Test?fields=id,name,set_name,total_quantity,min_price')
+
+            assert response.status_code == 200
+            assert response.json['cards'][0]['total_quantity'] == 4
+            assert response.json['cards'][0]['min_price'] == '9.50'
+            app.db.search_card.assert_not_called()
+
+    def test_search_cards_gzip(self, client, app):
+        """Тест сжатия большого ответа по Accept-Encoding"""
+        with app.app_context():
+            app.db.search_card.return_value = (100, [(i, f'Card {i}', 'Set') for i in range(100)], None)
+
+            response = client.get('/api/cards/search/Card?fields=id,name', headers={'Accept-Encoding': 'gzip'})
+
+            assert response.status_code == 200
+            assert response.headers['Content-Encoding'] == 'gzip'
+            assert 'Accept-Encoding' in response.headers['Vary']
+            data = json.loads(gzip.decompress(response.data))
+            assert len(data['cards']) == 100
+
+    def test_suggest_cards(self, client, app):
+        """Тест подсказок названий"""
+        with app.app_context():
+            app.db.suggest_card_names.return_value = ['Sol Ring']
+
+            response = client.get('/api/cards/suggest?q=sol&limit=5')
+
+            assert response.status_code == 200
+            assert response.json['suggestions'] == ['Sol Ring']
+            app.db.suggest_card_names.assert_called_once_with(prefix='sol', limit=5)
+
+    def test_suggest_cards_bad_limit(self, client, app):
+        """Тест проверки лимита подсказок"""
+        with app.app_context():
+            response = client.get('/api/cards/suggest?q=sol&limit=100')
+
+            assert response.status_code == 400
 
     def test_search_cards_error(self, client, app):
         """Тест ошибки при поиске карт"""
@@ -35,4 +136,71 @@ class TestCardsRoutes:
             response = client.get('/api/cards/search/Test')
 
             assert response.status_code == 500
-            assert 'error' in response.json
\ No newline at end of file
+            assert 'error' in response.json
+
+    def test_card_image(self, client, app, tmp_path):
+        """Тест отдачи картинки из кэша с долгим Cache-Control"""
+        image_path = tmp_path / 'image.img'
+        image_path.write_bytes(b'jpeg')
+        with app.app_context():
+            app.db.get_card_image_url.return_value = 'https://cards.scryfall.io/normal/1.jpg'
+            app.image_cache = MagicMock()
+            app.image_cache.get.side_effect = lambda url: CachedImage(open(image_path, 'rb'), 'image/jpeg', '"abc"', None)
+
+            response = client.get('/api/cards/1/image/normal')
+
+            assert response.status_code == 200
+            assert response.data == b'jpeg'
+            assert response.mimetype == 'image/jpeg'
+            assert 'public' in response.headers['Cache-Control']
+            assert 'max-age=2592000' in response.headers['Cache-Control']
+            assert response.headers['ETag'] == '"abc"'
+            app.db.get_card_image_url.assert_called_once_with(card_id=1, size='normal')
+
+            response = client.get('/api/cards/1/image/normal', headers={'If-None-Match': '"abc"'})
+            assert response.status_code == 304
+
+    def test_card_image_bad_size(self, client, app):
+        """Тест неизвестного размера картинки"""
+        with app.app_context():
+            response = client.get('/api/cards/1/image/huge')
+
+            assert response.status_code == 400
+            app.db.get_card_image_url.assert_not_called()
+
+    def test_card_image_not_found(self, client, app):
+        """Тест карты без картинки"""
+        with app.app_context():
+            app.db.get_card_image_url.return_value = None
+
+            response = client.get('/api/cards/1/image/normal')
+
+            assert response.status_code == 404
+
+    @pytest.mark.parametrize('error, status', [
+        (requests.ConnectionError('refused'), 502),
+        (requests.HTTPError('404 Not Found'), 502),
+        (ValueError('Image host is not allowed: example.com'), 404),
+    ])
+    def test_card_image_errors(self, client, app, error, status):
+        """Тест: недоступный источник - 502, запрещённый хост - 404"""
+        with app.app_context():
+            app.db.get_card_image_url.return_value = 'https://cards.scryfall.io/normal/1.jpg'
+            app.image_cache = MagicMock()
+            app.image_cache.get.side_effect = error
+
+            response = client.get('/api/cards/1/image/normal')
+
+            assert response.status_code == status
+
+    def test_card_image_internal_error(self, client, app):
+        """Тест: прочие ошибки не выдаются за ошибку источника"""
+        with app.app_context():
+            app.db.get_card_image_url.return_value = 'https://cards.scryfall.io/normal/1.jpg'
+            app.image_cache = MagicMock()
+            app.image_cache.get.side_effect = OSError('No space left on device')
+            app.config['PROPAGATE_EXCEPTIONS'] = False
+
+            response = client.get('/api/cards/1/image/normal')
+
+            assert response.status_code == 500
@@ -0,0 +1,104 @@
+import pytest
+from decimal import Decimal
+from datetime import datetime
+from flask_jwt_extended import create_access_token
+
+from backend.src.db._classes import CartItem
+from backend.src.web_backend.app import responses
+
+
+@pytest.fixture
+def auth_headers(app):
+    with app.app_context():
+        return {'Authorization': f'Bearer {create_access_token(identity="7")}'}
+
+
+class TestCartRoutes:
+    def test_get_cart(self, client, app, auth_headers):
+        """Тест корзины с суммой"""
+        item = CartItem(card_inventory_id=1, name='Lightning Bolt', price=Decimal('10.00'), quantity=2, available=5,
+                        line_total=Decimal('20.00'))
+        app.db.get_cart.return_value = ([item], Decimal('20.00'))
+
+        response = client.get('/api/cart', headers=auth_headers)
+
+        assert response.status_code == 200
+        assert response.json['total'] == '20.00'
+        assert response.json['items'][0]['name'] == 'Lightning Bolt'
+        assert response.json['items'][0]['available'] == 5
+        app.db.get_cart.assert_called_once_with(user_id=7)
+
+    @pytest.mark.parametrize('use_orjson', [False, True])
+    def test_get_cart_added_at(self, client, app, auth_headers, monkeypatch, use_orjson):
+        """Тест корзины с датой добавления: формат как у jsonify, с orjson и без него"""
+        if use_orjson and responses.orjson is None:
+            pytest.skip('orjson не установлен')
+        if not use_orjson:
+            monkeypatch.setattr(responses, 'orjson', None)
+        item = CartItem(card_inventory_id=1, name='Lightning Bolt', price=Decimal('10.00'), quantity=1, available=5,
+                        line_total=Decimal('10.00'), added_at=datetime(2025, 3, 1, 12, 30, 5))
+        app.db.get_cart.return_value = ([item], Decimal('10.00'))
+
+        response = client.get('/api/cart', headers=auth_headers)
+
+        assert response.status_code == 200
+        assert response.json['items'][0]['added_at'] == 'Sat, 01 Mar 2025 12:30:05 GMT'
+
+    def test_get_cart_requires_jwt(self, client, app):
+        """Тест корзины без токена"""
+        response = client.get('/api/cart')
+
+        assert response.status_code == 401
+        app.db.get_cart.assert_not_called()
+
+    def test_add_cart_item(self, client, app, auth_headers):
+        """Тест добавления позиции"""
+        app.db.add_cart_item.return_value = 3
+
+        response = client.post('/api/cart/items', headers=auth_headers, json={'card_inventory_id': 1, 'quantity': 2})
+
+        assert response.status_code == 200
+        assert response.json == {'card_inventory_id': 1, 'quantity': 3}
+        app.db.add_cart_item.assert_called_once_with(user_id=7, card_inventory_id=1, quantity=2, max_quantity=4)
+
+    def test_add_cart_item_unknown(self, client, app, auth_headers):
+        """Тест несуществующей позиции склада"""
+        app.db.add_cart_item.return_value = None
+
+        response = client.post('/api/cart/items', headers=auth_headers, json={'card_inventory_id': 999})
+
+        assert response.status_code == 404
+
+    @pytest.mark.parametrize('body', [{}, {'card_inventory_id': '1'}, {'card_inventory_id': 1, 'quantity': 0},
+                                      {'card_inventory_id': 1, 'quantity': 5}, {'card_inventory_id': 1, 'quantity': True}])
+    def test_add_cart_item_bad_body(self, client, app, auth_headers, body):
+        """Тест некорректного тела запроса"""
+        response = client.post('/api/cart/items', headers=auth_headers, json=body)
+
+        assert response.status_code == 400
+        app.db.add_cart_item.assert_not_called()
+
+    def test_update_cart_item(self, client, app, auth_headers):
+        """Тест изменения количества"""
+        app.db.set_cart_item_quantity.return_value = 4
+
+        response = client.put('/api/cart/items/1', headers=auth_headers, json={'quantity': 4})
+
+        assert response.status_code == 200
+        assert response.json == {'card_inventory_id': 1, 'quantity': 4}
+        app.db.set_cart_item_quantity.assert_called_once_with(user_id=7, card_inventory_id=1, quantity=4)
+
+    def test_update_cart_item_requires_quantity(self, client, app, auth_headers):
+        """Тест изменения без количества"""
+        response = client.put('/api/cart/items/1', headers=auth_headers, json={})
+
+        assert response.status_code == 400
+        app.db.set_cart_item_quantity.assert_not_called()
+
+    def test_remove_cart_item(self, client, app, auth_headers):
+        """Тест удаления позиции"""
+        app.db.remove_cart_item.return_value = True
+        assert client.delete('/api/cart/items/1', headers=auth_headers).status_code == 204
+
+        app.db.remove_cart_item.return_value = False
+        assert client.delete('/api/cart/items/1', headers=auth_headers).status_code == 404
@@ -1,15 +1,35 @@
-import React, { useState } from 'react';
-import { 
-  TextField, 
-  InputAdornment, 
+import React, { useState, useMemo, useEffect } from 'react';
+import {
+  TextField,
+  InputAdornment,
   IconButton,
-  Paper
+  Paper,
+  Autocomplete
 } from '@mui/material';
 import SearchIcon from '@mui/icons-material/Search';
 import ClearIcon from '@mui/icons-material/Clear';
+import { cardsAPI } from '../../services/cardsAPI';
+import { debounce } from '../../utils/debounce';
 
 const SearchBar = ({ onSearch }) => {
   const [query, setQuery] = useState('');
+  const [suggestions, setSuggestions] = useState([]);
+
+  // Подсказки берутся из лёгкого /api/cards/suggest, а не из полного поиска
+  const loadSuggestions = useMemo(() => debounce(async (value) => {
+    if (!value.trim()) {
+      setSuggestions([]);
+      return;
+    }
+
+    try {
+      setSuggestions(await cardsAPI.suggestCards(value));
+    } catch (error) {
+      setSuggestions([]);
+    }
+  }, 150), []);
+
+  useEffect(() => () => loadSuggestions.cancel(), [loadSuggestions]);
 
   const handleSubmit = (e) => {
     e.preventDefault();
@@ -18,44 +38,70 @@ const SearchBar = ({ onSearch }) => {
 
   const handleClear = () => {
     setQuery('');
+    setSuggestions([]);
     onSearch('');
   };
 
+  const handleInputChange = (event, value, reason) => {
+    setQuery(value);
+    if (reason === 'input') {
+      loadSuggestions(value);
+    }
+  };
+
+  const handleSelect = (event, value) => {
+    if (typeof value === 'string' && value) {
+      setQuery(value);
+      onSearch(value);
+    }
+  };
+
   return (
-    <Paper 
-      component="form" 
+    <Paper
+      component="form"
       onSubmit={handleSubmit}
-      sx={{ 
-        width: '100%', 
-        maxWidth: 600 
+      sx={{
+        width: '100%',
+        maxWidth: 600
       }}
     >
-      <TextField
-        fullWidth
-        variant="outlined"
-        placeholder="Введите название карты..."
-        value={query}
-        onChange={(e) => setQuery(e.target.value)}
-        InputProps={{
-          startAdornment: (
-            <InputAdornment position="start">
-              <SearchIcon color="primary" />
-            </InputAdornment>
-          ),
-          endAdornment: query && (
-            <InputAdornment position="end">
-              <IconButton onClick={handleClear}>
-                <ClearIcon />
-              </IconButton>
-            </InputAdornment>
-          ),
-        }}
-        sx={{
-          '& .MuiOutlinedInput-root': {
-            fontSize: '1.1rem',
-            py: 1
-          }
-        }}
+      <Autocomplete
+        freeSolo
+        disableClearable
+        options={suggestions}
+        filterOptions={(options) => options}
+        inputValue={query}
+        onInputChange={handleInputChange}
+        onChange={handleSelect}
+        renderInput={(params) => (
+          <TextField
+            {...params}
+            fullWidth
+            variant="outlined"
+            placeholder="Введите название карты..."
+            InputProps={{
+              ...params.InputProps,
+              startAdornment: (
+                <InputAdornment position="start">
+                  <SearchIcon color="primary" />
+                </InputAdornment>
+              ),
+              endAdornment: query && (
+                <InputAdornment position="end">
+                  <IconButton onClick={handleClear}>
+                    <ClearIcon />
+                  </IconButton>
+                </InputAdornment>
+              ),
+            }}
+            sx={{
+              '& .MuiOutlinedInput-root': {
+                fontSize: '1.1rem',
+                py: 1
+              }
+            }}
+          />
+        )}
       />
     </Paper>
   );
@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { cardsAPI } from '../../../services/cardsAPI';
 
 export const useCardSearch = (query, page = 1) => {
@@ -7,6 +7,14 @@ export const useCardSearch = (query, page = 1) => {
   const [error, setError] = useState(null);
   const [total, setTotal] = useState(0);
 
+  // Курсоры страниц текущего запроса: cursors.current[i] ведёт на страницу i + 1
+  const cursors = useRef([null]);
+
+  useEffect(() => {
+    cursors.current = [null];
+    setTotal(0);
+  }, [query]);
+
   useEffect(() => {
     if (!query.trim()) {
       setCards([]);
@@ -14,26 +22,50 @@ export const useCardSearch = (query, page = 1) => {
       return;
     }
 
+    let cancelled = false;
+
     const searchCards = async () => {
       setLoading(true);
       setError(null);
 
       try {
-        const response = await cardsAPI.searchCards(query, page);
-        
+        // Keyset-пагинация: до страницы, курсор которой ещё неизвестен, доходим по порядку
+        const known = Math.min(page, cursors.current.length);
+        let response;
+
+        for (let current = known; current <= page; current++) {
+          response = await cardsAPI.searchCards(query, {
+            cursor: cursors.current[current - 1],
+            count: current === 1 ? 'exact' : 'none'
+          });
+
+          if (cancelled) return;
+
+          if (current === 1) {
+            setTotal(response.total);
+          }
+          cursors.current[current] = response.nextCursor;
+
+          if (!response.nextCursor) break;
+        }
+
         // ВСЕГДА заменяем карточки, а не добавляем
         setCards(response.cards);
-        setTotal(response.total);
       } catch (err) {
+        if (cancelled) return;
         setError(err.message);
         setCards([]);
       } finally {
-        setLoading(false);
+        if (!cancelled) setLoading(false);
       }
     };
 
     searchCards();
+
+    return () => {
+      cancelled = true;
+    };
   }, [query, page]); // Зависимость от page и query
 
   return { cards, loading, error, total };
-};
\ No newline at end of file
+};
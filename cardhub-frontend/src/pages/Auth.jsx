@@ -90,14 +90,14 @@ const Auth = () => {
         
         // Преобразуем данные пользователя в удобный формат
         const user = {
-          id: userData.user[0],
-          email: userData.user[1],
-          username: userData.user[2], // Берём часть до @ из email
-          role: userData.user[3],
-          confirmed: userData.user[4],
-          telegram_username: userData.user[7], // telegram_username
-          telegram_verified: userData.user[8], // telegram_verified
-          createdAt: userData.user[11], // created_at
+          id: userData.user.id,
+          email: userData.user.email,
+          username: userData.user.username,
+          role: userData.user.role,
+          confirmed: userData.user.email_verified,
+          telegram_username: userData.user.telegram_username,
+          telegram_verified: userData.user.telegram_verified,
+          createdAt: userData.user.created_at,
           access_token: data.access_token,
           refresh_token: data.refresh_token
         };
@@ -139,14 +139,14 @@ const Auth = () => {
         const userData = await userResponse.json();
         
         const user = {
-          id: userData.user[0],
-          email: userData.user[1],
-          username: userData.user[2],
-          role: userData.user[3],
-          confirmed: userData.user[4],
-          telegram_username: userData.user[7],
-          telegram_verified: userData.user[8],
-          createdAt: userData.user[11],
+          id: userData.user.id,
+          email: userData.user.email,
+          username: userData.user.username,
+          role: userData.user.role,
+          confirmed: userData.user.email_verified,
+          telegram_username: userData.user.telegram_username,
+          telegram_verified: userData.user.telegram_verified,
+          createdAt: userData.user.created_at,
           access_token: loginData.access_token, 
           refresh_token: loginData.refresh_token  
         };
@@ -95,28 +95,22 @@ const Profile = () => {
         }),
       });
 
+      const data = await saveResponse.json();
+
       if (!saveResponse.ok) {
-        const errorData = await saveResponse.json();
-        throw new Error(errorData.message || 'Ошибка при сохранении');
+        throw new Error(data.message || 'Ошибка при сохранении');
       }
 
-      // Обновляем данные
-      const updatedResponse = await authFetch(API_ENDPOINTS.AUTH.USER || '/api/auth/user', {
-        method: 'GET'
-      });
-
-      if (updatedResponse.ok) {
-        const data = await updatedResponse.json();
-        if (data.user) {
-          updateUser(data.user);
-          setUserData({
-            username: data.user.username || '',
-            email: data.user.email || '',
-            telegram_username: data.user.telegram_username || '',
-            telegram_verified: data.user.telegram_verified || false
-          });
-          setNewTelegramUsername(data.user.telegram_username || '');
-        }
+      // Сервер возвращает уже обновлённый профиль
+      if (data.user) {
+        updateUser(data.user);
+        setUserData({
+          username: data.user.username || '',
+          email: data.user.email || '',
+          telegram_username: data.user.telegram_username || '',
+          telegram_verified: data.user.telegram_verified || false
+        });
+        setNewTelegramUsername(data.user.telegram_username || '');
       }
       
       // Открываем бота
@@ -8,9 +8,18 @@ export const API_ENDPOINTS = {
   },
   CARDS: {
     SEARCH: '/api/cards/search/',
+    SUGGEST: '/api/cards/suggest',
+    IMAGE: (cardId, size = 'normal') => `/api/cards/${cardId}/image/${size}`,
+  },
+  CART: {
+    LIST: '/api/cart',
+    ITEMS: '/api/cart/items',
   }
 };
 
+// Картинка карты через кэширующий прокси бэкенда, а не напрямую с Scryfall
+export const cardImageUrl = (cardId, size = 'normal') => `${API_BASE_URL}${API_ENDPOINTS.CARDS.IMAGE(cardId, size)}`;
+
 // Функция для создания авторизованного запроса
 export const authFetch = async (url, options = {}) => {
   const token = localStorage.getItem('token');
@@ -1,64 +1,67 @@
-import { API_BASE_URL, API_ENDPOINTS } from '../services/api';
+import { API_BASE_URL, API_ENDPOINTS, cardImageUrl } from '../services/api';
+
+// Поля карты, которые нужны сетке и карточке
+const SEARCH_FIELDS = [
+  'id', 'name', 'color', 'set_code', 'set_name', 'collector_number', 'card_type',
+  'total_quantity', 'min_price', 'available_qualities'
+];
 
 export const cardsAPI = {
-  async searchCards(cardName, page = 1, limit = 20) {
+  async searchCards(cardName, { cursor = null, limit = 20, count = 'exact' } = {}) {
     try {
-      const response = await fetch(`${API_BASE_URL}${API_ENDPOINTS.CARDS.SEARCH}${encodeURIComponent(cardName)}`);
+      const params = new URLSearchParams({ limit, count, fields: SEARCH_FIELDS.join(',') });
+      if (cursor) {
+        params.set('cursor', cursor);
+      }
+
+      const response = await fetch(`${API_BASE_URL}${API_ENDPOINTS.CARDS.SEARCH}${encodeURIComponent(cardName)}?${params}`);
       
       if (!response.ok) {
         throw new Error(`HTTP error! status: ${response.status}`);
       }
       
       const data = await response.json();
-      const [totalCount, cardsArray] = data;
+      const { total, cards: cardsArray, next_cursor: nextCursor } = data;
       
-      // Преобразуем данные с учётом JOIN
-      const transformedCards = cardsArray.map(card => {
-
-        console.log('Card inventory data:', {
-          id: card[0],
-          name: card[5],
-          total_quantity: card[12],
-          min_price: card[13],
-          available_qualities: card[14]
-        });
-        
-        return {
-          id: card[0],
-          color: card[1],
-          setCode: card[2],
-          setName: card[3],
-          collectorNumber: card[4],
-          name: card[5],
-          type: card[6],
-          imageUrlSmall: card[7],
-          imageUrlNormal: card[8],
-          imageUrlLarge: card[9],
-          createdAt: card[10],
-          updatedAt: card[11],
-          // Данные из JOIN с инвентарём
-          inStock: card[12] || 0, // total_quantity
-          minPrice: card[13], // min_price
-          availableQualities: card[14] || [], // available_qualities (может быть None)
-          isPreorder: (card[12] || 0) === 0 // предзаказ если нет в наличии
-        };
-      });
+      // Сервер отдаёт только запрошенные поля, с именами
+      const transformedCards = cardsArray.map(card => ({
+        id: card.id,
+        color: card.color,
+        setCode: card.set_code,
+        setName: card.set_name,
+        collectorNumber: card.collector_number,
+        name: card.name,
+        type: card.card_type,
+        imageUrlNormal: cardImageUrl(card.id, 'normal'),
+        inStock: card.total_quantity || 0,
+        minPrice: card.min_price,
+        availableQualities: card.available_qualities || [],
+        isPreorder: (card.total_quantity || 0) === 0 // предзаказ если нет в наличии
+      }));
       
-      // Пагинация
-      const startIndex = (page - 1) * limit;
-      const endIndex = startIndex + limit;
-      const paginatedCards = transformedCards.slice(startIndex, endIndex);
-
+      // Сервер отдаёт одну страницу и курсор следующей
       return {
-        total: totalCount,
-        cards: paginatedCards,
-        page,
+        total,
+        cards: transformedCards,
         limit,
-        hasMore: endIndex < totalCount
+        nextCursor,
+        hasMore: nextCursor !== null
       };
     } catch (error) {
       console.error('Search cards error:', error);
       throw error;
     }
+  },
+
+  async suggestCards(prefix, limit = 10) {
+    const params = new URLSearchParams({ q: prefix, limit });
+    const response = await fetch(`${API_BASE_URL}${API_ENDPOINTS.CARDS.SUGGEST}?${params}`);
+
+    if (!response.ok) {
+      throw new Error(`HTTP error! status: ${response.status}`);
+    }
+
+    const data = await response.json();
+    return data.suggestions;
   }
-};
\ No newline at end of file
+};
@@ -0,0 +1,65 @@
+import { API_ENDPOINTS, authFetch, cardImageUrl } from './api';
+
+const parse = async (response, fallback) => {
+  if (response.status === 204) {
+    return null;
+  }
+
+  const data = await response.json();
+
+  if (!response.ok) {
+    throw new Error(data.message || fallback);
+  }
+
+  return data;
+};
+
+export const cartAPI = {
+  // Корзина одним запросом: позиции с текущей ценой, наличием и суммой строки, итог корзины
+  async getCart() {
+    const data = await parse(await authFetch(API_ENDPOINTS.CART.LIST), 'Ошибка загрузки корзины');
+
+    return {
+      total: Number(data.total),
+      items: data.items.map(item => ({
+        cardInventoryId: item.card_inventory_id,
+        cardId: item.card_id,
+        name: item.name,
+        setName: item.set_name,
+        imageUrlSmall: cardImageUrl(item.card_id, 'small'),
+        lang: item.lang,
+        quality: item.quality,
+        foil: item.foil,
+        price: Number(item.price),
+        quantity: item.quantity,
+        available: item.available,
+        lineTotal: Number(item.line_total),
+        inStock: item.available >= item.quantity
+      }))
+    };
+  },
+
+  async addItem(cardInventoryId, quantity = 1) {
+    return parse(await authFetch(API_ENDPOINTS.CART.ITEMS, {
+      method: 'POST',
+      body: JSON.stringify({ card_inventory_id: cardInventoryId, quantity }),
+    }), 'Ошибка добавления в корзину');
+  },
+
+  async updateQuantity(cardInventoryId, quantity) {
+    return parse(await authFetch(`${API_ENDPOINTS.CART.ITEMS}/${cardInventoryId}`, {
+      method: 'PUT',
+      body: JSON.stringify({ quantity }),
+    }), 'Ошибка изменения количества');
+  },
+
+  async removeItem(cardInventoryId) {
+    return parse(await authFetch(`${API_ENDPOINTS.CART.ITEMS}/${cardInventoryId}`, {
+      method: 'DELETE',
+    }), 'Ошибка удаления из корзины');
+  },
+
+  async clear() {
+    return parse(await authFetch(API_ENDPOINTS.CART.LIST, { method: 'DELETE' }), 'Ошибка очистки корзины');
+  }
+};
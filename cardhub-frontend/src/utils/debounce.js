@@ -1 +1,13 @@
+// Откладывает вызов fn, пока вызовы не прекратятся на delay мс
+export const debounce = (fn, delay = 300) => {
+  let timer = null;
 
+  const debounced = (...args) => {
+    clearTimeout(timer);
+    timer = setTimeout(() => fn(...args), delay);
+  };
+
+  debounced.cancel = () => clearTimeout(timer);
+
+  return debounced;
+};